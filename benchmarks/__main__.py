@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Führt die Benchmarks aus benchmarks/bench_*.py (Klassen im Stil von asv) im aktuellen Interpreter aus und schreibt
+die Ergebnisse als JSON, z.B. um zwei Versionen vor einem Update zu vergleichen:
+
+    python -m benchmarks --ausgabe alt.json                       # im alten Checkout
+    python -m benchmarks --ausgabe neu.json --vergleich alt.json  # im neuen Checkout
+
+time_*: Laufzeit eines Aufrufs in Sekunden (Median, Minimum, Mittelwert und Standardabweichung der Wiederholungen)
+track_*: Rückgabewert der Methode
+peakmem_*: Spitze der Python-Allokationen in Bytes (tracemalloc, anders als bei asv nicht der Speicher des Prozesses)
+"""
+import os
+import sys
+import io
+import re
+import glob
+import json
+import time
+import timeit
+import argparse
+import platform
+import importlib
+import itertools
+import statistics
+import subprocess
+import contextlib
+import tracemalloc
+import importlib.metadata
+from datetime import datetime
+
+BASIS = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+sys.path.append(BASIS)
+PRAEFIXE = ('time_', 'track_', 'peakmem_')
+PAKETE = ['numpy', 'pandas', 'matplotlib', 'openpyxl', 'pyarrow']
+
+def module():
+    for pfad in sorted(glob.glob(os.path.join(BASIS, 'benchmarks', 'bench_*.py'))):
+        yield 'benchmarks.' + os.path.splitext(os.path.basename(pfad))[0]
+
+def klassen(modul):
+    """
+    Benchmark-Klassen eines Moduls, ohne die per Stern-Import übernommenen Klassen.
+    """
+    # Kopie der Werte, Warnungen in den Benchmarks legen z.B. __warningregistry__ im Modul an
+    for wert in list(vars(modul).values()):
+        if isinstance(wert, type) and wert.__module__ == modul.__name__ and any(name.startswith(PRAEFIXE) for name in dir(wert)):
+            yield wert
+
+def parameter(klasse):
+    """
+    Liefert die Namen der Parameter und alle Kombinationen wie asv: bei mehreren param_names ist params eine Liste
+    von Listen, deren Kreuzprodukt gemessen wird.
+    """
+    params = getattr(klasse, 'params', None)
+    if params is None:
+        return [], [()]
+    namen = list(getattr(klasse, 'param_names', []))
+    if len(namen) > 1:
+        return namen, list(itertools.product(*params))
+    return namen or ['param'], [(wert,) for wert in params]
+
+def _text(wert):
+    return getattr(wert, '__name__', None) or repr(wert)
+
+def schluessel(modul, klasse, methode, namen, werte):
+    name = f"{modul.split('.')[-1]}.{klasse.__name__}.{methode}"
+    if not werte:
+        return name
+    return f"{name}({', '.join(f'{key}={_text(wert)}' for key, wert in zip(namen, werte))})"
+
+def messe_zeit(funktion, wiederholungen=5, min_dauer=0.1):
+    """
+    Erhöht die Anzahl der Aufrufe je Messung, bis eine Messung min_dauer erreicht. Die Kalibrierung dient als
+    Aufwärmen, danach folgen die Wiederholungen. Mit wiederholungen=0 zählt nur die Kalibrierung.
+    """
+    timer = timeit.Timer(funktion)
+    anzahl = 1
+    while True:
+        dauer = timer.timeit(anzahl)
+        if dauer >= min_dauer or anzahl >= 10**6:
+            break
+        anzahl = min(10**6, max(2 * anzahl, int(1.2 * anzahl * min_dauer / max(dauer, 1e-9))))
+    zeiten = [timer.timeit(anzahl) / anzahl for _ in range(wiederholungen)] or [dauer / anzahl]
+    return {
+            'typ' : 'time',
+            'einheit' : 's',
+            'wert' : statistics.median(zeiten),
+            'min' : min(zeiten),
+            'mittel' : statistics.fmean(zeiten),
+            'stdev' : statistics.stdev(zeiten) if len(zeiten) > 1 else 0.0,
+            'anzahl' : anzahl,
+            'wiederholungen' : len(zeiten),
+            }
+
+def messe_speicher(funktion):
+    tracemalloc.start()
+    try:
+        funktion()
+        _, spitze = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'typ' : 'peakmem', 'einheit' : 'bytes', 'wert' : spitze}
+
+def messe(funktion, methode, wiederholungen, min_dauer):
+    if methode.startswith('time_'):
+        return messe_zeit(funktion, wiederholungen, min_dauer)
+    if methode.startswith('peakmem_'):
+        return messe_speicher(funktion)
+    return {'typ' : 'track', 'einheit' : None, 'wert' : funktion()}
+
+def ausfuehren(filter=None, wiederholungen=5, min_dauer=0.1, protokoll=sys.stderr):
+    """
+    Führt alle Benchmarks aus, deren Schlüssel zum regulären Ausdruck filter passt. Meldungen der Modelle auf stdout
+    werden verworfen. Fehler einzelner Benchmarks werden im Ergebnis vermerkt, die übrigen laufen weiter.
+    """
+    muster = re.compile(filter) if filter else None
+    ergebnisse = {}
+    for modulname in module():
+        try:
+            modul = importlib.import_module(modulname)
+        except ImportError as e:
+            print(f"{modulname}: übersprungen ({e})", file=protokoll)
+            continue
+        try:
+            benchmark_klassen = list(klassen(modul))
+        except Exception as e:
+            name = modulname.split('.')[-1]
+            if muster is None or muster.search(name):
+                ergebnisse[name] = {'fehler' : f"{type(e).__name__}: {e}"}
+            print(f"{modulname}: Fehler beim Suchen der Benchmarks ({e})", file=protokoll)
+            continue
+        for klasse in benchmark_klassen:
+            methoden = sorted(name for name in dir(klasse) if name.startswith(PRAEFIXE))
+            namen, kombinationen = parameter(klasse)
+            for werte in kombinationen:
+                keys = {methode : schluessel(modulname, klasse, methode, namen, werte) for methode in methoden}
+                keys = {methode : key for methode, key in keys.items() if muster is None or muster.search(key)}
+                if not keys:
+                    continue
+                bench = klasse()
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        if hasattr(bench, 'setup'):
+                            bench.setup(*werte)
+                except NotImplementedError:
+                    continue
+                except Exception as e:
+                    for key in keys.values():
+                        ergebnisse[key] = {'fehler' : f"setup: {type(e).__name__}: {e}"}
+                        print(f"{key}: Fehler in setup ({e})", file=protokoll)
+                    continue
+                try:
+                    for methode, key in keys.items():
+                        funktion = lambda: getattr(bench, methode)(*werte)
+                        try:
+                            with contextlib.redirect_stdout(io.StringIO()):
+                                ergebnisse[key] = messe(funktion, methode, wiederholungen, min_dauer)
+                        except Exception as e:
+                            ergebnisse[key] = {'fehler' : f"{type(e).__name__}: {e}"}
+                        print(f"{key}: {_format(ergebnisse[key])}", file=protokoll)
+                finally:
+                    if hasattr(bench, 'teardown'):
+                        with contextlib.redirect_stdout(io.StringIO()):
+                            bench.teardown(*werte)
+    return ergebnisse
+
+def _format(ergebnis):
+    if 'fehler' in ergebnis:
+        return f"Fehler ({ergebnis['fehler']})"
+    if ergebnis['typ'] == 'time':
+        return f"{ergebnis['wert']*1000:.3f} ms (±{ergebnis['stdev']*1000:.3f}, {ergebnis['anzahl']}x{ergebnis['wiederholungen']})"
+    if ergebnis['typ'] == 'peakmem':
+        return f"{ergebnis['wert'] / 2**20:.2f} MiB"
+    return f"{ergebnis['wert']}"
+
+def metadaten():
+    def git(*argumente):
+        try:
+            return subprocess.run(['git', *argumente], cwd=BASIS, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    pakete = {}
+    for paket in PAKETE:
+        try:
+            pakete[paket] = importlib.metadata.version(paket)
+        except importlib.metadata.PackageNotFoundError:
+            pakete[paket] = None
+    return {
+            'zeit' : datetime.now().isoformat(timespec='seconds'),
+            'commit' : git('rev-parse', 'HEAD'),
+            'version' : git('describe', '--always', '--dirty'),
+            'python' : platform.python_version(),
+            'plattform' : platform.platform(),
+            'cpus' : os.cpu_count(),
+            'pakete' : pakete,
+            }
+
+def vergleiche(alt, neu, toleranz=0.2):
+    """
+    Vergleicht Laufzeit und Speicher mit einer früheren Ergebnisdatei. Liefert die Zeilen des Berichts und die
+    Schlüssel der Benchmarks, die um mehr als toleranz (relativ) schlechter geworden sind.
+    """
+    zeilen, schlechter = [], []
+    for key, ergebnis in neu.items():
+        vorher = alt.get(key)
+        if vorher is None or 'fehler' in ergebnis or 'fehler' in vorher or ergebnis['typ'] == 'track' or not vorher['wert']:
+            continue
+        verhaeltnis = ergebnis['wert'] / vorher['wert']
+        markierung = ''
+        if verhaeltnis > 1 + toleranz:
+            markierung = 'schlechter'
+            schlechter.append(key)
+        elif verhaeltnis < 1 / (1 + toleranz):
+            markierung = 'besser'
+        zeilen.append(f"{verhaeltnis:6.2f}x  {markierung:10s} {key}")
+    return zeilen, schlechter
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmarks ausführen und die Ergebnisse als JSON speichern.')
+    parser.add_argument('--ausgabe', default='benchmarks.json', help='JSON-Datei für die Ergebnisse')
+    parser.add_argument('--filter', help='Nur Benchmarks, deren Name (modul.Klasse.methode(parameter)) zum regulären Ausdruck passt')
+    parser.add_argument('--wiederholungen', type=int, default=5, help='Anzahl der Wiederholungen je Zeitmessung')
+    parser.add_argument('--min-dauer', type=float, default=0.1, help='Mindestdauer einer Wiederholung in Sekunden')
+    parser.add_argument('--schnell', action='store_true', help='Nur eine Messung je Benchmark (für einen ersten Überblick)')
+    parser.add_argument('--vergleich', help='Frühere Ergebnisdatei, Abweichungen werden ausgegeben')
+    parser.add_argument('--toleranz', type=float, default=0.2, help='Erlaubte relative Verschlechterung beim Vergleich')
+    args = parser.parse_args(argv)
+
+    wiederholungen, min_dauer = (0, 0) if args.schnell else (args.wiederholungen, args.min_dauer)
+    start = time.perf_counter()
+    ergebnisse = ausfuehren(filter=args.filter, wiederholungen=wiederholungen, min_dauer=min_dauer)
+    daten = {
+             'meta' : {**metadaten(), 'dauer' : time.perf_counter() - start},
+             'einstellungen' : {'wiederholungen' : wiederholungen, 'min_dauer' : min_dauer, 'filter' : args.filter},
+             'ergebnisse' : ergebnisse,
+             }
+    with open(args.ausgabe, 'w', encoding='utf-8') as datei:
+        json.dump(daten, datei, indent=1, ensure_ascii=False, default=str)
+    n_fehler = sum('fehler' in ergebnis for ergebnis in ergebnisse.values())
+    print(f"{len(ergebnisse)} Benchmarks, {n_fehler} mit Fehlern, gespeichert in {args.ausgabe}")
+
+    schlechter = []
+    if args.vergleich:
+        with open(args.vergleich, encoding='utf-8') as datei:
+            alt = json.load(datei)
+        zeilen, schlechter = vergleiche(alt['ergebnisse'], ergebnisse, args.toleranz)
+        print(f"Vergleich mit {args.vergleich} ({alt['meta'].get('version')}):")
+        print('\n'.join(zeilen))
+        print(f"{len(schlechter)} Benchmarks um mehr als {args.toleranz:.0%} schlechter")
+    return 1 if n_fehler or schlechter else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
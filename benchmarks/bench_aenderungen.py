@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Neuberechnung nach der Änderung einer Leistung
+"""
+import os
+import sys
+import io
+import timeit
+import contextlib
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+# Je Art der Änderung zwei Werte, zwischen denen abwechselnd gewechselt wird
+WERTE = {
+         'note' : [{'note' : 2.25}, {'note' : 4.5}],
+         'status' : [{'status' : 'fertig'}, {'status' : 'fehlt'}],
+         'date' : [{'date' : datetime(2024, 3, 4)}, {'date' : datetime(2024, 3, 5)}],
+         }
+
+class Aenderung:
+    params = ([25, 60], ['note', 'status', 'date'])
+    param_names = ['n_leistungen', 'aenderung']
+
+    def setup(self, n_leistungen, aenderung):
+        self.notenberechnung = erzeuge_notenberechnung(n_leistungen=n_leistungen, seed=1)
+        # Eine Klassenarbeit etwa in der Mitte des Schuljahres
+        self.leistung = [note for note in self.notenberechnung.noten if isinstance(note, LeistungKA)][-3]
+        self.werte = WERTE[aenderung]
+        self.schritt = 0
+        self._berechnen()
+
+    def _aendern(self):
+        self.schritt += 1
+        self.notenberechnung.leistung_aendern(self.leistung, **self.werte[self.schritt % 2])
+
+    def _berechnen(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.notenberechnung.berechne_gesamtnote(show_warnings=False)
+            self.notenberechnung.time_series()
+
+    def time_inkrementell(self, n_leistungen, aenderung):
+        self._aendern()
+        self._berechnen()
+
+    def time_vollstaendig(self, n_leistungen, aenderung):
+        self._aendern()
+        vergessen(self.notenberechnung)
+        self._berechnen()
+
+    def time_unveraendert(self, n_leistungen, aenderung):
+        self._berechnen()
+
+class Lerngruppe:
+    params = [30]
+    param_names = ['n_schueler']
+
+    def setup(self, n_schueler):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.gruppe = erzeuge_lerngruppe(n_schueler=n_schueler, n_leistungen=25)
+        self.notenberechnung = self.gruppe.schueler[0]._notenberechnung
+        self.leistung = self.notenberechnung.noten[-1]
+        self.schritt = 0
+
+    def _aendern(self):
+        self.schritt += 1
+        self.notenberechnung.leistung_aendern(self.leistung, note=[2.25, 4.5][self.schritt % 2])
+
+    def time_aktualisieren(self, n_schueler):
+        self._aendern()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.gruppe.aktualisieren()
+
+    def time_alle_neu(self, n_schueler):
+        # Bisheriger Weg: die Noten aller Schüler vollständig neu berechnen
+        self._aendern()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for schueler in self.gruppe.schueler.values():
+                vergessen(schueler._notenberechnung)
+                schueler.setze_note(schueler._notenberechnung)
+
+    def track_betroffene(self, n_schueler):
+        self._aendern()
+        with contextlib.redirect_stdout(io.StringIO()):
+            return len(self.gruppe.aktualisieren())
+
+if __name__ == "__main__":
+    bench = Aenderung()
+    for n_leistungen in Aenderung.params[0]:
+        for aenderung in Aenderung.params[1]:
+            bench.setup(n_leistungen, aenderung)
+            for name in ['time_vollstaendig', 'time_inkrementell', 'time_unveraendert']:
+                runs = 50
+                dauer = timeit.timeit(lambda: getattr(bench, name)(n_leistungen, aenderung), number=runs) / runs
+                print(f"{n_leistungen:3d} Leistungen  {aenderung:8s} {name:18s} {dauer*1000:8.3f} ms")
+
+    bench = Lerngruppe()
+    for n_schueler in Lerngruppe.params:
+        bench.setup(n_schueler)
+        for name in ['time_alle_neu', 'time_aktualisieren']:
+            runs = 20
+            dauer = timeit.timeit(lambda: getattr(bench, name)(n_schueler), number=runs) / runs
+            print(f"{n_schueler:3d} Schüler     {'Lerngruppe':8s} {name:18s} {dauer*1000:8.3f} ms")
+        print(f"{n_schueler:3d} Schüler     betroffen: {bench.track_betroffene(n_schueler)}")
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Allokationen pro berechne_gesamtnote
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+class Zaehler:
+    """
+    Zählt die erzeugten NoteEntity- und NoteValue-Objekte, solange der Kontext aktiv ist.
+    """
+    def __init__(self):
+        self.counts = {'NoteEntity' : 0, 'NoteValue' : 0}
+
+    def __enter__(self):
+        self._finalize = NoteEntity.__array_finalize__
+        self._init = NoteValue.__init__
+        zaehler = self
+
+        def finalize(entity, obj):
+            zaehler.counts['NoteEntity'] += 1
+            return zaehler._finalize(entity, obj)
+
+        def init(value, *args, **kwargs):
+            zaehler.counts['NoteValue'] += 1
+            return zaehler._init(value, *args, **kwargs)
+
+        NoteEntity.__array_finalize__ = finalize
+        NoteValue.__init__ = init
+        return self
+
+    def __exit__(self, *args):
+        NoteEntity.__array_finalize__ = self._finalize
+        NoteValue.__init__ = self._init
+
+class Allocations:
+    def setup(self):
+        self.notenberechnung = erzeuge_notenberechnung(n_leistungen=30, fach=None)
+        self.notenberechnung.berechne_gesamtnote(show_warnings=False)
+
+    def time_berechne_gesamtnote(self):
+        vergessen(self.notenberechnung).berechne_gesamtnote(show_warnings=False)
+
+    def track_note_entities(self):
+        with Zaehler() as zaehler:
+            vergessen(self.notenberechnung).berechne_gesamtnote(show_warnings=False)
+        return zaehler.counts['NoteEntity']
+
+    def track_note_values(self):
+        with Zaehler() as zaehler:
+            vergessen(self.notenberechnung).berechne_gesamtnote(show_warnings=False)
+        return zaehler.counts['NoteValue']
+
+    def track_peak_memory(self):
+        tracemalloc.start()
+        vergessen(self.notenberechnung).berechne_gesamtnote(show_warnings=False)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+if __name__ == "__main__":
+    bench = Allocations()
+    bench.setup()
+    print(f"NoteEntity pro berechne_gesamtnote: {bench.track_note_entities()}")
+    print(f"NoteValue pro berechne_gesamtnote:  {bench.track_note_values()}")
+    print(f"Peak (tracemalloc):                  {bench.track_peak_memory()} Bytes")
+    dauer = timeit.timeit(bench.time_berechne_gesamtnote, number=200) / 200
+    print(f"Dauer:                               {dauer*1e6:.1f} µs")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Lesen archivierter Lerngruppen aus Parquet/Arrow im Vergleich zur Excel-Notenliste
+"""
+import os
+import sys
+import io
+import timeit
+import tempfile
+import contextlib
+import importlib.util
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+from notenbildung.excel import *
+from notenbildung.archiv import *
+
+class Archiv:
+    params = ['parquet', 'arrow']
+    param_names = ['format']
+    timeout = 300
+
+    def setup(self, format):
+        if importlib.util.find_spec('pyarrow') is None:
+            # pyarrow ist optional, ohne wird der Benchmark übersprungen
+            raise NotImplementedError
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file_path = erzeuge_arbeitsmappe(os.path.join(self.tmp.name, 'noten.xlsx'), n_tabellen=20)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.loader = ExcelFileLoader(self.file_path)
+        self.archiv = LerngruppenArchiv(os.path.join(self.tmp.name, 'archiv'), format=format)
+        self.gruppen = [klasse.gruppe for klasse in self.loader.klassen]
+        self.archiv.speichern(*self.gruppen)
+
+    def teardown(self, format):
+        self.tmp.cleanup()
+
+    def time_excel(self, format):
+        ExcelFileLoader(self.file_path)
+
+    def time_speichern(self, format):
+        self.archiv.speichern(*self.gruppen)
+
+    def time_lerngruppen(self, format):
+        self.archiv.lerngruppen()
+
+    def time_lesen(self, format):
+        self.archiv.lesen()
+
+    def time_lesen_spalten(self, format):
+        # Auswertung eines Fachs: nur drei Spalten, ohne Objekte
+        self.archiv.lesen(spalten=['schuljahr', 'art', 'note'], objekte=False, fach='M')
+
+    def time_tabelle_klasse(self, format):
+        self.archiv.tabelle(spalten=['sid', 'note'], klasse='05a')
+
+if __name__ == "__main__":
+    for format in Archiv.params:
+        bench = Archiv()
+        bench.setup(format)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name in ['excel', 'speichern', 'lerngruppen', 'lesen', 'lesen_spalten', 'tabelle_klasse']:
+                anzahl = 1 if name == 'excel' else 5
+                dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(format), number=anzahl) / anzahl
+                print(f"{format:8s} {name:16s} {dauer*1000:9.2f} ms", file=sys.stderr)
+
+            gleich = all(gruppe.get_sid_dataframes(full=True).astype(str).equals(
+                         bench.archiv.lesen(klasse=gruppe._name(), fach=gruppe.fach.name).astype(str)) for gruppe in bench.gruppen)
+        print(f"{format:8s} gleich wie get_sid_dataframes(full=True): {gleich}")
+        bench.teardown(format)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Batch-Berechnung gegen einzelne Notenberechnungs-Objekte
+"""
+import os
+import sys
+import timeit
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+from notenbildung.batch import *
+
+class Batch:
+    params = [30, 1500]
+    param_names = ['n_schueler']
+
+    def setup(self, n_schueler):
+        self.batch = NotenberechnungBatch(model=Notenberechnung, w_th=0.4)
+        self.spalten = erzeuge_spalten(self.batch, n_schueler=n_schueler, n_leistungen=25)
+
+    def time_batch(self, n_schueler):
+        self.batch.berechne(**self.spalten)
+
+    def time_objects(self, n_schueler):
+        for idx in range(n_schueler):
+            notenberechnung = erzeuge_notenberechnung(n_leistungen=25, seed=idx, fach=None, w_th=0.4)
+            notenberechnung.berechne_gesamtnote(show_warnings=False)
+
+if __name__ == "__main__":
+    bench = Batch()
+    for n_schueler in Batch.params:
+        bench.setup(n_schueler)
+        dauer = timeit.timeit(lambda: bench.time_batch(n_schueler), number=5) / 5
+        print(f"{n_schueler:5d} Schüler  batch    {dauer*1000:9.2f} ms")
+    n_schueler = 100
+    dauer = timeit.timeit(lambda: bench.time_objects(n_schueler), number=1)
+    print(f"{n_schueler:5d} Schüler  objekte  {dauer*1000:9.2f} ms (inkl. Aufbau der Objekte)")
+    print(f"Hochrechnung 1500 Schüler x 10 Fächer: batch {10*timeit.timeit(lambda: bench.time_batch(1500), number=1):.2f} s, objekte {dauer*150:.2f} s")
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Einzelnes gegen gesammeltes Hinzufügen von Leistungen
+"""
+import os
+import sys
+import timeit
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+class Hinzufuegen:
+    params = [25, 100, 400]
+    param_names = ['n_leistungen']
+
+    def setup(self, n_leistungen):
+        self.noten = erzeuge_noten(n_leistungen=n_leistungen)
+
+    def time_einzeln(self, n_leistungen):
+        notenberechnung = Notenberechnung(fach=FachM)
+        for note in self.noten:
+            notenberechnung.note_hinzufuegen(**note)
+
+    def time_stapel(self, n_leistungen):
+        notenberechnung = Notenberechnung(fach=FachM)
+        with notenberechnung.stapel():
+            for note in self.noten:
+                notenberechnung.note_hinzufuegen(**note)
+
+if __name__ == "__main__":
+    bench = Hinzufuegen()
+    for n_leistungen in Hinzufuegen.params:
+        bench.setup(n_leistungen)
+        for name in ['einzeln', 'stapel']:
+            dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(n_leistungen), number=3) / 3
+            print(f"{n_leistungen:4d} Leistungen  {name:8s} {dauer*1000:9.2f} ms")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Persistenter Cache für Noten und Zeitreihen
+"""
+import os
+import sys
+import tempfile
+import timeit
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+from notenbildung.cache import NotenCache
+
+class Cache:
+    params = [25, 100]
+    param_names = ['n_leistungen']
+
+    def setup(self, n_leistungen):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = NotenCache(os.path.join(self.tmp.name, 'noten.sqlite'))
+        self.ohne = [erzeuge_notenberechnung(n_leistungen=n_leistungen, seed=seed) for seed in range(20)]
+        self.mit = [erzeuge_notenberechnung(n_leistungen=n_leistungen, seed=seed, cache=self.cache) for seed in range(20)]
+        # Cache füllen
+        self.time_gesamtnote_cache(n_leistungen)
+        self.time_time_series_cache(n_leistungen)
+
+    def teardown(self, n_leistungen):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def time_gesamtnote(self, n_leistungen):
+        for notenberechnung in self.ohne:
+            vergessen(notenberechnung).berechne_gesamtnote(show_warnings=False)
+
+    def time_gesamtnote_cache(self, n_leistungen):
+        for notenberechnung in self.mit:
+            vergessen(notenberechnung).berechne_gesamtnote(show_warnings=False)
+
+    def time_time_series(self, n_leistungen):
+        for notenberechnung in self.ohne:
+            vergessen(notenberechnung).time_series()
+
+    def time_time_series_cache(self, n_leistungen):
+        for notenberechnung in self.mit:
+            vergessen(notenberechnung).time_series()
+
+if __name__ == "__main__":
+    bench = Cache()
+    for n_leistungen in Cache.params:
+        bench.setup(n_leistungen)
+        for name in ['gesamtnote', 'gesamtnote_cache', 'time_series', 'time_series_cache']:
+            dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(n_leistungen), number=3) / 3
+            print(f"{n_leistungen:4d} Leistungen  {name:18s} {dauer*1000/20:8.2f} ms/Schüler")
+        print(f"{'':4s}            {bench.cache.statistik()}")
+        bench.teardown(n_leistungen)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Durchsatz und Speicherbedarf von `notenbildung berechnen`
+"""
+import os
+import sys
+import tempfile
+import subprocess
+import time
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+BASIS = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+
+def berechnen(file_path, *optionen):
+    """
+    Führt die CLI in einem neuen Prozess aus und liefert Dauer, Anzahl der Ergebnisse und den maximalen Speicher
+    (RSS in MiB) des Prozesses.
+    """
+    start = time.perf_counter()
+    with subprocess.Popen([sys.executable, '-m', 'notenbildung.cli', 'berechnen', file_path, *optionen],
+                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd=BASIS, env=dict(os.environ, PYTHONPATH=BASIS)) as prozess:
+        n_ergebnisse = sum(1 for _ in prozess.stdout)
+        # wait4 statt wait für ru_maxrss, danach kennt Popen den beendeten Prozess und schließt nur noch die Pipe
+        _, status, nutzung = os.wait4(prozess.pid, 0)
+        prozess.returncode = os.waitstatus_to_exitcode(status)
+    return time.perf_counter() - start, n_ergebnisse, nutzung.ru_maxrss / 1024
+
+class CLI:
+    params = [1000, 10000]
+    param_names = ['n_schueler']
+    timeout = 600
+
+    def setup(self, n_schueler):
+        self.verzeichnis = tempfile.mkdtemp()
+        self.file_path = erzeuge_datensaetze(os.path.join(self.verzeichnis, 'noten.jsonl'), n_schueler=n_schueler)
+
+    def time_seriell(self, n_schueler):
+        berechnen(self.file_path)
+
+    def time_workers(self, n_schueler):
+        berechnen(self.file_path, '--workers', '0')
+
+    def track_speicher(self, n_schueler):
+        return berechnen(self.file_path)[2]
+    track_speicher.unit = 'MiB'
+
+if __name__ == "__main__":
+    bench = CLI()
+    for n_schueler in CLI.params + [40000]:
+        bench.setup(n_schueler)
+        for name, optionen in [('seriell', []), ('workers', ['--workers', '0']), ('csv', ['--format', 'jsonl', '--ausgabe', 'csv'])]:
+            dauer, n_ergebnisse, speicher = berechnen(bench.file_path, *optionen)
+            print(f"{n_schueler:6d} Schüler ({n_schueler * 25} Zeilen)  {name:8s} {dauer:7.2f} s  {n_ergebnisse / dauer:7.0f} Schüler/s  {speicher:6.0f} MiB")
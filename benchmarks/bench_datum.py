@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Erzeugen von Leistungen mit Datumsangaben als Text (Cache für Datumsangaben und Status)
+"""
+import os
+import sys
+import timeit
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+def als_text(noten):
+    """
+    Notenangaben wie aus einer Datei: Datumsangaben als Text, Verbesserungen mit Frist.
+    """
+    ergebnis = []
+    for note in noten:
+        note = {key : (value.strftime('%Y-%m-%d') if isinstance(value, datetime) else value) for key, value in note.items()}
+        if note['status'] not in (None, '---'):
+            note['status'], note['due'] = 'offen', note['date']
+        ergebnis.append(note)
+    return ergebnis
+
+def strptime_je_aufruf(texte):
+    """
+    Bisheriger Weg: strptime für jede Datumsangabe.
+    """
+    return [datetime.strptime(text, "%Y-%m-%d") for text in texte]
+
+class Datum:
+    params = [25, 60, 200]
+    param_names = ['n_leistungen']
+
+    def setup(self, n_leistungen):
+        self.noten = als_text(erzeuge_noten(n_leistungen=n_leistungen))
+        self.texte = [note['date'] for note in self.noten] * 50
+        self.stichtag = Stichtag('2024-03-01')
+
+    def time_strptime(self, n_leistungen):
+        strptime_je_aufruf(self.texte)
+
+    def time_parse_datum(self, n_leistungen):
+        [parse_datum(text) for text in self.texte]
+
+    def time_note_hinzufuegen(self, n_leistungen):
+        notenberechnung = Notenberechnung(fach=None)
+        with notenberechnung.stapel():
+            for note in self.noten:
+                notenberechnung.note_hinzufuegen(**note)
+
+    def time_note_hinzufuegen_stichtag(self, n_leistungen):
+        with self.stichtag:
+            self.time_note_hinzufuegen(n_leistungen)
+
+if __name__ == "__main__":
+    bench = Datum()
+    for n_leistungen in Datum.params:
+        bench.setup(n_leistungen)
+        for name in ['strptime', 'parse_datum', 'note_hinzufuegen', 'note_hinzufuegen_stichtag']:
+            dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(n_leistungen), number=50) / 50
+            print(f"{n_leistungen:4d} Leistungen  {name:26s} {dauer*1000:8.3f} ms")
+        print(f"    gleich wie strptime: {[parse_datum(text) for text in bench.texte] == strptime_je_aufruf(bench.texte)}")
+    print(VerbesserungStatus._auswerten.cache_info())
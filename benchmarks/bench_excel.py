@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Einlesen einer Excel-Notenliste
+"""
+import os
+import sys
+import tempfile
+import timeit
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+from notenbildung.excel import *
+
+class ExcelIngestion:
+    params = [(20, 35, 25)]
+    param_names = ['tabellen_schueler_spalten']
+
+    def setup(self, groesse):
+        n_tabellen, n_schueler, n_spalten = groesse
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file_path = erzeuge_arbeitsmappe(os.path.join(self.tmp.name, 'noten.xlsx'), n_tabellen=n_tabellen, n_schueler=n_schueler, n_spalten=n_spalten)
+        self.tabellen = pd.read_excel(self.file_path, sheet_name=None, header=None)
+
+    def teardown(self, groesse):
+        self.tmp.cleanup()
+
+    def time_sheets(self, groesse):
+        for sheet, df in self.tabellen.items():
+            ExcelSheetConfig(df=df.copy(), sheet=sheet)
+
+    def time_file(self, groesse):
+        ExcelFileLoader(self.file_path)
+
+class ExcelParallel:
+    params = [1, 2, 4]
+    param_names = ['workers']
+
+    def setup(self, workers):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.file_path = erzeuge_arbeitsmappe(os.path.join(self.tmp.name, 'noten.xlsx'), n_tabellen=24)
+
+    def teardown(self, workers):
+        self.tmp.cleanup()
+
+    def time_file(self, workers):
+        ExcelFileLoader(self.file_path, workers=workers)
+
+if __name__ == "__main__":
+    bench = ExcelIngestion()
+    for groesse in ExcelIngestion.params:
+        bench.setup(groesse)
+        dauer = timeit.timeit(lambda: bench.time_sheets(groesse), number=3) / 3
+        print(f"{groesse} Tabellen/Schüler/Spalten  ExcelSheetConfig  {dauer*1000:9.2f} ms")
+        dauer = timeit.timeit(lambda: bench.time_file(groesse), number=1)
+        print(f"{groesse} Tabellen/Schüler/Spalten  ExcelFileLoader   {dauer*1000:9.2f} ms (inkl. Lesen der Datei)")
+        bench.teardown(groesse)
+
+    bench = ExcelParallel()
+    for workers in ExcelParallel.params:
+        bench.setup(workers)
+        dauer = timeit.timeit(lambda: bench.time_file(workers), number=1)
+        print(f"24 Tabellen  workers={workers}  {dauer*1000:9.2f} ms (CPUs: {os.cpu_count()})")
+        bench.teardown(workers)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Excel-Export einer Lerngruppe
+"""
+import os
+import sys
+import tempfile
+import timeit
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+from notenbildung.excel import *
+
+def export_dataframes(gruppe, file_path):
+    """
+    Bisheriger Export über einen DataFrame je Schüler, zum Vergleich.
+    """
+    dataframe = gruppe.get_dataframe()
+    for fkey in ['note_s', 'note_m', 'note']:
+        dataframe[fkey] = dataframe[fkey].apply(lambda k: float(k))
+    with pd.ExcelWriter(file_path) as writer:
+        dataframe.to_excel(writer, index=False, sheet_name='Gesamt', float_format="%.2f")
+        for schueler in gruppe.schueler.values():
+            df_schueler = schueler.get_dataframe()[[ 'date', 'art', 'nr', 'note' ]]
+            df_schueler['date'] = df_schueler['date'].apply(lambda x: x.strftime('%d.%m.%Y'))
+            df_schueler['note_text'] = df_schueler['note'].apply(lambda k: k._get_HJ(text=True))
+            df_schueler['note'] = df_schueler['note'].apply(lambda k: float(k))
+            df_schueler.to_excel(writer, index=False, sheet_name=schueler._get_name(), float_format="%.2f")
+
+class ExcelExport:
+    params = [35]
+    param_names = ['n_schueler']
+
+    def setup(self, n_schueler):
+        self.tmp = tempfile.TemporaryDirectory()
+        file_path = erzeuge_arbeitsmappe(os.path.join(self.tmp.name, 'noten.xlsx'), n_tabellen=1, n_schueler=n_schueler)
+        self.loader = ExcelFileLoader(file_path)
+        self.gruppe = self.loader.klassen[0].gruppe
+        self.ziel = os.path.join(self.tmp.name, 'export.xlsx')
+
+    def teardown(self, n_schueler):
+        self.tmp.cleanup()
+
+    def time_streaming(self, n_schueler):
+        self.loader._export_excel(self.gruppe, self.ziel)
+
+    def time_dataframes(self, n_schueler):
+        export_dataframes(self.gruppe, self.ziel)
+
+    def peakmem_streaming(self, n_schueler):
+        self.time_streaming(n_schueler)
+
+    def peakmem_dataframes(self, n_schueler):
+        self.time_dataframes(n_schueler)
+
+if __name__ == "__main__":
+    bench = ExcelExport()
+    for n_schueler in ExcelExport.params:
+        bench.setup(n_schueler)
+        for name in ['streaming', 'dataframes']:
+            dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(n_schueler), number=3) / 3
+            tracemalloc.start()
+            getattr(bench, f'time_{name}')(n_schueler)
+            _, spitze = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{n_schueler} Schüler  {name:10s} {dauer*1000:9.2f} ms/Klasse  Speicher max. {spitze/2**20:6.2f} MiB")
+        bench.teardown(n_schueler)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Importzeit von notenbildung.models (kalter Start mit -X importtime)
+
+Vergleich mit einem anderen Stand, z.B. einem älteren Checkout:
+    python benchmarks/bench_import.py . /pfad/zum/alten/checkout
+"""
+import os
+import sys
+import subprocess
+import statistics
+
+BASIS = os.path.dirname(os.path.abspath(os.path.dirname(__file__)))
+SCHWERE_MODULE = ['numpy', 'pandas', 'matplotlib.pyplot', 'openpyxl', 'requests']
+
+def importzeiten(modul='notenbildung.models', pfad=BASIS):
+    """
+    Importiert modul in einem neuen Interpreter und liefert die kumulierten Importzeiten in Sekunden je Modul.
+    """
+    umgebung = dict(os.environ, PYTHONPATH=pfad, PYTHONDONTWRITEBYTECODE='1')
+    ausgabe = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modul}'],
+                             capture_output=True, text=True, env=umgebung, cwd=pfad, check=True).stderr
+    zeiten = {}
+    for zeile in ausgabe.splitlines():
+        if not zeile.startswith('import time:') or 'cumulative' in zeile:
+            continue
+        _, kumuliert, name = zeile[len('import time:'):].split('|')
+        zeiten.setdefault(name.strip(), int(kumuliert) / 1e6)
+    return zeiten
+
+class Import:
+    params = ['notenbildung.nvo', 'notenbildung.models', 'notenbildung.excel']
+    param_names = ['modul']
+    timeout = 120
+
+    def track_importzeit(self, modul):
+        return importzeiten(modul)[modul]
+    track_importzeit.unit = 's'
+
+if __name__ == "__main__":
+    pfade = sys.argv[1:] or [BASIS]
+    for pfad in pfade:
+        messungen = [importzeiten(pfad=os.path.abspath(pfad)) for _ in range(5)]
+        gesamt = [zeiten['notenbildung.models'] for zeiten in messungen]
+        print(f"{os.path.abspath(pfad)}")
+        print(f"  notenbildung.models  {statistics.median(gesamt)*1000:9.1f} ms (Median aus {len(gesamt)})")
+        for name in SCHWERE_MODULE:
+            geladen = [zeiten[name] for zeiten in messungen if name in zeiten]
+            wert = f"{statistics.median(geladen)*1000:9.1f} ms" if geladen else "nicht geladen"
+            print(f"    {name:18s} {wert}")
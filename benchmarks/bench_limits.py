@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Prüfung der Limits
+"""
+import os
+import sys
+import random
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+TYPEN = [LeistungKA, LeistungKT, LeistungM, LeistungS, LeistungP, LeistungE, LeistungGFS]
+
+def erzeuge_leistungen(n_leistungen, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(TYPEN)(note=2, date='2024-01-01', system=SystemN) for _ in range(n_leistungen)]
+
+def zaehle_verschachtelt(limits, leistungen):
+    """
+    Bisherige Zählung über alle Limits, Leistungen und Einträge, zum Vergleich.
+    """
+    counts = []
+    for limit in limits.limits:
+        counts.append(sum(1 for leistung in leistungen if any(isinstance(obj, item) or obj == item for item in limit['sum'] for obj in [leistung, leistung._attribut])))
+    return counts
+
+def pruefe_parallel(limits, leistungen_je_thread, n_threads=8):
+    """
+    Prüft viele Listen gleichzeitig und vergleicht jedes Ergebnis mit der Zählung ohne Tabelle.
+    """
+    erwartet = [zaehle_verschachtelt(limits, leistungen) for leistungen in leistungen_je_thread]
+    with ThreadPoolExecutor(n_threads) as executor:
+        ergebnisse = list(executor.map(limits._check_limits, leistungen_je_thread))
+    return all([limit['result'] for limit in ergebnis['result']] == counts for ergebnis, counts in zip(ergebnisse, erwartet))
+
+class Limits:
+    params = [10, 100, 1000]
+    param_names = ['n_leistungen']
+
+    def setup(self, n_leistungen):
+        self.leistungen = erzeuge_leistungen(n_leistungen)
+
+    def time_check_limits(self, n_leistungen):
+        LimitsKernfach._check_limits(self.leistungen)
+
+    def time_verschachtelt(self, n_leistungen):
+        LimitsKernfach._evaluate_limits(zaehle_verschachtelt(LimitsKernfach, self.leistungen))
+
+    def time_threads(self, n_leistungen):
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(LimitsKernfach._check_limits, [self.leistungen] * 64))
+
+if __name__ == "__main__":
+    bench = Limits()
+    for n_leistungen in Limits.params:
+        bench.setup(n_leistungen)
+        for name in ['check_limits', 'verschachtelt', 'threads']:
+            dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(n_leistungen), number=20) / 20
+            print(f"{n_leistungen:5d} Leistungen  {name:14s} {dauer*1000:9.3f} ms")
+    korrekt = pruefe_parallel(LimitsKernfach, [erzeuge_leistungen(random.Random(seed).randrange(40), seed) for seed in range(256)])
+    print(f"Parallele Prüfung korrekt: {korrekt}")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Stationen der Notenberechnung vom Notenwert bis zum Plot
+"""
+import os
+import sys
+import io
+import timeit
+import tempfile
+import contextlib
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+class NoteArithmetik:
+    params = [SystemN, SystemNP]
+    param_names = ['system']
+
+    def setup(self, system):
+        lo, hi = system._get_lims()
+        werte = np.linspace(lo, hi, 1000)
+        self.entities = [NoteEntity(wert, system=system) for wert in werte]
+        self.values = [NoteValue(wert, system=system) for wert in werte]
+        self.werte = werte
+
+    def time_note_entity(self, system):
+        for wert in self.werte:
+            NoteEntity(wert, system=system)
+
+    def time_entity_arithmetik(self, system):
+        # Jedes Zwischenergebnis ist wieder ein NoteEntity und muss im Notenbereich liegen
+        for note in self.entities:
+            (note + 0) * 1
+
+    def time_value_arithmetik(self, system):
+        for note in self.values:
+            (note + 0) * 1
+
+    def time_runden(self, system):
+        for note in self.values:
+            note._get_HJ(text=True)
+            note._get_Z(text=True)
+
+class Gewichtung:
+    params = [10, 100, 1000]
+    param_names = ['n_noten']
+
+    def setup(self, n_noten):
+        leistungen = [LeistungKA(note=note, system=SystemN, date='2024-01-01') for note in np.linspace(1, 6, n_noten)]
+        self.ka = Weight(*leistungen[::2])
+        self.kt = Weight(*leistungen[1::2])
+        self.leistungen = leistungen
+
+    def time_weight(self, n_noten):
+        Weight(*self.leistungen)
+
+    def time_kombinieren(self, n_noten):
+        gesamt = self.ka.set_weight(3) + self.kt.set_weight(1)
+        gesamt.mean
+
+class Gesamtnote:
+    params = [10, 25, 60, 200]
+    param_names = ['n_leistungen']
+
+    def setup(self, n_leistungen):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.notenberechnung = erzeuge_notenberechnung(n_leistungen=n_leistungen, fach=None)
+
+    def time_berechne_gesamtnote(self, n_leistungen):
+        vergessen(self.notenberechnung).berechne_gesamtnote(show_warnings=False)
+
+    def time_time_series(self, n_leistungen):
+        vergessen(self.notenberechnung).time_series()
+
+    def time_check_limits(self, n_leistungen):
+        FachM.limits._check_limits(self.notenberechnung.noten)
+
+class Lerngruppe:
+    params = [30]
+    param_names = ['n_schueler']
+    timeout = 120
+
+    def setup(self, n_schueler):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.gruppe = erzeuge_lerngruppe(n_schueler=n_schueler)
+
+    def time_gesamtnoten(self, n_schueler):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for schueler in self.gruppe.schueler.values():
+                vergessen(schueler._notenberechnung).berechne_gesamtnote(show_warnings=False)
+
+    def time_dataframe(self, n_schueler):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.gruppe.get_dataframe()
+
+class Plot:
+    params = [25, 60]
+    param_names = ['n_leistungen']
+    timeout = 120
+
+    def setup(self, n_leistungen):
+        plt.switch_backend('Agg')
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.notenberechnung = erzeuge_notenberechnung(n_leistungen=n_leistungen)
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def teardown(self, n_leistungen):
+        self.tmp.cleanup()
+
+    def time_plot_time_series(self, n_leistungen):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.notenberechnung.plot_time_series(save=os.path.join(self.tmp.name, 'plot'), formats=['svg'], dpi=100)
+
+if __name__ == "__main__":
+    for klasse in [NoteArithmetik, Gewichtung, Gesamtnote, Lerngruppe, Plot]:
+        bench = klasse()
+        for param in klasse.params:
+            bench.setup(param)
+            for name in [name for name in dir(klasse) if name.startswith('time_')]:
+                anzahl = 3 if klasse in (Plot, Lerngruppe) else 20
+                dauer = timeit.timeit(lambda: getattr(bench, name)(param), number=anzahl) / anzahl
+                print(f"{klasse.__name__:15s} {getattr(param, '__name__', param)!s:8s} {name:26s} {dauer*1000:9.3f} ms")
+            if hasattr(bench, 'teardown'):
+                bench.teardown(param)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Kosten der Messpunkte (notenbildung.profil) mit und ohne aktives Profil
+"""
+import os
+import sys
+import io
+import timeit
+import contextlib
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+class Messpunkt:
+    def ohne(self):
+        return None
+
+    @profiliert('mit')
+    def mit(self):
+        return None
+
+class ProfilKosten:
+    params = [25, 200]
+    param_names = ['n_leistungen']
+
+    def setup(self, n_leistungen):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.notenberechnung = erzeuge_notenberechnung(n_leistungen=n_leistungen)
+        self.messpunkt = Messpunkt()
+
+    def time_berechne_gesamtnote(self, n_leistungen):
+        vergessen(self.notenberechnung).berechne_gesamtnote(show_warnings=False)
+
+    def time_berechne_gesamtnote_profil(self, n_leistungen):
+        with Profil():
+            vergessen(self.notenberechnung).berechne_gesamtnote(show_warnings=False)
+
+    def time_messpunkt_aus(self, n_leistungen):
+        for _ in range(1000):
+            self.messpunkt.mit()
+
+    def time_ohne_messpunkt(self, n_leistungen):
+        for _ in range(1000):
+            self.messpunkt.ohne()
+
+if __name__ == "__main__":
+    bench = ProfilKosten()
+    for n_leistungen in ProfilKosten.params:
+        bench.setup(n_leistungen)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name in ['berechne_gesamtnote', 'berechne_gesamtnote_profil', 'messpunkt_aus', 'ohne_messpunkt']:
+                dauer = min(timeit.repeat(lambda: getattr(bench, f'time_{name}')(n_leistungen), number=200, repeat=5)) / 200
+                print(f"{n_leistungen:4d} Leistungen  {name:28s} {dauer*1e6:9.1f} us", file=sys.stderr)
+
+        with Profil() as profil, contextlib.redirect_stdout(io.StringIO()):
+            vergessen(bench.notenberechnung).berechne_gesamtnote(show_warnings=False)
+        print(profil.bericht_text())
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Was-wäre-wenn-Abfragen ohne Kopie des Modells
+"""
+import os
+import sys
+import io
+import copy
+import timeit
+import contextlib
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+def mit_kopie(notenberechnung, **angaben):
+    """
+    Bisheriger Weg: Modell kopieren, Leistung hinzufügen und vollständig neu berechnen.
+    """
+    kopie = copy.deepcopy(notenberechnung)
+    kopie.note_hinzufuegen(**angaben)
+    return kopie.berechne_gesamtnote(show_warnings=False)
+
+def benoetigte_note_raster(notenberechnung, ziel, art='KA', schritt=0.01, **angaben):
+    """
+    Probieren aller Noten im Abstand schritt, zum Vergleich mit benoetigte_note.
+    """
+    lim_min, lim_max = notenberechnung.system._get_lims()
+    noten = np.arange(lim_min, lim_max + schritt / 2, schritt)
+    varianten = notenberechnung.varianten(art, noten, **angaben)
+    richtung = -1 if notenberechnung.system._is_inverted() else 1
+    erreicht = [note for note, variante in zip(noten, varianten) if richtung * (float(variante.gesamtnote) - ziel) >= 0]
+    if not erreicht:
+        return None
+    return max(erreicht) if richtung < 0 else min(erreicht)
+
+class Prognose:
+    params = [10, 25, 60]
+    param_names = ['n_leistungen']
+
+    def setup(self, n_leistungen):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.notenberechnung = erzeuge_notenberechnung(n_leistungen=n_leistungen, fach=None)
+            self.notenberechnung.berechne_gesamtnote(show_warnings=False)
+        self.angaben = {'art' : 'KA', 'note' : 2, 'date' : '2024-07-20'}
+        # Ziel ist die Gesamtnote mit einer 2.5 in der nächsten KA
+        self.ziel = float(self.notenberechnung.was_waere_wenn({**self.angaben, 'note' : 2.5}).gesamtnote)
+
+    def time_kopie(self, n_leistungen):
+        mit_kopie(self.notenberechnung, **self.angaben)
+
+    def time_was_waere_wenn(self, n_leistungen):
+        self.notenberechnung.was_waere_wenn(self.angaben)
+
+    def time_varianten(self, n_leistungen):
+        self.notenberechnung.varianten('KA', [1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5, 5.5, 6], date='2024-07-20')
+
+    def time_benoetigte_note(self, n_leistungen):
+        self.notenberechnung.benoetigte_note(self.ziel, art='KA', date='2024-07-20')
+
+    def time_raster(self, n_leistungen):
+        benoetigte_note_raster(self.notenberechnung, self.ziel, art='KA', date='2024-07-20')
+
+if __name__ == "__main__":
+    bench = Prognose()
+    for n_leistungen in Prognose.params:
+        bench.setup(n_leistungen)
+        for name in ['kopie', 'was_waere_wenn', 'varianten', 'benoetigte_note', 'raster']:
+            anzahl = 5 if name == 'raster' else 200
+            dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(n_leistungen), number=anzahl) / anzahl
+            print(f"{n_leistungen:3d} Leistungen  {name:16s} {dauer*1000:8.3f} ms")
+
+        # Ergebnisse gegen den bisherigen Weg prüfen
+        with contextlib.redirect_stdout(io.StringIO()):
+            gleich = all(float(bench.notenberechnung.was_waere_wenn({**bench.angaben, 'note' : note}).gesamtnote)
+                         == float(mit_kopie(bench.notenberechnung, **{**bench.angaben, 'note' : note}).gesamtnote)
+                         for note in [1, 2.25, 3.5, 4.75, 6])
+        geloest = bench.notenberechnung.benoetigte_note(bench.ziel, art='KA', date='2024-07-20')
+        raster = benoetigte_note_raster(bench.notenberechnung, bench.ziel, art='KA', date='2024-07-20')
+        print(f"    gleich wie mit Kopie: {gleich}, benoetigte_note {geloest} (Raster 0.01: {raster})")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Auswertung über alle Lerngruppen einer Schule (notenbildung.schule)
+"""
+import os
+import sys
+import io
+import timeit
+import tempfile
+import contextlib
+import importlib.util
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+from notenbildung.archiv import *
+from notenbildung.schule import *
+
+def je_gruppe(gruppen):
+    """
+    Bisheriger Weg: je Lerngruppe get_dataframe und die Klassenschnitte je Fach aus den zusammengefügten Tabellen.
+    """
+    tabellen = [gruppe.get_dataframe() for gruppe in gruppen]
+    tabelle = pd.concat(tabellen, ignore_index=True)
+    tabelle['note'] = [float(note) for note in tabelle['note']]
+    return tabelle.groupby(['fach', 'klasse'])['note'].mean()
+
+class Schulauswertung:
+    params = [10, 40]
+    param_names = ['n_klassen']
+    timeout = 600
+
+    def setup(self, n_klassen):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.gruppen = erzeuge_schule(n_klassen=n_klassen, n_schueler=30, n_leistungen=25)
+        self.schule = Schule(*self.gruppen)
+        self.schule.tabelle
+
+    def time_tabelle(self, n_klassen):
+        Schule(*self.gruppen).tabelle
+
+    def time_je_gruppe(self, n_klassen):
+        je_gruppe(self.gruppen)
+
+    def time_mittelwerte(self, n_klassen):
+        self.schule.mittelwerte(nach=['fach', 'klasse'])
+
+    def time_verteilung(self, n_klassen):
+        self.schule.verteilung()
+
+    def time_zeugnis(self, n_klassen):
+        self.schule.zeugnis()
+
+    def time_schueler(self, n_klassen):
+        for sid in range(0, 30):
+            self.schule.schueler(sid)
+
+    def track_schueler(self, n_klassen):
+        return len(self.schule)
+
+class SchuleArchiv:
+    params = [10, 40]
+    param_names = ['n_klassen']
+    timeout = 600
+
+    def setup(self, n_klassen):
+        if importlib.util.find_spec('pyarrow') is None:
+            raise NotImplementedError
+        with contextlib.redirect_stdout(io.StringIO()):
+            gruppen = erzeuge_schule(n_klassen=n_klassen, n_schueler=30, n_leistungen=25)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archiv = LerngruppenArchiv(self.tmp.name)
+        self.archiv.speichern(*gruppen)
+
+    def teardown(self, n_klassen):
+        self.tmp.cleanup()
+
+    def time_aus_archiv(self, n_klassen):
+        Schule.aus_archiv(self.archiv).tabelle
+
+    def time_lerngruppen(self, n_klassen):
+        # Zum Vergleich: Objekte wiederherstellen, Noten je Schüler berechnen
+        with contextlib.redirect_stdout(io.StringIO()):
+            Schule(*self.archiv.lerngruppen()).tabelle
+
+if __name__ == "__main__":
+    for klasse in [Schulauswertung, SchuleArchiv]:
+        bench = klasse()
+        for n_klassen in klasse.params:
+            bench.setup(n_klassen)
+            for name in [name for name in dir(klasse) if name.startswith('time_')]:
+                anzahl = 1 if name in ('time_lerngruppen', 'time_je_gruppe') else 5
+                with contextlib.redirect_stdout(io.StringIO()):
+                    dauer = timeit.timeit(lambda: getattr(bench, name)(n_klassen), number=anzahl) / anzahl
+                print(f"{klasse.__name__:16s} {n_klassen:3d} Klassen  {name:18s} {dauer*1000:9.2f} ms")
+            if hasattr(bench, 'teardown'):
+                bench.teardown(n_klassen)
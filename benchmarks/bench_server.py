@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Durchsatz und Antwortzeiten des HTTP-Dienstes (notenbildung.server) auf localhost
+"""
+import os
+import sys
+import json
+import time
+import random
+import threading
+import statistics
+import http.client
+from urllib.parse import urlparse
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from notenbildung.server import *
+
+def erzeuge_anfragen(n_schueler, n_leistungen=25, fach='M', seed=0):
+    rng = random.Random(seed)
+    arten = ['KA', 'KA', 'KT', 'KT', 'GFS', 'm', 'm', 'm']
+    anfragen = []
+    for sid in range(n_schueler):
+        leistungen = [{'art' : rng.choice(arten), 'note' : rng.choice([1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5]),
+                       'date' : f"2024-{rng.randint(1, 6):02d}-{rng.randint(1, 28):02d}"} for _ in range(n_leistungen)]
+        anfragen.append({'sid' : sid, 'fach' : fach, 'leistungen' : leistungen})
+    return anfragen
+
+class Client:
+    """
+    Eine Keep-Alive-Verbindung zum Dienst.
+    """
+    def __init__(self, url):
+        adresse = urlparse(url)
+        self.verbindung = http.client.HTTPConnection(adresse.hostname, adresse.port, timeout=30)
+
+    def post(self, pfad, daten):
+        self.verbindung.request('POST', pfad, body=json.dumps(daten), headers={'Content-Type' : 'application/json'})
+        antwort = self.verbindung.getresponse()
+        return antwort.status, json.loads(antwort.read())
+
+    def get(self, pfad):
+        self.verbindung.request('GET', pfad)
+        antwort = self.verbindung.getresponse()
+        return antwort.status, antwort.read().decode()
+
+    def close(self):
+        self.verbindung.close()
+
+def last(url, anfragen, n_clients=8):
+    """
+    Schickt die Anfragen einzeln an /note, verteilt auf n_clients Threads mit je einer Verbindung. Liefert Dauer,
+    Antwortzeiten und Ergebnisse (in der Reihenfolge der Anfragen).
+    """
+    ergebnisse = [None] * len(anfragen)
+    latenzen = [[] for _ in range(n_clients)]
+
+    def arbeiten(nummer):
+        client = Client(url)
+        for idx in range(nummer, len(anfragen), n_clients):
+            start = time.perf_counter()
+            ergebnisse[idx] = client.post('/note', anfragen[idx])[1]
+            latenzen[nummer].append(time.perf_counter() - start)
+        client.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=arbeiten, args=(nummer,)) for nummer in range(n_clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(sum(latenzen, [])), ergebnisse
+
+def quantil(werte, q):
+    return werte[min(len(werte) - 1, int(q * len(werte)))]
+
+class Server:
+    params = [1, 8]
+    param_names = ['n_clients']
+    timeout = 300
+
+    def setup(self, n_clients):
+        self.anfragen = erzeuge_anfragen(200)
+        self.server = NotenServer(port=0, workers=0)
+        self._kontext = self.server.im_hintergrund()
+        self.url = self._kontext.__enter__()
+
+    def teardown(self, n_clients):
+        self._kontext.__exit__(None, None, None)
+
+    def time_note(self, n_clients):
+        last(self.url, self.anfragen, n_clients)
+
+    def time_gruppe(self, n_clients):
+        client = Client(self.url)
+        client.post('/gruppe', {'fach' : 'M', 'schueler' : self.anfragen})
+        client.close()
+
+if __name__ == "__main__":
+    anfragen = erzeuge_anfragen(1000)
+    direkt = berechne_stapel(anfragen)
+
+    for workers in [0, None]:
+        with NotenServer(port=0, workers=workers).im_hintergrund() as url:
+            for n_clients in [1, 8, 32]:
+                dauer, latenzen, ergebnisse = last(url, anfragen, n_clients)
+                abweichungen = sum(ergebnis != erwartet for ergebnis, erwartet in zip(ergebnisse, direkt))
+                print(f"workers={str(workers):4s} {n_clients:3d} Clients  {len(anfragen) / dauer:7.0f} Anfragen/s  "
+                      f"p50 {quantil(latenzen, 0.5)*1000:6.1f} ms  p99 {quantil(latenzen, 0.99)*1000:6.1f} ms  {abweichungen} Abweichungen")
+
+            client = Client(url)
+            start = time.perf_counter()
+            status, antwort = client.post('/gruppe', {'schueler' : anfragen})
+            dauer = time.perf_counter() - start
+            abweichungen = sum(ergebnis != erwartet for ergebnis, erwartet in zip(antwort['ergebnisse'], direkt))
+            print(f"workers={str(workers):4s} /gruppe      {len(anfragen) / dauer:7.0f} Schüler/s  {abweichungen} Abweichungen")
+            stapel = [zeile for zeile in client.get('/metrics')[1].splitlines() if zeile.startswith('notenbildung_stapel_groesse_')]
+            print('  ' + '\n  '.join(stapel[-2:]))
+            client.close()
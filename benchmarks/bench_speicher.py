@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Speicherbedarf je Leistung (tracemalloc)
+"""
+import os
+import sys
+import io
+import gc
+import timeit
+import contextlib
+import tracemalloc
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+ARTEN = {'KA' : LeistungKA, 'KT' : LeistungKT, 'm' : LeistungM, 'E' : LeistungE, 'P' : LeistungP, 'S' : LeistungS, 'GFS' : LeistungGFS}
+
+def angaben(n_leistungen):
+    """
+    kwargs für n_leistungen Leistungen, verteilt auf Schüler mit je 25 Leistungen, die Datumsangaben als Text.
+    """
+    ergebnis = []
+    for sid in range(max(1, n_leistungen // 25)):
+        for note in erzeuge_noten(n_leistungen=25, seed=sid):
+            ergebnis.append({key : (value.strftime('%Y-%m-%d') if isinstance(value, datetime) else value) for key, value in note.items()})
+    return ergebnis[:n_leistungen]
+
+def bytes_je_objekt(erzeugen, anzahl):
+    """
+    Zuwachs der Python-Allokationen (tracemalloc) je erzeugtem Objekt, solange die Objekte gehalten werden. Ein
+    erster Durchlauf füllt vorab die Caches für Datumsangaben und Status.
+    """
+    erzeugen()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        vorher, _ = tracemalloc.get_traced_memory()
+        objekte = erzeugen()
+        gc.collect()
+        nachher, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del objekte
+    return (nachher - vorher) / anzahl
+
+class Speicher:
+    params = [1000, 10000]
+    param_names = ['n_leistungen']
+
+    def setup(self, n_leistungen):
+        self.text = angaben(n_leistungen)
+
+    def _leistungen(self, angaben, datetime_objekte=False):
+        """
+        datetime_objekte=True: jede Leistung erhält eigene datetime-Objekte, wie beim Lesen aus einer Datenbank oder
+        dem Archiv.
+        """
+        ergebnis = []
+        for note in angaben:
+            pars = {key : value for key, value in note.items() if key != 'art'}
+            if datetime_objekte:
+                pars = {key : (datetime.fromisoformat(value) if key in ('date', 'von') else value) for key, value in pars.items()}
+            ergebnis.append(ARTEN[note['art']](system=SystemN, **pars))
+        return ergebnis
+
+    def _notenberechnungen(self, angaben):
+        ergebnis = []
+        for idx in range(0, len(angaben), 25):
+            notenberechnung = Notenberechnung(fach=None, w_th=0.4, v_enabled=True)
+            with notenberechnung.stapel():
+                for note in angaben[idx:idx + 25]:
+                    notenberechnung.note_hinzufuegen(**note)
+            notenberechnung.berechne_gesamtnote(show_warnings=False)
+            ergebnis.append(notenberechnung)
+        return ergebnis
+
+    def track_bytes_je_leistung(self, n_leistungen):
+        return bytes_je_objekt(lambda: self._leistungen(self.text), n_leistungen)
+
+    def track_bytes_je_leistung_datetime(self, n_leistungen):
+        return bytes_je_objekt(lambda: self._leistungen(self.text, datetime_objekte=True), n_leistungen)
+
+    def track_bytes_je_leistung_modell(self, n_leistungen):
+        # inklusive Notenberechnung, Verkettung, Verbesserungen und Cache der Gesamtnote. Seit der Änderungsverfolgung
+        # kommen je Leistung etwa 60 Bytes für den Stand (_Stand) hinzu und je Objekt die zwischengespeicherten
+        # abgeleiteten Werte (Gewichte der Kategorien, letzte Gesamtnote), bei 25 Leistungen etwa 210 Bytes je Leistung
+        return bytes_je_objekt(lambda: self._notenberechnungen(self.text), n_leistungen)
+
+    def track_bytes_note_entity(self, n_leistungen):
+        return bytes_je_objekt(lambda: [NoteEntity(note['note'], system=SystemN) for note in self.text], n_leistungen)
+
+    def track_bytes_status(self, n_leistungen):
+        return bytes_je_objekt(lambda: [VerbesserungStatus(note['status']) for note in self.text], n_leistungen)
+
+    def time_leistungen(self, n_leistungen):
+        self._leistungen(self.text)
+
+if __name__ == "__main__":
+    bench = Speicher()
+    for n_leistungen in Speicher.params:
+        bench.setup(n_leistungen)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name in ['bytes_je_leistung', 'bytes_je_leistung_datetime', 'bytes_je_leistung_modell', 'bytes_note_entity', 'bytes_status']:
+                print(f"{n_leistungen:6d} Leistungen  {name:28s} {getattr(bench, f'track_{name}')(n_leistungen):8.1f} Bytes", file=sys.stderr)
+            dauer = timeit.timeit(lambda: bench.time_leistungen(n_leistungen), number=5) / 5
+        print(f"{n_leistungen:6d} Leistungen  {'Erzeugen':28s} {dauer*1000:8.2f} ms")
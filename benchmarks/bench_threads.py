@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark und Belastungsprobe: berechne_gesamtnote aus vielen Threads
+"""
+import os
+import sys
+import io
+import random
+import timeit
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+KONFIGURATIONEN = [ConfigNVO.konfiguration(w_th=w_th, w_s0=w_s0) for w_th in [0.25, 0.4] for w_s0 in [0, 1]]
+
+def anfrage(idx):
+    """
+    Eine Anfrage wie in einem Server: eigene Konfiguration, eigene Leistungen, eigenes Notenberechnungs-Objekt.
+    """
+    konfiguration = KONFIGURATIONEN[idx % len(KONFIGURATIONEN)]
+    notenberechnung = erzeuge_notenberechnung(n_leistungen=25, seed=idx, fach=FachM, konfiguration=konfiguration)
+    return ergebnis(notenberechnung)
+
+def ergebnis(notenberechnung):
+    note = notenberechnung.berechne_gesamtnote(show_warnings=False)
+    return (float(note.gesamtnote), float(note.m_s), float(note.m_m), len(notenberechnung._get_verbesserungen()))
+
+def belastungsprobe(n_anfragen=4000, n_objekte=50, n_threads=16):
+    """
+    Führt n_anfragen Berechnungen auf einem Threadpool aus: abwechselnd neue Objekte je Anfrage und gemeinsam
+    genutzte Objekte, die von vielen Threads gleichzeitig berechnet werden. Jedes Ergebnis wird mit der seriellen
+    Berechnung verglichen.
+    """
+    gemeinsam = [erzeuge_notenberechnung(n_leistungen=25, seed=idx, fach=FachM, konfiguration=KONFIGURATIONEN[idx % len(KONFIGURATIONEN)]) for idx in range(n_objekte)]
+    seriell = [anfrage(idx) for idx in range(n_objekte)]
+
+    def aufgabe(idx):
+        if idx % 2:
+            return ergebnis(gemeinsam[idx % n_objekte])
+        return anfrage(idx % n_objekte)
+
+    with ThreadPoolExecutor(n_threads) as executor:
+        parallel = list(executor.map(aufgabe, range(n_anfragen)))
+    return sum(wert != seriell[idx % n_objekte] for idx, wert in enumerate(parallel))
+
+def belastungsprobe_schreibend(n_runden=10, n_objekte=16, n_leistungen=40, n_vorab=10, n_threads=16, ohne_sperre=False, seed=0):
+    """
+    Gemeinsam genutzte Objekte werden aus vielen Threads zugleich verändert und berechnet: Leistungen einzeln mit
+    note_hinzufuegen oder zu dritt im stapel einfügen, dazwischen berechne_gesamtnote und time_series. Geprüft wird,
+    dass keine Aufgabe fehlschlägt, keine Leistung verloren geht oder doppelt eingefügt wird und die Gesamtnote am Ende
+    der seriellen Berechnung entspricht. Liefert die Anzahl der Verstöße über alle Runden.
+
+    Mit ohne_sperre=True wird die Sperre der Objekte durch einen wirkungslosen Kontext ersetzt. Die Wettläufe treten
+    zufällig auf, über mehrere Runden schlägt die Probe dann praktisch immer fehl.
+    """
+    rng = random.Random(seed)
+    serielle = [ergebnis(erzeuge_notenberechnung(n_leistungen=n_leistungen, seed=idx)) for idx in range(n_objekte)]
+
+    def aufgabe(args):
+        notenberechnung, art, noten = args
+        try:
+            if art == 'einzeln':
+                notenberechnung.note_hinzufuegen(**noten[0])
+            elif art == 'stapel':
+                with notenberechnung.stapel():
+                    for note in noten:
+                        notenberechnung.note_hinzufuegen(**note)
+            elif art == 'gesamtnote':
+                notenberechnung.berechne_gesamtnote(show_warnings=False)
+            else:
+                notenberechnung.time_series()
+        except Exception:
+            return 1
+        return 0
+
+    verstoesse = 0
+    for _ in range(n_runden):
+        gemeinsam, aufgaben = [], []
+        for idx in range(n_objekte):
+            noten = erzeuge_noten(n_leistungen=n_leistungen, seed=idx)
+            notenberechnung = Notenberechnung(w_th=0.4, v_enabled=True, fach=FachM)
+            for note in noten[:n_vorab]:
+                notenberechnung.note_hinzufuegen(**note)
+            if ohne_sperre:
+                notenberechnung._lock = contextlib.nullcontext()
+            gemeinsam.append(notenberechnung)
+
+            rest = noten[n_vorab:]
+            rng.shuffle(rest)
+            while rest:
+                anzahl = rng.choice([1, 3])
+                aufgaben.append((notenberechnung, 'stapel' if anzahl > 1 else 'einzeln', rest[:anzahl]))
+                del rest[:anzahl]
+                aufgaben.append((notenberechnung, rng.choice(['gesamtnote', 'time_series']), None))
+        rng.shuffle(aufgaben)
+
+        # Häufigere Threadwechsel, damit sich die Aufgaben möglichst oft mitten in einer Methode abwechseln
+        intervall = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(n_threads) as executor:
+                verstoesse += sum(executor.map(aufgabe, aufgaben))
+        finally:
+            sys.setswitchinterval(intervall)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            for idx, notenberechnung in enumerate(gemeinsam):
+                if len(notenberechnung.noten) != n_leistungen:
+                    verstoesse += 1
+                    continue
+                try:
+                    verstoesse += ergebnis(notenberechnung) != serielle[idx]
+                except Exception:
+                    verstoesse += 1
+    return verstoesse
+
+class Threads:
+    params = [1, 4, 16]
+    param_names = ['n_threads']
+
+    def setup(self, n_threads):
+        self.objekte = [erzeuge_notenberechnung(n_leistungen=25, seed=idx, fach=FachM) for idx in range(64)]
+
+    def time_gemeinsame_objekte(self, n_threads):
+        with ThreadPoolExecutor(n_threads) as executor:
+            list(executor.map(ergebnis, self.objekte * 4))
+
+    def time_anfragen(self, n_threads):
+        with ThreadPoolExecutor(n_threads) as executor:
+            list(executor.map(anfrage, range(256)))
+
+if __name__ == "__main__":
+    bench = Threads()
+    for n_threads in Threads.params:
+        bench.setup(n_threads)
+        for name in ['gemeinsame_objekte', 'anfragen']:
+            dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(n_threads), number=1)
+            print(f"{n_threads:3d} Threads  {name:18s} {dauer*1000:9.2f} ms")
+    abweichungen = belastungsprobe()
+    print(f"Belastungsprobe: {abweichungen} Abweichungen von der seriellen Berechnung")
+    print(f"Belastungsprobe schreibend: {belastungsprobe_schreibend()} Verstöße")
+    print(f"Belastungsprobe schreibend ohne Sperre: {belastungsprobe_schreibend(ohne_sperre=True)} Verstöße")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Zeitreihe einer Schülerin mit 60 Leistungen
+"""
+import os
+import sys
+import timeit
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+class TimeSeries:
+    params = [Notenberechnung, NotenberechnungSimple]
+    param_names = ['model']
+
+    def setup(self, model):
+        self.notenberechnung = erzeuge_notenberechnung(n_leistungen=60, model=model)
+
+    def time_reference(self, model):
+        self.notenberechnung._time_series_reference()
+
+    def time_incremental(self, model):
+        vergessen(self.notenberechnung).time_series()
+
+if __name__ == "__main__":
+    bench = TimeSeries()
+    for model in TimeSeries.params:
+        bench.setup(model)
+        for name in ['time_reference', 'time_incremental']:
+            runs = 10
+            dauer = timeit.timeit(lambda: getattr(bench, name)(model), number=runs) / runs
+            print(f"{model.__name__:24s} {name:18s} {dauer*1000:8.2f} ms")
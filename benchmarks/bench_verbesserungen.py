@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Auswertung der Verbesserungen
+"""
+import os
+import sys
+import io
+import timeit
+import contextlib
+import numpy as np
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+def leistungen_v(notenberechnung, mean):
+    """
+    Bisheriger Weg: ein LeistungV-Objekt je Leistung, danach Filtern der fehlenden Noten.
+    """
+    verbesserungen = [LeistungV(mean=mean, status=note.status, system=note.system, w_th=notenberechnung.w_th, date=note.date, due=note.status.due) for note in notenberechnung.noten]
+    verbesserungen = [verbesserung for verbesserung in verbesserungen if not np.isnan(verbesserung.note)]
+    nv1 = sum(1 for v in verbesserungen if v.count == False)
+    nv2 = sum(1 for v in verbesserungen if v.count == True)
+    return Weight(*verbesserungen), nv1, nv2
+
+def verbesserungen(notenberechnung, mean):
+    v = Verbesserungen(notenberechnung.noten, mean=mean, w_th=notenberechnung.w_th, system=notenberechnung.system)
+    return v.weight(), v.nv1, v.nv2
+
+class Verbesserung:
+    params = [25, 60, 200]
+    param_names = ['n_leistungen']
+
+    def setup(self, n_leistungen):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.notenberechnung = erzeuge_notenberechnung(n_leistungen=n_leistungen, fach=None)
+            self.notenberechnung.berechne_gesamtnote(show_warnings=False)
+        # Schnitt nahe der Rundungsgrenze, damit Verbesserungen zählen
+        self.mean = NoteValue(2.45, system=self.notenberechnung.system)
+        self.schnitte = np.random.default_rng(0).uniform(1, 6, 10000)
+
+    def time_leistungen_v(self, n_leistungen):
+        leistungen_v(self.notenberechnung, self.mean)
+
+    def time_verbesserungen(self, n_leistungen):
+        verbesserungen(self.notenberechnung, self.mean)
+
+    def time_calculate(self, n_leistungen):
+        self.notenberechnung._calculate()
+
+    def time_werte_skalar(self, n_leistungen):
+        [LeistungV._werte(schnitt, 0.4, SystemN) for schnitt in self.schnitte]
+
+    def time_werte_array(self, n_leistungen):
+        LeistungV._werte_array(self.schnitte, 0.4, SystemN)
+
+if __name__ == "__main__":
+    bench = Verbesserung()
+    for n_leistungen in Verbesserung.params:
+        bench.setup(n_leistungen)
+        for name in ['leistungen_v', 'verbesserungen', 'calculate']:
+            dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(n_leistungen), number=200) / 200
+            print(f"{n_leistungen:4d} Leistungen  {name:16s} {dauer*1000:8.3f} ms")
+        alt, neu = leistungen_v(bench.notenberechnung, bench.mean), verbesserungen(bench.notenberechnung, bench.mean)
+        gleich = float(alt[0].mean) == float(neu[0].mean) and alt[1:] == neu[1:] and alt[0]._anteile == neu[0]._anteile
+        print(f"    gleich wie mit LeistungV: {gleich}")
+    for name in ['werte_skalar', 'werte_array']:
+        dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(0), number=5) / 5
+        print(f"10000 Schnitte  {name:16s} {dauer*1000:8.3f} ms")
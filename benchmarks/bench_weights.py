@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Gesamtgewichtung tief verschachtelter Weight-Kombinationen
+"""
+import os
+import sys
+import timeit
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+# Für tiefe Ketten werden zusätzliche Leistungstypen benötigt, damit jeder Typ nur einmal vorkommt
+TYPEN = [LeistungKA, LeistungKT, LeistungGFS, LeistungS, LeistungP, LeistungE, LeistungM] + [type(f'Leistung{idx}', (LeistungKA,), {}) for idx in range(256)]
+
+class Knoten:
+    """
+    Bisherige Berechnung über einen Baum, der bei jedem Aufruf rekursiv durchlaufen wird, zum Vergleich.
+    """
+    def __init__(self, typen, w, left=None, right=None):
+        self.typen, self.w, self.left, self.right = typen, w, left, right
+
+    def __add__(self, other):
+        return Knoten([], self.w + other.w, left=self, right=other)
+
+    def gewichte(self):
+        gesamt = {}
+        for kind in (self.right, self.left):
+            teil = kind.gewichte() if kind.left is not None else {}
+            for type_ in kind.typen:
+                teil[type_] = kind.w / len(kind.typen)
+            summe = sum(teil.values())
+            for type_ in teil:
+                if type_ in gesamt:
+                    raise ValueError("Der Typ darf nur einfach vorkommen in der Gesamtgewichtung.")
+                gesamt[type_] = teil[type_] / summe * kind.w
+        summe = sum(gesamt.values())
+        return {type_ : wert / summe * (self.left.w + self.right.w) for type_, wert in gesamt.items()}
+
+def kette(n_ebenen, blatt):
+    """
+    Kombiniert n_ebenen Blätter nacheinander, jeweils mit einem eigenen Leistungstyp.
+    """
+    gesamt = blatt(TYPEN[0], 1)
+    for idx in range(1, n_ebenen):
+        gesamt = gesamt + blatt(TYPEN[idx], idx)
+    return gesamt
+
+class Weights:
+    params = [4, 32, 256]
+    param_names = ['n_ebenen']
+
+    def setup(self, n_ebenen):
+        self.blatt = lambda type_, w: Weight(type_(note=2, date='2024-01-01', system=SystemN)).set_weight(w)
+        self.weight = kette(n_ebenen, self.blatt)
+        self.knoten = kette(n_ebenen, lambda type_, w: Knoten([type_], w))
+
+    def time_kombinieren(self, n_ebenen):
+        kette(n_ebenen, self.blatt)
+
+    def time_percents(self, n_ebenen):
+        self.weight.calculate_percents()
+
+    def time_percents_rekursiv(self, n_ebenen):
+        self.knoten.gewichte()
+
+if __name__ == "__main__":
+    bench = Weights()
+    for n_ebenen in Weights.params:
+        bench.setup(n_ebenen)
+        for name in ['kombinieren', 'percents', 'percents_rekursiv']:
+            dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(n_ebenen), number=20) / 20
+            print(f"{n_ebenen:5d} Ebenen  {name:18s} {dauer*1000:9.3f} ms")
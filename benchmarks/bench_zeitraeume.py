@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Prüfung der Zeiträume mündlicher Noten
+"""
+import os
+import sys
+import itertools
+import timeit
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from benchmarks.generatoren import *
+
+def erzeuge_zeitraeume(n_zeitraeume, system=SystemN):
+    """
+    Kurze, lückenlos aufeinanderfolgende Zeiträume über ein Schuljahr, wie bei wöchentlich erfasster Mitarbeit.
+    """
+    start = datetime(2023, 9, 11)
+    schritt = timedelta(days=300) / n_zeitraeume
+    return [LeistungM(note=2, system=system, date=start + (idx + 1) * schritt - timedelta(seconds=1), von=start + idx * schritt)
+            for idx in range(n_zeitraeume)]
+
+def paare_kombinationen(leistungen):
+    """
+    Bisherige paarweise Prüfung, zum Vergleich.
+    """
+    return [pair for pair in itertools.combinations(leistungen, 2) if pair[0].von <= pair[1].bis and pair[0].bis >= pair[1].von]
+
+class Zeitraeume:
+    params = [40, 200, 1000]
+    param_names = ['n_zeitraeume']
+
+    def setup(self, n_zeitraeume):
+        self.leistungen = erzeuge_zeitraeume(n_zeitraeume)
+        self.notenberechnung = Notenberechnung(fach=FachM)
+        self.notenberechnung.leistungen_hinzufuegen(*erzeuge_zeitraeume(min(n_zeitraeume, 40), system=self.notenberechnung.system))
+
+    def time_sweep(self, n_zeitraeume):
+        ZeitraumIndex.paare(self.leistungen)
+
+    def time_inkrementell(self, n_zeitraeume):
+        index = ZeitraumIndex()
+        for leistung in self.leistungen:
+            index.hinzufuegen(leistung)
+
+    def time_kombinationen(self, n_zeitraeume):
+        paare_kombinationen(self.leistungen)
+
+    def time_time_series_wochen(self, n_zeitraeume):
+        vergessen(self.notenberechnung).time_series()
+
+if __name__ == "__main__":
+    bench = Zeitraeume()
+    for n_zeitraeume in Zeitraeume.params:
+        bench.setup(n_zeitraeume)
+        for name in ['sweep', 'inkrementell', 'kombinationen']:
+            dauer = timeit.timeit(lambda: getattr(bench, f'time_{name}')(n_zeitraeume), number=3) / 3
+            print(f"{n_zeitraeume:5d} Zeiträume  {name:14s} {dauer*1000:9.2f} ms")
+    dauer = timeit.timeit(lambda: bench.time_time_series_wochen(40), number=3) / 3
+    print(f"   40 Wochen     time_series    {dauer*1000:9.2f} ms")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetische Daten für die Benchmarks
+"""
+import os
+import sys
+import csv
+import json
+import random
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from notenbildung.models import *
+
+def erzeuge_noten(n_leistungen=60, seed=0, system=SystemN):
+    """
+    Erzeugt eine Liste von Notenangaben (kwargs für note_hinzufuegen) über ein Schuljahr. Die mündlichen Noten
+    decken aufeinanderfolgende, sich nicht überschneidende Zeiträume ab.
+    """
+    rng = random.Random(seed)
+    start = datetime(2023, 9, 11)
+    schritt = 300 / n_leistungen
+    lo, hi = system._get_lims()
+    noten = []
+    for idx in range(n_leistungen):
+        datum = start + timedelta(days=int(idx * schritt))
+        art = rng.choice(['KA', 'KT', 'm', 'm', 'KA', 'KT', 'E', 'P', 'S', 'GFS'])
+        note = {
+                'art' : art,
+                'date' : datum,
+                'note' : round(rng.uniform(lo, hi) * 4) / 4 if rng.random() < 0.7 else round(rng.uniform(lo, hi), 2),
+                'status' : rng.choice(['---', 'fertig', 'fehlt', 'uv']) if art in ['KA', 'KT'] else None,
+                }
+        if art == 'm' and noten:
+            note['von'] = noten[-1]['date'] + timedelta(days=1)
+            if note['von'] > datum:
+                note['von'] = datum
+        noten.append(note)
+    return noten
+
+def erzeuge_notenberechnung(n_leistungen=60, seed=0, model=Notenberechnung, fach=FachM, **kwargs):
+    config = {'w_th' : 0.4, 'v_enabled' : True, 'fach' : fach}
+    config.update(kwargs)
+    notenberechnung = model(**config)
+    for note in erzeuge_noten(n_leistungen=n_leistungen, seed=seed, system=notenberechnung.system):
+        notenberechnung.note_hinzufuegen(**note)
+    return notenberechnung
+
+def vergessen(notenberechnung):
+    """
+    Verwirft die Stände der Änderungsverfolgung, die nächste Berechnung erfolgt vollständig.
+    """
+    notenberechnung._staende.clear()
+    return notenberechnung
+
+def erzeuge_lerngruppe(n_schueler=30, n_leistungen=25, seed=0, fach=FachM, stufe=7, zug='a', **kwargs):
+    """
+    Erzeugt eine LerngruppeEntity mit n_schueler Schülern und je einer Notenberechnung über ein Schuljahr.
+    """
+    gruppe = LerngruppeEntity(stufe=stufe, zug=zug, fach=fach)
+    for sid in range(n_schueler):
+        schueler = SchuelerEntity(sid=sid, vorname=f'Vorname{sid}', nachname=f'Nachname{sid}')
+        schueler.setze_note(erzeuge_notenberechnung(n_leistungen=n_leistungen, seed=seed * 100003 + sid, fach=fach, **kwargs))
+        gruppe.update_sid(schueler)
+    return gruppe
+
+def erzeuge_schule(n_klassen=10, n_schueler=30, n_leistungen=25, faecher=(FachM, FachPH, FachINF), seed=0):
+    """
+    Erzeugt die Lerngruppen einer Schule: n_klassen Klassen mit je n_schueler Schülern, die in jedem Fach dieselben
+    sid haben. Die Notenberechnungen haben kein Fach, damit die Limits der Fächer die Anzahl der Leistungen nicht
+    begrenzen.
+    """
+    gruppen = []
+    for klasse in range(n_klassen):
+        stufe, zug = 5 + klasse % 6, 'abcdefghijklmnopqrstuvwxyz'[klasse // 6]
+        for nummer, fach in enumerate(faecher):
+            gruppe = LerngruppeEntity(stufe=stufe, zug=zug, fach=fach)
+            for idx in range(n_schueler):
+                sid = klasse * 1000 + idx
+                schueler = SchuelerEntity(sid=sid, vorname=f'Vorname{sid}', nachname=f'Nachname{sid}')
+                schueler.setze_note(erzeuge_notenberechnung(n_leistungen=n_leistungen, seed=(seed * 100003 + sid) * 31 + nummer, fach=None))
+                gruppe.update_sid(schueler)
+            gruppen.append(gruppe)
+    return gruppen
+
+def erzeuge_spalten(batch, n_schueler=30, n_leistungen=25, seed=0):
+    """
+    Erzeugt die Spalten für NotenberechnungBatch.berechne für eine Lerngruppe.
+    """
+    spalten = {'schueler' : [], 'art' : [], 'note' : [], 'datum' : [], 'status' : []}
+    for idx in range(n_schueler):
+        for note in erzeuge_noten(n_leistungen=n_leistungen, seed=seed * 100003 + idx, system=batch.system):
+            spalten['schueler'].append(idx)
+            spalten['art'].append(note['art'])
+            spalten['note'].append(note['note'])
+            spalten['datum'].append(note['date'])
+            spalten['status'].append(note['status'])
+    spalten['art'] = batch.art_codes(spalten['art'])
+    spalten['datum'] = np.array(spalten['datum'], dtype='datetime64[ns]')
+    spalten['n_schueler'] = n_schueler
+    return spalten
+
+def erzeuge_arbeitsmappe(file_path, n_tabellen=20, n_schueler=35, n_spalten=25, seed=0):
+    """
+    Schreibt eine Excel-Datei im Format von ExcelFileLoader mit einer Tabelle je Lerngruppe. Jede Spalte ist ein
+    Test mit Datum, einzelne Zellen bleiben leer oder enthalten die Note als Text.
+    """
+    rng = random.Random(seed)
+    start = datetime(2023, 9, 11)
+    arten = ['KA', 'KT', 'M', 'KA', 'KT', 'M', 'E', 'P', 'S', 'GFS']
+    with pd.ExcelWriter(file_path) as writer:
+        for idx in range(n_tabellen):
+            zaehler = {}
+            kopf = [['w_th=0,4', 'system=N', 'fach=M'], ['-', '-', '-']]
+            for spalte in range(n_spalten):
+                art = arten[spalte % len(arten)]
+                zaehler[art] = zaehler.get(art, 0) + 1
+                kopf[0].append(f'{art}{zaehler[art]}')
+                kopf[1].append((start + timedelta(days=int(spalte * 280 / n_spalten))).strftime('%Y-%m-%d'))
+            zeilen = kopf
+            for sid in range(n_schueler):
+                zeile = [idx * 1000 + sid, f'Vorname{sid}', f'Nachname{sid}']
+                for spalte in range(n_spalten):
+                    zufall = rng.random()
+                    note = round(rng.uniform(1, 6) * 4) / 4
+                    if zufall < 0.05 and not kopf[0][spalte + 3].startswith('KA'):
+                        note = None
+                    elif zufall < 0.1:
+                        note = str(note)
+                    zeile.append(note)
+                zeilen.append(zeile)
+            pd.DataFrame(zeilen).to_excel(writer, index=False, header=False, sheet_name=f'{5 + idx // 5}{"abcde"[idx % 5]}')
+    return file_path
+
+def erzeuge_datensaetze(file_path, n_schueler=1000, n_leistungen=25, fach='M', seed=0):
+    """
+    Schreibt Datensätze für `notenbildung berechnen` als JSON Lines oder CSV (nach Dateiendung), eine Zeile je
+    Leistung und die Leistungen eines Schülers aufeinanderfolgend.
+    """
+    felder = ['sid', 'fach', 'art', 'note', 'date', 'status', 'von']
+    with open(file_path, 'w', encoding='utf-8', newline='') as datei:
+        writer = csv.DictWriter(datei, fieldnames=felder, lineterminator='\n') if file_path.endswith('.csv') else None
+        if writer is not None:
+            writer.writeheader()
+        for sid in range(n_schueler):
+            for note in erzeuge_noten(n_leistungen=n_leistungen, seed=seed * 100003 + sid):
+                datensatz = {'sid' : sid, 'fach' : fach, **note}
+                datensatz['date'] = note['date'].strftime('%Y-%m-%d')
+                if 'von' in note:
+                    datensatz['von'] = note['von'].strftime('%Y-%m-%d')
+                if writer is not None:
+                    writer.writerow(datensatz)
+                else:
+                    datei.write(json.dumps(datensatz) + '\n')
+    return file_path
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spaltenorientiertes Archiv für Lerngruppen (Apache Parquet oder Arrow IPC)
+"""
+import os
+import re
+import sys
+import numbers
+import importlib.util
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from notenbildung.models import *
+from notenbildung.verzoegert import VerzoegertesModul
+
+# pyarrow ist optional (pip install notenbildung[archiv]) und wird erst beim Zugriff auf das Archiv geladen
+pa = VerzoegertesModul('pyarrow')
+pq = VerzoegertesModul('pyarrow.parquet')
+ds = VerzoegertesModul('pyarrow.dataset')
+pafs = VerzoegertesModul('pyarrow.fs')
+
+# Spalten wie in LerngruppeEntity.get_sid_dataframes(full=True)
+FRAME_SPALTEN = ['stufe', 'zug', 'fach', 'klasse', 'kurs', 'sid', 'vorname', 'nachname',
+                 'date', 'art', 'status', 'note', 'nr', 'von', 'bis', 'due']
+
+# Die Dateien liegen unter schuljahr=<Jahr>/fach=<Fach>/, beide Spalten stehen nur im Pfad
+PARTITION = ['schuljahr', 'fach']
+
+FORMATE = {'parquet' : ('parquet', '.parquet'), 'arrow' : ('ipc', '.arrow')}
+
+def _schema():
+    ts = pa.timestamp('us')
+    return pa.schema([
+                      ('stufe', pa.int8()),
+                      ('zug', pa.string()),
+                      ('klasse', pa.string()),
+                      ('kurs', pa.string()),
+                      ('sid', pa.string()),
+                      ('vorname', pa.string()),
+                      ('nachname', pa.string()),
+                      ('date', ts),
+                      ('art', pa.string()),
+                      ('status', pa.string()),
+                      ('note', pa.float64()),
+                      ('nr', pa.int32()),
+                      ('von', ts),
+                      ('bis', ts),
+                      ('due', ts),
+                      # für die verlustfreie Wiederherstellung
+                      ('system', pa.string()),
+                      ('status_eingabe', pa.string()),
+                      ('sid_ist_zahl', pa.bool_()),
+                      ('fach_klasse', pa.string()),
+                      ('modell', pa.string()),
+                      ('modell_fach', pa.string()),
+                      ('w_th', pa.float64()),
+                      ('w_s0', pa.float64()),
+                      ('w_sm', pa.float64()),
+                      ('n_KT_0', pa.int16()),
+                      ('v_enabled', pa.bool_()),
+                      ])
+
+def _partition_schema():
+    return pa.schema([('schuljahr', pa.int16()), ('fach', pa.string())])
+
+def _klassen(basis):
+    """
+    Alle (auch indirekten) Unterklassen nach Klassenname.
+    """
+    klassen = {}
+    offen = [basis]
+    while offen:
+        for klasse in offen.pop().__subclasses__():
+            klassen.setdefault(klasse.__name__, klasse)
+            offen.append(klasse)
+    return klassen
+
+def _klasse(basis, name):
+    klasse = _klassen(basis).get(name)
+    if klasse is None:
+        raise ValueError(f"Unbekannte Klasse im Archiv: {name}")
+    return klasse
+
+def _dateiname(gruppe):
+    name = gruppe._name() if gruppe.kurs == gruppe._name() else f"{gruppe._name()}_{gruppe.kurs}"
+    return re.sub(r'[^\w.-]', '_', name)
+
+def _spalten(gruppe):
+    """
+    Eine Zeile je Leistung inklusive Verbesserungen, in der Reihenfolge von get_sid_dataframes(full=True).
+    """
+    kopf = gruppe._get_group_vars_as_dict()
+    spalten = {name : [] for name in _schema().names}
+    for schueler in gruppe.schueler.values():
+        noten = schueler._notenberechnung
+        werte = {
+                 'stufe' : kopf['stufe'],
+                 'zug' : kopf['zug'],
+                 'klasse' : kopf['klasse'],
+                 'kurs' : kopf['kurs'],
+                 'sid' : str(schueler.sid),
+                 'vorname' : schueler.vorname,
+                 'nachname' : schueler.nachname,
+                 'sid_ist_zahl' : isinstance(schueler.sid, numbers.Integral),
+                 'fach_klasse' : gruppe.fach.__name__,
+                 'modell' : type(noten).__name__,
+                 # Leer für ein Modell ohne Fach, fehlende Werte stammen aus Archiven ohne diese Spalte
+                 'modell_fach' : noten._fach.__name__ if noten._fach is not None else '',
+                 'w_th' : noten.w_th,
+                 'w_s0' : noten.w_s0,
+                 'w_sm' : noten.w_sm,
+                 'n_KT_0' : noten.n_KT_0,
+                 'v_enabled' : bool(noten._v_enabled),
+                 }
+        for leistung in noten._get_leistungen_with_verbesserungen():
+            for name, wert in werte.items():
+                spalten[name].append(wert)
+            zeile = leistung._as_dict()
+            for name in ['date', 'art', 'status', 'nr', 'von', 'bis', 'due']:
+                spalten[name].append(zeile[name])
+            spalten['note'].append(float(leistung.note))
+            spalten['system'].append(leistung.note.system.__name__)
+            spalten['status_eingabe'].append(leistung.status._text)
+    return spalten
+
+class LerngruppenArchiv:
+    """
+    Speichert Lerngruppen spaltenweise in einem Verzeichnis, eine Datei je Lerngruppe unter
+    schuljahr=<Jahr>/fach=<Fach>/. Gelesen werden nur die benötigten Spalten, Bedingungen auf Schuljahr und Fach
+    wählen die Dateien aus, weitere Bedingungen (z.B. auf date oder sid) überspringen Zeilengruppen anhand ihrer
+    Statistiken. Die Dateien werden über Memory-Mapping gelesen.
+
+    archiv = LerngruppenArchiv('archiv')
+    loader = ExcelFileLoader('noten_2023.xlsx')
+    archiv.speichern(*(klasse.gruppe for klasse in loader.klassen))
+
+    noten = archiv.lesen(spalten=['schuljahr', 'klasse', 'art', 'note'], objekte=False, fach='M')
+    gruppen = archiv.lerngruppen(schuljahr=2023, klasse='07a')
+
+    format: 'parquet' (komprimiert, für das Archiv) oder 'arrow' (Arrow IPC, unkomprimiert, liest ohne Kopie)
+    zeilen_je_gruppe: Anzahl der Zeilen je Zeilengruppe bzw. Block
+    """
+    def __init__(self, pfad, format='parquet', zeilen_je_gruppe=64 * 1024):
+        if format not in FORMATE:
+            raise ValueError(f"Ungültiges Format: {format}. Möglich sind {', '.join(FORMATE)}.")
+        if importlib.util.find_spec('pyarrow') is None:
+            raise ImportError("Für das Archiv wird pyarrow benötigt: pip install notenbildung[archiv]")
+        self.pfad = os.path.abspath(pfad)
+        self.format = format
+        self.zeilen_je_gruppe = int(zeilen_je_gruppe)
+        os.makedirs(self.pfad, exist_ok=True)
+
+    def _datei(self, schuljahr, fach, name):
+        ordner = os.path.join(self.pfad, f"schuljahr={schuljahr}", f"fach={fach}")
+        return ordner, os.path.join(ordner, name + FORMATE[self.format][1])
+
+    def speichern(self, *gruppen):
+        """
+        Schreibt je Lerngruppe eine Datei. Eine bereits archivierte Lerngruppe (gleiches Schuljahr, Fach, Klasse
+        und Kurs) wird ersetzt. Liefert die Pfade der geschriebenen Dateien.
+        """
+        dateien = []
+        for gruppe in gruppen:
+            if not isinstance(gruppe, LerngruppeEntity):
+                raise ValueError("Archiviert werden können nur Objekte der Klasse LerngruppeEntity.")
+            schuljahr = gruppe._get_sj()
+            if schuljahr is None:
+                raise ValueError(f"Die Lerngruppe {gruppe._name()} enthält keine Leistungen.")
+            spalten = _spalten(gruppe)
+            tabelle = pa.table({name : pa.array(spalten[name], type=feld.type) for name, feld in zip(_schema().names, _schema())}, schema=_schema())
+            ordner, datei = self._datei(schuljahr, gruppe.fach.name, _dateiname(gruppe))
+            os.makedirs(ordner, exist_ok=True)
+            # Erst vollständig schreiben, dann ersetzen: Leser sehen nie eine halbe Datei
+            temp = os.path.join(ordner, '.' + os.path.basename(datei) + '.tmp')
+            if self.format == 'parquet':
+                pq.write_table(tabelle, temp, row_group_size=self.zeilen_je_gruppe)
+            else:
+                with pa.ipc.new_file(temp, tabelle.schema) as writer:
+                    writer.write_table(tabelle, max_chunksize=self.zeilen_je_gruppe)
+            os.replace(temp, datei)
+            dateien.append(datei)
+        return dateien
+
+    def _dataset(self):
+        schema = pa.schema(list(_schema()) + list(_partition_schema()))
+        return ds.dataset(self.pfad, schema=schema, format=FORMATE[self.format][0],
+                          partitioning=ds.partitioning(_partition_schema(), flavor='hive'),
+                          filesystem=pafs.LocalFileSystem(use_mmap=True))
+
+    def tabelle(self, spalten=None, filter=None, **gleich):
+        """
+        Liest das Archiv als pyarrow.Table mit den angegebenen Spalten (None: alle). Bedingungen wie fach='M' oder
+        schuljahr=[2021, 2022] werden verknüpft, filter nimmt zusätzlich einen Ausdruck aus pyarrow.dataset.
+        """
+        ausdruck = filter
+        for spalte, wert in gleich.items():
+            if isinstance(wert, (list, tuple, set)):
+                bedingung = ds.field(spalte).isin(list(wert))
+            else:
+                bedingung = ds.field(spalte) == wert
+            ausdruck = bedingung if ausdruck is None else ausdruck & bedingung
+        return self._dataset().to_table(columns=spalten, filter=ausdruck)
+
+    def lesen(self, spalten=None, filter=None, objekte=True, **gleich):
+        """
+        Liest das Archiv als DataFrame, ohne Angabe der Spalten in der Form von get_sid_dataframes(full=True).
+
+        objekte=True: note als NoteEntity und sid mit dem ursprünglichen Typ, wie in get_sid_dataframes.
+        objekte=False: die Spalten direkt aus Arrow (note als Zahl, sid als Text), für Auswertungen über viele
+        Schuljahre deutlich schneller.
+        """
+        spalten = list(spalten or FRAME_SPALTEN)
+        if not objekte:
+            return self.tabelle(spalten=spalten, filter=filter, **gleich).to_pandas()
+
+        zusatz = {'note' : 'system', 'sid' : 'sid_ist_zahl'}
+        benoetigt = spalten + [zusatz[name] for name in spalten if name in zusatz and zusatz[name] not in spalten]
+        tabelle = self.tabelle(spalten=benoetigt, filter=filter, **gleich)
+        daten = {}
+        for name in spalten:
+            werte = tabelle.column(name).to_pylist()
+            if name == 'note':
+                systeme = _klassen(SystemGeneric)
+                werte = [NoteEntity(None if np.isnan(wert) else wert, system=systeme[system])
+                         for wert, system in zip(werte, tabelle.column('system').to_pylist())]
+            elif name == 'sid':
+                werte = [int(sid) if zahl else sid for sid, zahl in zip(werte, tabelle.column('sid_ist_zahl').to_pylist())]
+            daten[name] = werte
+        return pd.DataFrame(daten, columns=spalten)
+
+    def lerngruppen(self, filter=None, **gleich):
+        """
+        Stellt die Lerngruppen mit Schülern, Modell, Konfiguration und Leistungen wieder her und berechnet die
+        Gesamtnoten. Die Bedingungen sollten ganze Lerngruppen auswählen (schuljahr, fach, klasse, kurs), da
+        sonst nur ein Teil der Leistungen übernommen wird. Verbesserungen werden aus dem Status neu berechnet.
+        """
+        spalten = self.tabelle(filter=filter, **gleich).to_pydict()
+        systeme = _klassen(SystemGeneric)
+        gruppen = {}
+        schueler = {}
+        for idx in range(len(spalten['sid'])):
+            zeile = {name : werte[idx] for name, werte in spalten.items()}
+            key = (zeile['schuljahr'], zeile['fach_klasse'], zeile['klasse'], zeile['kurs'])
+            gruppe = gruppen.get(key)
+            if gruppe is None:
+                gruppe = LerngruppeEntity(stufe=zeile['stufe'], zug=zeile['zug'], kurs=zeile['kurs'],
+                                          fach=_klasse(FachGeneric, zeile['fach_klasse']))
+                gruppen[key] = gruppe
+            sid = int(zeile['sid']) if zeile['sid_ist_zahl'] else zeile['sid']
+            eintrag = schueler.get(key + (sid,))
+            if eintrag is None:
+                modell = _klasse(NotenberechnungGeneric, zeile['modell'])
+                modell_fach = zeile['modell_fach']
+                if modell_fach is None:
+                    # Ältere Archive ohne modell_fach: wie beim Schreiben das Fach der Lerngruppe
+                    modell_fach = zeile['fach_klasse']
+                noten = modell(w_th=zeile['w_th'], w_s0=zeile['w_s0'], w_sm=zeile['w_sm'], n_KT_0=zeile['n_KT_0'],
+                               v_enabled=zeile['v_enabled'], system=systeme[zeile['system']],
+                               fach=_klasse(FachGeneric, modell_fach) if modell_fach else None)
+                arten = {}
+                for Leistung in noten._get_list_of_allowed_leistungen():
+                    arten.setdefault(Leistung._art, Leistung)
+                eintrag = (SchuelerEntity(sid=sid, vorname=zeile['vorname'], nachname=zeile['nachname']), noten, arten, [])
+                schueler[key + (sid,)] = eintrag
+            # Verbesserungen ergeben sich aus dem Status der Leistungen
+            if zeile['art'] == 'V':
+                continue
+            Leistung = eintrag[2].get(zeile['art'])
+            if Leistung is None:
+                raise ValueError(f"Die Art {zeile['art']} ist im Modell {zeile['modell']} nicht vorgesehen.")
+            eintrag[3].append(Leistung(note=None if np.isnan(zeile['note']) else zeile['note'], system=systeme[zeile['system']],
+                                       date=zeile['date'], status=zeile['status_eingabe'], nr=zeile['nr'],
+                                       von=zeile['von'], bis=zeile['bis'], due=zeile['due']))
+
+        for key, (entity, noten, _, leistungen) in schueler.items():
+            noten.leistungen_hinzufuegen(*leistungen)
+            entity.setze_note(noten)
+            gruppen[key[:4]].update_sid(entity)
+        return list(gruppen.values())
+
+    def inhalt(self):
+        """
+        Übersicht der archivierten Lerngruppen mit Anzahl der Schüler und Leistungen.
+        """
+        tabelle = self.tabelle(spalten=['schuljahr', 'fach', 'klasse', 'kurs', 'sid'])
+        if tabelle.num_rows == 0:
+            return pd.DataFrame(columns=['schuljahr', 'fach', 'klasse', 'kurs', 'schueler', 'leistungen'])
+        uebersicht = tabelle.group_by(['schuljahr', 'fach', 'klasse', 'kurs'], use_threads=False).aggregate([('sid', 'count_distinct'), ('sid', 'count')])
+        return uebersicht.to_pandas().rename(columns={'sid_count_distinct' : 'schueler', 'sid_count' : 'leistungen'})
+
+    def __repr__(self):
+        return f"LerngruppenArchiv({self.pfad}, {self.format})"
+
+if __name__ == "__main__":
+    pass
+    # Beispiel
+    archiv = LerngruppenArchiv('archiv')
+    gruppe = LerngruppeEntity(stufe=7, zug='a', fach=FachM)
+    schueler = SchuelerEntity(sid=1, vorname='Max', nachname='Mustermann')
+    noten = Notenberechnung(fach=FachM, w_th=0.4, v_enabled=True)
+    noten.note_hinzufuegen(art='KA', date='2023-10-10', note=2.5, status='fertig')
+    noten.note_hinzufuegen(art='m', date='2023-11-10', note=2, von='2023-09-15')
+    schueler.setze_note(noten)
+    gruppe.update_sid(schueler)
+    archiv.speichern(gruppe)
+    print(archiv.inhalt())
+    print(archiv.lesen(fach='M'))
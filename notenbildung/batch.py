@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vektorisierte Notenberechnung für ganze Lerngruppen
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from notenbildung.models import *
+
+def _grouped_mean(werte, gruppen, n_gruppen):
+    """
+    Berechnet den Mittelwert und die Anzahl der Werte je Gruppe. Gruppen gleicher Größe werden als Zeilen einer
+    Matrix reduziert, sodass jeder Mittelwert bitgleich mit np.mean über die Werte der Gruppe in ihrer Reihenfolge ist.
+    """
+    order = np.argsort(gruppen, kind='stable')
+    werte = np.asarray(werte, dtype=float)[order]
+    counts = np.bincount(gruppen, minlength=n_gruppen)
+    starts = np.cumsum(counts) - counts
+    means = np.full(n_gruppen, np.nan)
+    for n in np.unique(counts[counts > 0]):
+        idx = np.flatnonzero(counts == n)
+        means[idx] = np.add.reduce(werte[starts[idx, None] + np.arange(n)], axis=1) / n
+    return means, counts
+
+def _combine(mean_a, w_a, mean_b, w_b):
+    """
+    Vektorisierte Entsprechung von Weight.__add__. Fehlende Mittelwerte sind NaN, ihr Gewicht wird ignoriert.
+    """
+    has_a = ~np.isnan(mean_a)
+    has_b = ~np.isnan(mean_b)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        w = np.where(has_a & has_b, w_a + w_b, np.where(has_a, w_a, w_b))
+        mean = np.where(has_a & has_b, (mean_a*w_a + mean_b*w_b)/(w_a + w_b), np.where(has_a, mean_a, mean_b))
+    return mean, np.where(has_a | has_b, w, np.nan)
+
+class NotenberechnungBatch:
+    """
+    Berechnet die Noten vieler Schüler gleichzeitig. Die Leistungen werden spaltenweise als NumPy-Arrays übergeben
+    und m_s1, m_s, m_m und die Gesamtnote werden mit gruppierten Reduktionen für alle Schüler auf einmal berechnet.
+    Die Ergebnisse sind bitgleich mit berechne_gesamtnote der Modelle Notenberechnung und NotenberechnungSimple.
+
+    Die strukturellen Prüfungen (Schuljahr, Nummerierung, Zeiträume, Limits) finden weiterhin nur in den
+    Notenberechnungs-Objekten statt. Hier werden lediglich die Notenwerte auf den Bereich des Notensystems geprüft.
+    """
+    _kategorien = ['KA', 'KT', 'm']
+    _status_codes = Verbesserungen._status_codes
+
+    def __init__(self, model=Notenberechnung, **kwargs):
+        calculate = next(klasse for klasse in model.__mro__ if '_calculate' in klasse.__dict__)
+        if calculate not in (Notenberechnung, NotenberechnungSimple):
+            raise ValueError("Die Batch-Berechnung ist nur für Notenberechnung und NotenberechnungSimple verfügbar.")
+        self._kernel = calculate
+
+        # Die Konfiguration wird über das Modell validiert
+        self.config = model(**kwargs)
+        self.system = self.config.system
+        self.arten = self.config._get_list_of_allowed_leistungen()
+
+        self._art_kategorie = np.array([next(self._kategorien.index(key) for key, types in self.config._leistungs_types.items() if art in types) for art in self.arten])
+        self._art_status = np.array([art(note=None, system=self.system, date=datetime(2000, 1, 1), status='fertig').status._enabled for art in self.arten])
+
+    def art_codes(self, arten):
+        """
+        Wandelt Bezeichnungen wie 'KA', 'kt' oder 'm' in die Codes der Spalte art um.
+        """
+        lookup = {art._art.lower(): idx for idx, art in enumerate(self.arten)}
+        # Jede Bezeichnung nur einmal nachschlagen
+        inverse, werte = pd.factorize(np.asarray(arten, dtype=object), use_na_sentinel=False)
+        try:
+            codes = np.array([lookup[str(art).lower()] for art in werte], dtype=np.intp)
+        except KeyError as e:
+            raise ValueError(f'Ungültige Art der Note: {e.args[0]}')
+        return codes[inverse]
+
+    def spalten(self, notenberechnungen):
+        """
+        Erzeugt die Spalten für berechne aus einer Liste von Notenberechnungs-Objekten. Der Schülerindex ist die
+        Position in der Liste.
+        """
+        rows = [(idx, self.arten.index(type(leistung)), float(leistung.note), leistung.date, leistung.status._text, leistung.status.due)
+                for idx, notenberechnung in enumerate(notenberechnungen) for leistung in notenberechnung.noten]
+        schueler, art, note, datum, status, due = zip(*rows) if rows else ([], [], [], [], [], [])
+        return {
+                'schueler' : np.array(schueler, dtype=np.intp),
+                'art' : np.array(art, dtype=np.intp),
+                'note' : np.array(note, dtype=float),
+                'datum' : np.array(datum, dtype='datetime64[ns]'),
+                'status' : np.array(status, dtype=object),
+                'due' : np.array([d if d is not None else np.datetime64('NaT') for d in due], dtype='datetime64[ns]'),
+                'n_schueler' : len(notenberechnungen),
+                }
+
+    def _status(self, status, due, art, jetzt):
+        """
+        Kodiert den Verbesserungsstatus je Leistung: -1 ohne Verbesserung, 0 offen, 1 fehlt, 2 fertig.
+        """
+        codes = np.full(len(art), -1, dtype=np.intp)
+        if status is None:
+            return codes
+        status = pd.Series(np.asarray(status, dtype=object))
+        lookup = {}
+        for text in status.unique():
+            verbesserung = VerbesserungStatus(text)
+            lookup[text] = self._status_codes[verbesserung.status] if verbesserung._enabled else -1
+        codes = status.map(lookup).to_numpy(dtype=np.intp, copy=True)
+        if due is not None:
+            jetzt = np.datetime64(jetzt if jetzt is not None else Stichtag.jetzt(), 'ns')
+            abgelaufen = (status.to_numpy() == 'offen') & (np.asarray(due, dtype='datetime64[ns]') < jetzt)
+            codes[abgelaufen & (codes >= 0)] = self._status_codes[False]
+        codes[~self._art_status[art]] = -1
+        return codes
+
+    def berechne(self, schueler, art, note, datum, status=None, due=None, n_schueler=None, jetzt=None):
+        """
+        Berechnet die Noten aller Schüler.
+
+        schueler: Index des Schülers (0 ... n_schueler-1) je Leistung
+        art: Code der Leistungsart als Index in self.arten (siehe art_codes)
+        note: Notenwert, NaN für fehlende Noten
+        datum: Datum der Leistung (datetime64)
+        status: Verbesserungsstatus als Text ('---', 'fertig', 'fehlt', 'uv', 'offen')
+        due: Frist der Verbesserung (datetime64, NaT ohne Frist)
+        jetzt: Stichtag für die Fristen, ohne Angabe gilt Stichtag.jetzt()
+
+        Gibt ein dict mit Arrays für m_s1, m_s, m_m, gesamtnote und datum je Schüler zurück. Schüler, deren Note
+        berechne_gesamtnote nicht berechnen kann (z.B. nur fehlende Noten), erhalten NaN und werden unter fehler
+        als Array ihrer Indizes gemeldet, die übrigen Schüler werden trotzdem berechnet.
+        """
+        schueler = np.asarray(schueler, dtype=np.intp)
+        art = np.asarray(art, dtype=np.intp)
+        note = np.asarray(note, dtype=float)
+        datum = np.asarray(datum, dtype='datetime64[ns]')
+        n_schueler = int(n_schueler) if n_schueler is not None else (int(schueler.max()) + 1 if len(schueler) else 0)
+
+        if not len(schueler) == len(art) == len(note) == len(datum):
+            raise ValueError("Alle Spalten müssen die gleiche Länge haben.")
+        if len(art) and (art.min() < 0 or art.max() >= len(self.arten)):
+            raise ValueError("Ungültiger Code für die Art der Note.")
+        sys_min, sys_max = self.system._get_lims()
+        if np.any((note < sys_min) | (note > sys_max)):
+            raise ValueError(f'Die Noten müssen zwischen {sys_min} und {sys_max} liegen.')
+
+        codes = self._status(status, due, art, jetzt)
+
+        # Sortierung nach Schüler und Datum wie in _sort_grade_after_date
+        order = np.lexsort((datum, schueler))
+        schueler, art, note, datum, codes = schueler[order], art[order], note[order], datum[order], codes[order]
+        kategorie = self._art_kategorie[art]
+        valid = ~np.isnan(note)
+
+        spalten = {
+                    'schueler' : schueler,
+                    'kategorie' : kategorie,
+                    'note' : note,
+                    'valid' : valid,
+                    'codes' : codes,
+                    'n_schueler' : n_schueler,
+                    }
+        if self._kernel is Notenberechnung:
+            result = self._berechne_notenberechnung(**spalten)
+        else:
+            result = self._berechne_simple(**spalten)
+
+        fehler = result.pop('_fehler')
+        for key in ['m_s1', 'm_s', 'm_m', 'gesamtnote']:
+            result[key][fehler] = np.nan
+        result['fehler'] = np.flatnonzero(fehler)
+
+        letzte = np.full(n_schueler, np.datetime64('NaT'), dtype='datetime64[ns]')
+        letzte[schueler] = datum
+        result['datum'] = letzte
+
+        for key in ['m_s1', 'm_s', 'm_m', 'gesamtnote']:
+            if np.any((result[key] < sys_min) | (result[key] > sys_max)):
+                raise ValueError(f'Die Note {key} muss zwischen {sys_min} und {sys_max} liegen.')
+        return result
+
+    def _kategorie(self, key, schueler, kategorie, note, valid, n_schueler):
+        maske = kategorie == self._kategorien.index(key)
+        n = np.bincount(schueler[maske], minlength=n_schueler)
+        mean, n_valid = _grouped_mean(note[maske & valid], schueler[maske & valid], n_schueler)
+        return n, n_valid, mean
+
+    def _berechne_notenberechnung(self, schueler, kategorie, note, valid, codes, n_schueler):
+        n_KA, valid_KA, mean_KA = self._kategorie('KA', schueler, kategorie, note, valid, n_schueler)
+        n_KT, valid_KT, mean_KT = self._kategorie('KT', schueler, kategorie, note, valid, n_schueler)
+        n_m, _, m_m = self._kategorie('m', schueler, kategorie, note, valid, n_schueler)
+        nur_muendlich = (n_KA + n_KT == 0) & (n_m > 0)
+        schriftlich = n_KA + n_KT > 0
+
+        w_s = np.where(n_KT < self.config.n_KT_0, n_KT * self.config.w_s0/self.config.n_KT_0, self.config.w_s0)
+        m_s1, w_1 = _combine(mean_KA, valid_KA, mean_KT, w_s)
+        m_s = m_s1
+
+        enabled = codes >= 0
+        v_enabled = (np.bincount(schueler[enabled], minlength=n_schueler) > 0) & self.config._v_enabled
+        # Ohne gültige schriftliche Note können die Verbesserungen nicht ausgewertet werden
+        fehler = np.zeros(n_schueler, dtype=bool)
+        if self.config._v_enabled and self.config.w_th != 0:
+            w_th = self.config.w_th
+            fehler = v_enabled & schriftlich & np.isnan(m_s1)
+            # Verbesserungsregel für alle Schüler gemeinsam
+            w_d, w_v1, w_v2 = LeistungV._werte_array(m_s1, w_th, self.system)
+            w_v3 = abs(self.system._get_range()/w_th)
+
+            s_v = schueler[enabled]
+            c_v = codes[enabled]
+            werte = np.choose(c_v, [m_s1[s_v], w_v1[s_v], w_v2[s_v]])
+            mean_V, _ = _grouped_mean(werte, s_v, n_schueler)
+            nv1 = np.bincount(s_v[c_v == 1], minlength=n_schueler)
+            nv2 = np.bincount(s_v[c_v == 2], minlength=n_schueler)
+
+            anwenden = v_enabled & schriftlich & (w_d < 1) & (nv1 != nv2)
+            with np.errstate(invalid='ignore'):
+                m_s = np.where(anwenden, (m_s1*w_1 + mean_V*w_v3)/(w_1 + w_v3), m_s1)
+
+        gesamtnote, _ = _combine(m_s, self.config.w_sm, m_m, 1)
+
+        return {
+                'm_s1' : np.where(nur_muendlich, np.nan, m_s1),
+                'm_s' : np.where(nur_muendlich, np.nan, m_s),
+                'm_m' : m_m,
+                'gesamtnote' : np.where(nur_muendlich, m_m, gesamtnote),
+                '_fehler' : fehler,
+                }
+
+    def _berechne_simple(self, schueler, kategorie, note, valid, codes, n_schueler):
+        n_KA, valid_KA, mean_KA = self._kategorie('KA', schueler, kategorie, note, valid, n_schueler)
+        _, valid_KT, mean_KT = self._kategorie('KT', schueler, kategorie, note, valid, n_schueler)
+        n_m, valid_m, m_m = self._kategorie('m', schueler, kategorie, note, valid, n_schueler)
+
+        # Schüler mit Leistungen, aber ohne gültige Note
+        hat_noten = np.bincount(schueler, minlength=n_schueler) > 0
+        fehler = hat_noten & (valid_KA + valid_KT + valid_m == 0)
+        nur_muendlich = (valid_KA + valid_KT == 0) & (valid_m > 0)
+
+        w_s = np.where(valid_KT < self.config.n_KT_0, valid_KT * self.config.w_s0/self.config.n_KT_0, self.config.w_s0)
+        m_s, _ = _combine(mean_KA, valid_KA, mean_KT, w_s)
+        gesamtnote, _ = _combine(m_s, self.config.w_sm, m_m, 1)
+
+        return {
+                'm_s1' : np.full(n_schueler, np.nan),
+                'm_s' : np.where(nur_muendlich, np.nan, m_s),
+                'm_m' : m_m,
+                'gesamtnote' : np.where(nur_muendlich, m_m, gesamtnote),
+                '_fehler' : fehler,
+                }
+
+    def note(self, result, idx):
+        """
+        Erzeugt das Note-Objekt eines Schülers aus dem Ergebnis von berechne, None für Schüler ohne Leistungen oder
+        mit Fehler.
+        """
+        if np.isnat(result['datum'][idx]) or idx in result['fehler']:
+            return None
+        werte = {key: (None if np.isnan(result[key][idx]) else float(result[key][idx])) for key in ['m_s1', 'm_s', 'm_m', 'gesamtnote']}
+        return Note(datum=pd.Timestamp(result['datum'][idx]).to_pydatetime(), system=self.system, **werte)
+
+if __name__ == "__main__":
+    pass
+    # Beispiel
+    batch = NotenberechnungBatch(model=Notenberechnung, w_s0=1, w_sm=3, system=SystemN, v_enabled=True, w_th=0.4)
+    result = batch.berechne(
+                            schueler = [0, 0, 0, 1, 1, 1],
+                            art = batch.art_codes(['KA', 'KT', 'm', 'KA', 'KA', 'm']),
+                            note = [2.5, 3.0, 2.0, 4.0, 3.5, 1.5],
+                            datum = np.array(['2023-10-01', '2023-11-01', '2023-12-01', '2023-10-01', '2023-11-01', '2023-12-01'], dtype='datetime64[ns]'),
+                            status = ['fertig', '---', '---', 'fehlt', '---', '---'],
+                            )
+    print(batch.note(result, 0))
+    print(batch.note(result, 1))
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistenter Cache für berechnete Noten
+"""
+import os
+import sys
+import time
+import pickle
+import sqlite3
+import atexit
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+
+class NotenCache:
+    """
+    Speichert berechnete Noten und Zeitreihen in einer SQLite-Datenbank. Die Schlüssel sind Prüfsummen über die
+    Leistungen, die Konfiguration, das Modell und die Paketversion (siehe NotenberechnungGeneric._fingerprint).
+    Ändert sich eine dieser Angaben, wird der Eintrag nicht mehr gefunden und neu berechnet.
+
+    Alte Einträge werden nach dem Prinzip LRU entfernt, sobald die Einträge zusammen größer als max_groesse Bytes
+    sind oder länger als max_alter Sekunden nicht verwendet wurden.
+
+    cache = NotenCache()
+    notenberechnung = Notenberechnung(fach=FachM, cache=cache)
+    ...
+    print(cache.statistik())
+    """
+    _schreiben_nach = 100
+    _aufraeumen_nach = 1000
+
+    def __init__(self, path=None, max_groesse=64*2**20, max_alter=None):
+        if path is None:
+            basis = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+            path = os.path.join(basis, 'notenbildung', 'noten.sqlite')
+        if path != ':memory:':
+            path = os.path.abspath(path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_groesse = max_groesse
+        self.max_alter = max_alter
+        self.treffer = 0
+        self.fehlschlaege = 0
+        self._neu = 0
+        self._offen = 0
+        self._zugriffe = {}
+        self._lock = threading.Lock()
+        self._verbinden()
+        atexit.register(self.speichern)
+
+    def _verbinden(self):
+        self._db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS eintraege (key TEXT PRIMARY KEY, wert BLOB NOT NULL, groesse INTEGER NOT NULL, zugriff REAL NOT NULL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS eintraege_zugriff ON eintraege (zugriff)')
+        self._db.commit()
+
+    def get(self, key):
+        """
+        Liefert den gespeicherten Wert oder None, falls es keinen (lesbaren) Eintrag gibt.
+        """
+        with self._lock:
+            zeile = self._db.execute('SELECT wert FROM eintraege WHERE key = ?', (key,)).fetchone()
+            wert = None
+            if zeile is not None:
+                try:
+                    wert = pickle.loads(zeile[0])
+                except Exception:
+                    self._db.execute('DELETE FROM eintraege WHERE key = ?', (key,))
+                    self._schreiben()
+            if wert is None:
+                self.fehlschlaege += 1
+                return None
+            # Zugriffszeiten werden gesammelt und erst beim nächsten Schreiben gespeichert
+            self._zugriffe[key] = time.time()
+            self.treffer += 1
+            self._offen += 1
+            if self._offen >= self._schreiben_nach:
+                self._schreiben()
+            return wert
+
+    def set(self, key, wert):
+        daten = pickle.dumps(wert, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO eintraege (key, wert, groesse, zugriff) VALUES (?, ?, ?, ?)', (key, daten, len(daten), time.time()))
+            self._zugriffe.pop(key, None)
+            self._neu += 1
+            self._offen += 1
+            if self._neu >= self._aufraeumen_nach:
+                self._aufraeumen()
+            elif self._offen >= self._schreiben_nach:
+                self._schreiben()
+
+    def speichern(self):
+        """
+        Schreibt ausstehende Einträge und Zugriffszeiten in die Datenbank.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._schreiben()
+
+    def _schreiben(self):
+        if self._zugriffe:
+            self._db.executemany('UPDATE eintraege SET zugriff = ? WHERE key = ?', [(zugriff, key) for key, zugriff in self._zugriffe.items()])
+            self._zugriffe = {}
+        self._db.commit()
+        self._offen = 0
+
+    def aufraeumen(self):
+        """
+        Entfernt zu alte Einträge und die am längsten nicht verwendeten Einträge oberhalb von max_groesse.
+        """
+        with self._lock:
+            self._aufraeumen()
+
+    def _aufraeumen(self):
+        self._schreiben()
+        self._neu = 0
+        if self.max_alter is not None:
+            self._db.execute('DELETE FROM eintraege WHERE zugriff < ?', (time.time() - self.max_alter,))
+        if self.max_groesse is not None:
+            self._db.execute('''DELETE FROM eintraege WHERE key IN (
+                                    SELECT key FROM (SELECT key, SUM(groesse) OVER (ORDER BY zugriff DESC, key) AS summe FROM eintraege)
+                                    WHERE summe > ?)''', (self.max_groesse,))
+        self._db.commit()
+
+    def leeren(self):
+        with self._lock:
+            self._zugriffe = {}
+            self._db.execute('DELETE FROM eintraege')
+            self._schreiben()
+            self.treffer, self.fehlschlaege = 0, 0
+
+    def statistik(self):
+        with self._lock:
+            self._schreiben()
+            anzahl, groesse = self._db.execute('SELECT COUNT(*), COALESCE(SUM(groesse), 0) FROM eintraege').fetchone()
+        anfragen = self.treffer + self.fehlschlaege
+        return {
+                'treffer' : self.treffer,
+                'fehlschlaege' : self.fehlschlaege,
+                'quote' : self.treffer / anfragen if anfragen else None,
+                'eintraege' : anzahl,
+                'groesse' : groesse,
+                }
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._aufraeumen()
+                self._db.close()
+                self._db = None
+        atexit.unregister(self.speichern)
+
+    def __getstate__(self):
+        # Die Verbindung wird nicht mitgenommen, z.B. bei der Übergabe an einen anderen Prozess
+        self.speichern()
+        zustand = self.__dict__.copy()
+        del zustand['_db'], zustand['_lock'], zustand['_zugriffe']
+        return zustand
+
+    def __setstate__(self, zustand):
+        self.__dict__.update(zustand)
+        self._lock = threading.Lock()
+        self._zugriffe = {}
+        self._offen = 0
+        self._verbinden()
+        atexit.register(self.speichern)
+
+    def __deepcopy__(self, memo):
+        # Kopien einer Notenberechnung verwenden denselben Cache
+        return self
+
+    def __str__(self):
+        return f"NotenCache({self.path}, {self.statistik()})"
+
+    def __repr__(self):
+        return self.__str__()
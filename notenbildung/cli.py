@@ -5,17 +5,242 @@ CLI
 """
 import os
 import sys
+import io
+import csv
+import json
+import time
 import argparse
+import contextlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
-from notenbildung.excel import *
+from notenbildung.models import *
 from notenbildung.version import *
 
+MODELLE = {
+           'Notenberechnung' : Notenberechnung,
+           'NotenberechnungSimple' : NotenberechnungSimple,
+           }
+SYSTEME = {'N' : SystemN, 'NP' : SystemNP}
+FELDER = ['sid', 'fach', 'm_s1', 'm_s', 'm_m', 'gesamtnote', 'note_hj', 'note_z', 'datum', 'n_leistungen', 'fehler']
+
+def fach_aus_name(name):
+    """
+    Liefert das Fach zu einem Klassennamen (FachPHLK) oder Kurznamen (M, PH), None für kein Fach. Bei gleichem
+    Kurznamen gilt das zuerst definierte Fach.
+    """
+    if name is None:
+        return None
+    faecher = {}
+    for fach in FachGeneric.__subclasses__():
+        faecher.setdefault(fach.__name__.upper(), fach)
+        faecher.setdefault(fach.name.upper(), fach)
+    if str(name).upper() not in faecher:
+        raise ValueError(f"Unbekanntes Fach: {name}")
+    return faecher[str(name).upper()]
+
+def lese_datensaetze(datei, eingabeformat='jsonl'):
+    """
+    Liest die Datensätze zeilenweise als dict, ohne die Datei vollständig zu laden.
+    """
+    if eingabeformat == 'csv':
+        for datensatz in csv.DictReader(datei):
+            yield {key : (value if value != '' else None) for key, value in datensatz.items()}
+        return
+    for nummer, zeile in enumerate(datei, start=1):
+        if not zeile.strip():
+            continue
+        try:
+            datensatz = json.loads(zeile)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Ungültiges JSON in Zeile {nummer}: {e}")
+        if not isinstance(datensatz, dict):
+            raise ValueError(f"Ungültiger Datensatz in Zeile {nummer}: Es wird ein JSON-Objekt erwartet.")
+        yield datensatz
+
+def gruppiere(datensaetze):
+    """
+    Fasst aufeinanderfolgende Datensätze mit gleichem Schüler (sid) und Fach zusammen. Es wird immer nur die aktuelle
+    Gruppe gehalten, die Datensätze eines Schülers müssen daher zusammenhängend sein. Taucht ein Schüler später erneut
+    auf, wird die Gruppe mit einem Fehler ausgegeben.
+    """
+    abgeschlossen = set()
+    key, gruppe = None, []
+    for datensatz in datensaetze:
+        neu = (datensatz.get('sid'), datensatz.get('fach'))
+        if neu != key:
+            if gruppe:
+                abgeschlossen.add(key)
+                yield key, gruppe
+            # Für einen erneut auftauchenden Schüler wird nur der Fehler ausgegeben, die Datensätze werden nicht gesammelt
+            key, gruppe = neu, ([None] if neu in abgeschlossen else [])
+        if not gruppe or gruppe[0] is not None:
+            gruppe.append(datensatz)
+    if gruppe:
+        yield key, gruppe
+
+def _zahl(wert, typ=float):
+    if wert is None or isinstance(wert, (int, float)):
+        return wert
+    return typ(str(wert).replace(',', '.'))
+
+def noten_hinzufuegen(notenberechnung, datensaetze):
+    """
+    Fügt die Leistungen aus Datensätzen (art, note, date, status, nr, von, bis, due) gemeinsam hinzu.
+    """
+    with notenberechnung.stapel():
+        for datensatz in datensaetze:
+            notenberechnung.note_hinzufuegen(
+                                             art = datensatz.get('art'),
+                                             note = _zahl(datensatz.get('note')),
+                                             date = datensatz.get('date'),
+                                             status = datensatz.get('status'),
+                                             nr = _zahl(datensatz.get('nr'), int),
+                                             von = datensatz.get('von'),
+                                             bis = datensatz.get('bis'),
+                                             due = datensatz.get('due'),
+                                             )
+
+def noten_als_dict(note):
+    """
+    Werte eines Note-Objekts für JSON, fehlende Werte als None.
+    """
+    ergebnis = {}
+    for key in ['m_s1', 'm_s', 'm_m', 'gesamtnote']:
+        wert = getattr(note, key)
+        ergebnis[key] = None if wert is None or np.isnan(float(wert)) else float(wert)
+    if ergebnis['gesamtnote'] is not None:
+        ergebnis['note_hj'] = note.gesamtnote._get_HJ(text=True)
+        ergebnis['note_z'] = note.gesamtnote._get_Z(text=True)
+    ergebnis['datum'] = note.datum.strftime('%Y-%m-%d')
+    return ergebnis
+
+def berechne_gruppe(key, gruppe, modell='Notenberechnung', konfiguration=None):
+    """
+    Berechnet die Note eines Schülers in einem Fach und liefert den Ergebnisdatensatz.
+    """
+    sid, fach = key
+    ergebnis = {'sid' : sid, 'fach' : fach, 'n_leistungen' : len(gruppe)}
+    if None in gruppe:
+        ergebnis['fehler'] = "Die Datensätze eines Schülers müssen zusammenhängend sein."
+        return ergebnis
+    try:
+        notenberechnung = MODELLE[modell](fach=fach_aus_name(fach), konfiguration=konfiguration)
+        noten_hinzufuegen(notenberechnung, gruppe)
+        note = notenberechnung.berechne_gesamtnote(show_warnings=False)
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        ergebnis['fehler'] = str(e)
+        return ergebnis
+
+    ergebnis.update(noten_als_dict(note))
+    return ergebnis
+
+def berechne_gruppen(gruppen, modell='Notenberechnung', konfiguration=None, stichtag=None):
+    # Meldungen der Modelle (z.B. zu Limits) dürfen die Ausgabe auf stdout nicht stören
+    with contextlib.redirect_stdout(sys.stderr), Stichtag(stichtag):
+        return [berechne_gruppe(key, gruppe, modell=modell, konfiguration=konfiguration) for key, gruppe in gruppen]
+
+def _pakete(gruppen, groesse):
+    paket = []
+    for gruppe in gruppen:
+        paket.append(gruppe)
+        if len(paket) >= groesse:
+            yield paket
+            paket = []
+    if paket:
+        yield paket
+
+def berechne_strom(datensaetze, modell='Notenberechnung', konfiguration=None, workers=None, paketgroesse=64, stichtag=None):
+    """
+    Liefert die Ergebnisse in der Reihenfolge der Eingabe, während die Datensätze noch gelesen werden. Mit workers > 1
+    werden Pakete von Schülern in Prozessen berechnet, dabei sind höchstens 2*workers Pakete gleichzeitig unterwegs.
+    Fristen von Verbesserungen werden für alle Pakete am selben Stichtag gemessen (ohne Angabe: Beginn der Berechnung).
+    """
+    stichtag = Stichtag(stichtag).datum
+    pakete = _pakete(gruppiere(datensaetze), paketgroesse)
+    if workers is None or workers == 1:
+        for paket in pakete:
+            yield from berechne_gruppen(paket, modell=modell, konfiguration=konfiguration, stichtag=stichtag)
+        return
+
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        offen = deque()
+        for paket in pakete:
+            offen.append(executor.submit(berechne_gruppen, paket, modell, konfiguration, stichtag))
+            if len(offen) >= 2 * workers:
+                yield from offen.popleft().result()
+        while offen:
+            yield from offen.popleft().result()
+
+def berechnen(argv=None):
+    parser = argparse.ArgumentParser(prog='notenbildung berechnen', description='Berechnet die Noten aus Datensätzen (JSON Lines oder CSV) je Schüler und Fach.',
+                                     epilog='Felder je Leistung: sid, fach (z.B. M, PH, FachPHLK), art, note, date (JJJJ-MM-TT) und optional status, nr, von, bis, due. '
+                                            'Die Datensätze eines Schülers in einem Fach müssen aufeinander folgen. Je Schüler wird ein Ergebnis ausgegeben.')
+    parser.add_argument('datei', nargs='?', default='-', help='Eingabedatei, - für stdin')
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help='Format der Eingabe (Standard: nach Dateiendung, sonst jsonl)')
+    parser.add_argument('--ausgabe', choices=['jsonl', 'csv'], default='jsonl', help='Format der Ausgabe')
+    parser.add_argument('--workers', type=int, default=1, help='Anzahl der Prozesse, 0 für alle CPUs')
+    parser.add_argument('--modell', choices=list(MODELLE), default='Notenberechnung')
+    parser.add_argument('--system', choices=list(SYSTEME), default='N')
+    parser.add_argument('--w-th', type=float, default=ConfigNVO.w_th)
+    parser.add_argument('--w-s0', type=float, default=ConfigNVO.w_s0)
+    parser.add_argument('--w-sm', type=float, default=ConfigNVO.w_sm)
+    parser.add_argument('--n-kt-0', type=int, default=ConfigNVO.n_KT_0)
+    parser.add_argument('--ohne-verbesserung', action='store_true', help='Verbesserungen nicht berücksichtigen')
+    parser.add_argument('--stichtag', help='Datum (JJJJ-MM-TT), an dem Fristen von Verbesserungen gemessen werden, Standard: heute')
+    args = parser.parse_args(argv)
+
+    konfiguration = ConfigNVO.konfiguration(w_th=args.w_th, w_s0=args.w_s0, w_sm=args.w_sm, n_KT_0=args.n_kt_0,
+                                            system=SYSTEME[args.system], v_enabled=not args.ohne_verbesserung)
+    try:
+        stichtag = Stichtag(args.stichtag).datum
+    except ValueError:
+        parser.error(f"Ungültiger Stichtag: {args.stichtag}")
+    eingabeformat = args.format or ('csv' if args.datei.lower().endswith('.csv') else 'jsonl')
+
+    if args.datei == '-':
+        datei = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+    else:
+        datei = open(args.datei, encoding='utf-8', newline='')
+
+    ausgabe = sys.stdout
+    writer = csv.DictWriter(ausgabe, fieldnames=FELDER, lineterminator='\n') if args.ausgabe == 'csv' else None
+    if writer is not None:
+        writer.writeheader()
+
+    start = time.perf_counter()
+    n_schueler, n_fehler = 0, 0
+    try:
+        with datei:
+            for ergebnis in berechne_strom(lese_datensaetze(datei, eingabeformat), modell=args.modell, konfiguration=konfiguration, workers=args.workers, stichtag=stichtag):
+                if writer is not None:
+                    writer.writerow(ergebnis)
+                else:
+                    ausgabe.write(json.dumps(ergebnis, ensure_ascii=False) + '\n')
+                n_schueler += 1
+                n_fehler += 'fehler' in ergebnis
+    except ValueError as e:
+        print(f"Fehler beim Lesen der Eingabe: {e}", file=sys.stderr)
+        return 1
+    finally:
+        ausgabe.flush()
+        dauer = time.perf_counter() - start
+        print(f"{n_schueler} Schüler in {dauer:.2f} s ({n_schueler / dauer if dauer else 0:.1f} Schüler/s), {n_fehler} mit Fehlern", file=sys.stderr)
+    return 0
+
 def main():
-    parser = argparse.ArgumentParser(description='Get Git version information for a given path')
+    if len(sys.argv) > 1 and sys.argv[1] == 'berechnen':
+        sys.exit(berechnen(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'dienst':
+        from notenbildung.server import dienst
+        sys.exit(dienst(sys.argv[2:]))
+
+    parser = argparse.ArgumentParser(description='Get Git version information for a given path. Use "berechnen" to compute grades from JSON Lines or CSV records, "dienst" to start the local HTTP service.')
     parser.add_argument('path', help='Path to the directory to get Git version information for')
 
     args = parser.parse_args()
-    
+
     version_info = GitVersion(args.path)
     print(version_info.version())
 
@@ -6,15 +6,24 @@ Excel Wrapper
 import os
 import sys
 import re
+import copy
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import openpyxl
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 from notenbildung.models import *
 
 class ExcelSheetConfig:
-    def __init__(self, df=None, sheet=None):
+    def __init__(self, df=None, sheet=None, cache=None):
         self.parse_config = ConfigNVO.get_config()
         self.parse_config.update({'fach' : None})
         self.df = df
         self.sheet = sheet
+        self.cache = cache
         self.gruppe = None
 
         self.test_types = {
@@ -38,28 +47,26 @@ class ExcelSheetConfig:
         self._init_sid()
     
     def _init_sid(self):
-        dates = dict(zip(self.df.iloc[0,3:], self.df.iloc[1,3:]))
-        types = {k:self._parse_type_and_number(k) for k in dates.keys()}
+        if self._noten is None:
+            raise ValueError(f"Die Tabelle {self.sheet} konnte nicht validiert werden.")
+        kopf = [self._parse_type_and_number(test) for test in self._tests]
 
-        for index in self.df.iloc[2:,0].index:
-            sid = self.df.iloc[index,0]
-            schueler = SchuelerEntity(sid=sid, vorname=self.df.iloc[index,1], nachname=self.df.iloc[index,2])
-            noten = NotenberechnungSimple(**self.parse_config)
-            
-            for column in range(3, self.df.shape[1]):
-                typ_and_nr = types.get(self.df.iloc[0,column], {})
-                date = self.df.iloc[1,column]
-                note = self.df.iloc[index,column]
-                if not pd.isnull(note):
-                    noten.leistung_hinzufuegen(typ_and_nr.get('type')(system=self.parse_config.get('system'), note=note, nr=typ_and_nr.get('nr'),date=date))
-            schueler.setze_note(noten)
-            self.gruppe.update_sid(schueler)
+        for row, sid in enumerate(self._sids):
+            with Profil.bereich(sid=sid):
+                schueler = SchuelerEntity(sid=sid, vorname=self._vornamen[row], nachname=self._nachnamen[row])
+                noten = NotenberechnungSimple(**self.parse_config, cache=self.cache)
+                
+                leistungen = [kopf[column].get('type')(system=self.parse_config.get('system'), note=self._noten[row, column], nr=kopf[column].get('nr'), date=self._daten[column])
+                              for column in np.flatnonzero(~np.isnan(self._noten[row]))]
+                noten.leistungen_hinzufuegen(*leistungen)
+                schueler.setze_note(noten)
+                self.gruppe.update_sid(schueler)
             
 
     def _parse_type_and_number(self, key):
         match = re.match(r'([A-Za-z]+)(\d+)', key)
         if match:
-            return {'type': self.test_types.get(match.group(1)), 'nr' : match.group(2)}
+            return {'type': self.test_types.get(match.group(1)), 'nr' : int(match.group(2))}
         else:
             return {}
 
@@ -77,9 +84,9 @@ class ExcelSheetConfig:
             return {'stufe' : None, 'zug' : None}
     
     def _load_and_validate_dataframe(self):
+        self._noten = None
         try:
             df = self.df
-            df.iloc[1, 3:] = pd.to_datetime(df.iloc[1, 3:])
             
             # Config prüfen
             if not all(df.iloc[i, j].startswith(tuple(list(self.parse_config.keys())+['-'])) for i in range(2) for j in range(3)):
@@ -93,25 +100,38 @@ class ExcelSheetConfig:
                             key_value = cell_value.split('=')[-1].strip()
                             self.parse_config[key] = self._convert_and_update_config(key, key_value)
 
-            if not all(isinstance(cell, str) and any(cell.startswith(prefix) and cell[len(prefix):].isdigit() for prefix in self.test_types.keys()) for cell in df.iloc[0, 3:]):
+            tests = df.iloc[0, 3:]
+            pattern = f'(?:{"|".join(self.test_types.keys())})\\d+'
+            if not (tests.map(lambda cell: isinstance(cell, str)).all() and tests.astype(str).str.fullmatch(pattern).all()):
                 raise ValueError(f'In der ersten Zeile muss der Test-Typ mit Nummer angegeben sein. Erlaubte Typen: {", ".join(self.test_types.keys())}')
 
-            if not all(isinstance(cell, pd.Timestamp) for cell in df.iloc[1, 3:].values):
+            daten = pd.to_datetime(df.iloc[1, 3:])
+            if daten.isna().any():
                 raise ValueError("In der zweiten Zeile muss zu jedem Test ein gültiges Datum angegeben werden. z.B. YYYY-MM-DD")
 
             if not df.iloc[2:, 0].is_unique:
                 raise ValueError("Nicht alle Schüler-IDs in der ersten Zeile sind eindeutig")
             
-            # Prüfe ob die Zellen nur numerische werte enthalten
-            for i in range(2, df.shape[0]):
-                for j in range(3, df.shape[1]):
-                    cell_value = df.iloc[i, j]
-                    if isinstance(cell_value, str):
-                        try:
-                            float_value = float(cell_value)
-                            df.iloc[i, j] = float_value
-                        except ValueError:
-                            raise ValueError(f"Der Wert '{cell_value}' in Zeile {i} und Spalte {j} kann nicht in einen Float umgewandelt werden.")
+            # Notenblock in einem Schritt umwandeln, nur im Fehlerfall die Zelle suchen
+            block = df.iloc[2:, 3:].to_numpy(dtype=object, copy=True)
+            block[pd.isna(block)] = np.nan
+            try:
+                werte = block.astype(float)
+            except (ValueError, TypeError):
+                for i, j in np.ndindex(block.shape):
+                    cell_value = block[i, j]
+                    try:
+                        float(cell_value)
+                    except (ValueError, TypeError):
+                        raise ValueError(f"Der Wert '{cell_value}' in Zeile {i+2} und Spalte {j+3} kann nicht in einen Float umgewandelt werden.")
+                raise
+
+            self._tests = tests.tolist()
+            self._daten = daten.tolist()
+            self._sids = df.iloc[2:, 0].tolist()
+            self._vornamen = df.iloc[2:, 1].tolist()
+            self._nachnamen = df.iloc[2:, 2].tolist()
+            self._noten = werte
 
             return df
 
@@ -150,40 +170,209 @@ class ExcelSheetConfig:
     
         return value
 
+def _lade_tabellen(file_path, sheet_names, cache=None):
+    """
+    Liest und berechnet die angegebenen Tabellen nacheinander. Beim ersten Fehler wird abgebrochen und statt der
+    ExcelSheetConfig die Exception zurückgegeben. Im parallelen Modus von ExcelFileLoader läuft die Funktion für
+    einen Block von Tabellen in einem eigenen Prozess.
+    """
+    xls = pd.ExcelFile(file_path)
+    ergebnisse = []
+    for sheet_name in sheet_names:
+        try:
+            with Profil.bereich(gruppe=sheet_name):
+                with messen('excel.lesen'):
+                    df = pd.read_excel(xls, sheet_name, header=None)
+                with messen('excel.tabelle'):
+                    ergebnisse.append(ExcelSheetConfig(df=df, sheet=sheet_name, cache=cache))
+        except Exception as e:
+            ergebnisse.append(e)
+            break
+    return ergebnisse
+
+def _lade_tabellen_profiliert(file_path, sheet_names, cache=None):
+    """
+    Wie _lade_tabellen, misst dabei im eigenen Prozess und gibt die Messwerte zum Zusammenführen mit zurück.
+    """
+    with Profil() as profil:
+        ergebnisse = _lade_tabellen(file_path, sheet_names, cache)
+    return ergebnisse, profil.daten()
+
+def _runde(werte):
+    """
+    Rundet die Werte wie pandas mit float_format="%.2f". Fehlende Werte werden zu leeren Zellen.
+    """
+    werte = np.asarray([float(wert) for wert in werte], dtype=float)
+    gerundet = np.char.mod('%.2f', werte).astype(float) if len(werte) else werte
+    return [None if np.isnan(wert) else wert for wert in gerundet.tolist()]
+
+def _init_plot_worker():
+    # In den Prozessen für die Plots ohne interaktives Backend arbeiten
+    plt.switch_backend('Agg')
+
+def _plot_schueler(schueler, gruppe, save, typ, tabelle=None):
+    """
+    Erstellt den Plot eines Schülers und gibt die benötigte Zeit zurück.
+    """
+    start = time.perf_counter()
+    with Profil.bereich(gruppe=tabelle, sid=schueler.sid):
+        schueler.plot(parent=gruppe, save=save, formats=[typ])
+    return time.perf_counter() - start
+
+def _lade_manifest(folder_name):
+    try:
+        with open(os.path.join(folder_name, '.export_cache.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _speichere_manifest(folder_name, manifest):
+    with open(os.path.join(folder_name, '.export_cache.json'), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
 class ExcelFileLoader:
-    def __init__(self, file_path):
+    def __init__(self, file_path, workers=None, cache=None):
+        """
+        workers: Anzahl der Prozesse, mit denen die Tabellen parallel eingelesen werden. None oder 1 liest die
+        Tabellen nacheinander, 0 verwendet alle verfügbaren Prozessoren.
+        cache: optionaler NotenCache für die berechneten Noten.
+
+        Innerhalb von `with Profil() as profil:` werden Einlesen, Berechnung und Export je Phase, Tabelle und Schüler
+        gemessen, siehe notenbildung.profil. Bei paralleler Verarbeitung werden die Messwerte der Prozesse übernommen.
+        """
         self.file_path = file_path
+        self.workers = workers
+        self.cache = cache
         self.klassen = []
         self._load_and_validate_excel_file()
 
-    def export(self, typ='pdf'):
-        for key, _ in enumerate(self.klassen):
-            pass
-            gruppe = self.klassen[key].gruppe
-            dataframe = gruppe.get_dataframe()
-            for fkey in ['note_s', 'note_m', 'note']:
-                dataframe[fkey] = dataframe[fkey].apply(lambda k: float(k))
+    def aktualisieren(self):
+        """
+        Berechnet nach Änderungen an Leistungen die Noten der betroffenen Schüler neu und liefert je Tabelle die sid
+        dieser Schüler, z.B. für export(auswahl=...).
+        """
+        betroffen = {}
+        for klasse in self.klassen:
+            sids = klasse.gruppe.aktualisieren()
+            if sids:
+                betroffen[klasse.sheet] = sids
+        return betroffen
 
+    @profiliert('export')
+    def export(self, typ='pdf', workers=None, cache=True, auswahl=None):
+        """
+        Exportiert je Lerngruppe eine Excel-Datei und je Schüler einen Plot der Zeitreihe.
+
+        workers: Anzahl der Prozesse für die Plots, wie bei ExcelFileLoader.
+        cache: Dateien, deren Noten und Konfiguration sich seit dem letzten Export nicht geändert haben, werden
+        nicht neu geschrieben. Die Prüfsummen liegen in der Datei .export_cache.json im Exportordner.
+        auswahl: optional je Tabelle die sid der zu exportierenden Schüler (siehe aktualisieren). Andere Lerngruppen
+        und Schüler werden nicht geprüft.
+        """
+        start = time.perf_counter()
+        profil = Profil.aktiv()
+        bericht = {'excel' : 0, 'plots' : 0, 'cache' : 0}
+        manifeste = {}
+        auftraege = []
+        for klasse in self.klassen:
+            if auswahl is not None and klasse.sheet not in auswahl:
+                continue
+            gruppe = klasse.gruppe
             schuljahr = gruppe._get_sj()
             folder_name = os.path.join(os.path.dirname(self.file_path), f'{schuljahr}_{schuljahr+1}')
             if not os.path.exists(folder_name):
                 os.makedirs(folder_name)
+            if folder_name not in manifeste:
+                manifeste[folder_name] = _lade_manifest(folder_name) if cache else {}
+            manifest = manifeste[folder_name]
+
+            with messen('export.pruefsummen'):
+                pruefsummen = {sid : schueler._notenberechnung._fingerprint(schueler.vorname, schueler.nachname, gruppe.kurs, gruppe.fach.name)
+                               for sid, schueler in gruppe.schueler.items()}
+
             file_name = f"{gruppe._name()}_{gruppe.fach.name}.xlsx"
-            file_path = os.path.join(folder_name, file_name)
-            with pd.ExcelWriter(file_path) as writer:
-                dataframe.to_excel(writer, index=False, sheet_name='Gesamt', float_format="%.2f")
-                for schueler in gruppe.schueler.values():
-                    df_schueler = schueler.get_dataframe()[[ 'date', 'art', 'nr', 'note' ]]
-                    df_schueler['date'] = df_schueler['date'].apply(lambda x: x.strftime('%d.%m.%Y'))
-                    df_schueler['note_text'] = df_schueler['note'].apply(lambda k: k._get_HJ(text=True))
-                    df_schueler['note'] = df_schueler['note'].apply(lambda k: float(k))
-                    df_schueler.to_excel(writer, index=False, sheet_name=schueler._get_name(), float_format="%.2f")
-            
-            #Export Plots
-            for sid in gruppe.schueler.keys():
-                file_name = f"{gruppe._name()}_{gruppe.fach.name}_{gruppe.schueler[sid].nachname}_{gruppe.schueler[sid].vorname}"
-                file_path = os.path.join(folder_name, file_name)
-                gruppe.plot_sid(sid, save=file_path, formats=[typ])
+            pruefsumme = hashlib.sha256(repr(sorted(pruefsummen.values())).encode()).hexdigest()
+            if not (manifest.get(file_name) == pruefsumme and os.path.exists(os.path.join(folder_name, file_name))):
+                with Profil.bereich(gruppe=klasse.sheet), messen('export.excel'):
+                    self._export_excel(gruppe, os.path.join(folder_name, file_name))
+                manifest[file_name] = pruefsumme
+                bericht['excel'] += 1
+
+            # Nur für Plots ohne passenden Eintrag im Cache wird ein Auftrag erstellt
+            kopf = copy.copy(gruppe)
+            kopf.schueler = {}
+            for sid, schueler in gruppe.schueler.items():
+                if auswahl is not None and sid not in auswahl[klasse.sheet]:
+                    continue
+                file_name = f"{gruppe._name()}_{gruppe.fach.name}_{schueler.nachname}_{schueler.vorname}"
+                pruefsumme = hashlib.sha256(f'{pruefsummen[sid]}{typ}'.encode()).hexdigest()
+                if manifest.get(f'{file_name}.{typ}') == pruefsumme and os.path.exists(os.path.join(folder_name, f'{file_name}.{typ}')):
+                    bericht['cache'] += 1
+                    continue
+                auftraege.append((folder_name, f'{file_name}.{typ}', pruefsumme, (schueler, kopf, os.path.join(folder_name, file_name), typ, klasse.sheet)))
+
+        workers = min(workers or os.cpu_count() or 1, len(auftraege)) if workers is not None else 1
+        if workers <= 1:
+            ergebnisse = (_plot_schueler(*auftrag[-1]) for auftrag in auftraege)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_plot_worker)
+            ergebnisse = executor.map(_plot_schueler, *zip(*[auftrag[-1] for auftrag in auftraege]))
+
+        try:
+            for idx, (auftrag, dauer) in enumerate(zip(auftraege, ergebnisse)):
+                folder_name, file_name, pruefsumme, (schueler, _, _, _, tabelle) = auftrag
+                manifeste[folder_name][file_name] = pruefsumme
+                bericht['plots'] += 1
+                if profil is not None:
+                    # In Prozessen wird nicht gemessen, die Dauer des Plots kommt daher aus _plot_schueler
+                    profil.erfassen('export.plot', dauer, tabelle, schueler.sid)
+                print(f"[{idx+1}/{len(auftraege)}] {file_name} ({dauer:.2f} s)")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if cache:
+                for folder_name, manifest in manifeste.items():
+                    _speichere_manifest(folder_name, manifest)
+
+        bericht['dauer'] = time.perf_counter() - start
+        if profil is not None:
+            bericht['profil'] = profil.bericht()
+        print(f"Export: {bericht['excel']} Excel-Dateien, {bericht['plots']} Plots erstellt, {bericht['cache']} Plots unverändert ({bericht['dauer']:.2f} s)")
+        return bericht
+
+    def _export_excel(self, gruppe, file_path):
+        """
+        Schreibt die Übersicht der Lerngruppe und je Schüler ein Blatt mit den Leistungen. Die Zeilen werden direkt
+        in eine write-only Arbeitsmappe geschrieben, ohne DataFrame je Schüler.
+        """
+        workbook = openpyxl.Workbook(write_only=True)
+        texte = {}
+
+        export = gruppe._export()
+        spalten = list(export[0].keys()) if export else []
+        sheet = workbook.create_sheet('Gesamt')
+        sheet.append(spalten)
+        werte = {key : _runde([zeile[key] for zeile in export]) for key in ['note_s', 'note_m', 'note']}
+        for idx, zeile in enumerate(export):
+            sheet.append([werte[key][idx] if key in werte else zeile[key] for key in spalten])
+        sheet.close()
+
+        for schueler in gruppe.schueler.values():
+            leistungen = schueler._notenberechnung._get_list_with_verbesserungen()
+            sheet = workbook.create_sheet(schueler._get_name())
+            sheet.append(['date', 'art', 'nr', 'note', 'note_text'])
+            noten = _runde([leistung['note'] for leistung in leistungen])
+            for leistung, note in zip(leistungen, noten):
+                # Der Text hängt nur von Wert und System ab und wird je Export nur einmal bestimmt
+                key = (float(leistung['note']), leistung['note'].system)
+                if key not in texte:
+                    texte[key] = leistung['note']._get_HJ(text=True)
+                sheet.append([leistung['date'].strftime('%d.%m.%Y'), leistung['art'], leistung['nr'], note, texte[key]])
+            # Blatt sofort abschließen, damit nicht alle Blätter bis zum Speichern gepuffert bleiben
+            sheet.close()
+
+        workbook.save(file_path)
     
     def _generate_nvo_objects(self):
         for idx, _ in enumerate(self.klassen):
@@ -192,17 +381,38 @@ class ExcelFileLoader:
             self.klassen[idx]
         
 
+    @profiliert('excel.laden')
     def _load_and_validate_excel_file(self):
         try:
-            xls = pd.ExcelFile(self.file_path)
-            for sheet_name in xls.sheet_names:
-                df = pd.read_excel(xls, sheet_name, header=None)
-                self.klassen.append(ExcelSheetConfig(df=df, sheet=sheet_name))
-
+            sheet_names = pd.ExcelFile(self.file_path).sheet_names
         except Exception as e:
             print(f"Fehler beim Laden der Excel-Datei: {e}")
             return None
 
+        workers = min(self.workers or os.cpu_count() or 1, len(sheet_names)) if self.workers is not None else 1
+        profil = Profil.aktiv()
+        if workers <= 1:
+            ergebnisse = _lade_tabellen(self.file_path, sheet_names, self.cache)
+        else:
+            # Zusammenhängende Blöcke, damit jeder Prozess die Datei nur einmal öffnet
+            bloecke = [[str(name) for name in block] for block in np.array_split(sheet_names, workers)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                if profil is None:
+                    ergebnisse = sum(executor.map(_lade_tabellen, [self.file_path]*workers, bloecke, [self.cache]*workers), [])
+                else:
+                    ergebnisse = []
+                    for teil, daten in executor.map(_lade_tabellen_profiliert, [self.file_path]*workers, bloecke, [self.cache]*workers):
+                        ergebnisse.extend(teil)
+                        profil.zusammenfuehren(daten)
+
+        # Ergebnisse in Reihenfolge der Tabellen übernehmen, beim ersten Fehler abbrechen
+        for sheet_name, ergebnis in zip(sheet_names, ergebnisse):
+            if isinstance(ergebnis, Exception):
+                print(f"Fehler beim Laden der Excel-Datei (Tabelle {sheet_name}): {ergebnis}")
+                return None
+            self.klassen.append(ergebnis)
+        return self.klassen
+
 if __name__ == "__main__":
     self = ExcelFileLoader("../examples/meine_notenliste.xlsx")
     self.export()
\ No newline at end of file
@@ -7,16 +7,26 @@ import os
 import sys
 
 import numpy as np
-import pandas as pd
 from datetime import datetime
 import copy
-import itertools
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import matplotlib.dates as mdates
+import array
+import bisect
+import hashlib
+import heapq
+import functools
+import threading
+from contextlib import contextmanager
 
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 from notenbildung.nvo import *
+from notenbildung.info import *
+from notenbildung.profil import *
+from notenbildung.verzoegert import VerzoegertesModul
+
+# pandas und matplotlib werden erst beim Export bzw. Plotten geladen
+pd = VerzoegertesModul('pandas')
+plt = VerzoegertesModul('matplotlib.pyplot')
+patches = VerzoegertesModul('matplotlib.patches')
         
 class Note:
     """
@@ -29,12 +39,16 @@ class Note:
             self.system = system
         
         self._keys = ['m_s1', 'm_s', 'm_m', 'gesamtnote', 'datum']
+        # Gewichtung der Gesamtnote, wird von _calculate gesetzt
+        self._gewichtung = None
         
 
         for key in self._keys:
             value = kwargs.get(key, None)
             if isinstance(value, (int, float)) or value==None:
                 setattr(self, key, NoteEntity(value, system=self.system))
+            elif isinstance(value, NoteValue):
+                setattr(self, key, value._entity())
             elif isinstance(value, NoteEntity) or isinstance(value, datetime):
                 setattr(self, key, value)
             else:
@@ -49,6 +63,16 @@ class Note:
         if newsystem!=self.system:
             self.system = newsystem
         
+    def prozente(self):
+        """
+        Anteile der Leistungsarten an der Gesamtnote in Prozent, z.B. {'KA (schriftlich)': 41.7, ...}. Nur für Noten aus
+        berechne_gesamtnote und time_series verfügbar, sonst None.
+        """
+        gewichtung = getattr(self, '_gewichtung', None)
+        if gewichtung is None:
+            return None
+        return gewichtung.calculate_percents()
+
     def _print(self):
         return f'm_s1={self.m_s1}, m_s={self.m_s}, m_m={self.m_m}, gesamtnote={self.gesamtnote}, datum={self.datum.strftime("%d.%m.%Y")}'
 
@@ -56,35 +80,527 @@ class Note:
         for key, value in kwargs.items():
             if key in self._keys and isinstance(value, (int, float)):
                 setattr(self, key, NoteEntity(value, system=self.system))
+            elif isinstance(value, NoteValue):
+                setattr(self, key, value._entity())
             else:
                 setattr(self, key, value)
 
+    def _kopie(self):
+        """
+        Kopie mit eigenen Schnitten, die unabhängig vom Original mit to und update verändert werden kann.
+        """
+        kopie = copy.copy(self)
+        for key in self._keys:
+            setattr(kopie, key, copy.copy(getattr(self, key)))
+        return kopie
+
     def __str__(self):
         return self._print()
 
     def __repr__(self):
         return self._print()
 
+class ZeitraumIndex:
+    """
+    Index über die Zeiträume (von, bis) der mündlichen Noten zum Finden von Überschneidungen. Die Leistungen werden
+    nach ihrem Startdatum sortiert gehalten. Überschneidungen einer neuen Leistung werden per Binärsuche gefunden,
+    nach links muss dabei nur so weit gesucht werden wie der längste enthaltene Zeitraum.
+    """
+    def __init__(self, leistungen=()):
+        self.leistungen = []
+        self._starts = []
+        self._nummern = []
+        self._max_dauer = None
+        for leistung in leistungen:
+            self.hinzufuegen(leistung)
+
+    def ueberschneidungen(self, leistung):
+        """
+        Liefert die enthaltenen Leistungen, deren Zeitraum sich mit dem der Leistung überschneidet, in der
+        Reihenfolge des Hinzufügens.
+        """
+        return [self.leistungen[nr] for nr in self._ueberschneidungen(leistung)]
+
+    def _ueberschneidungen(self, leistung):
+        if self._max_dauer is None:
+            return []
+        links = bisect.bisect_left(self._starts, leistung.von - self._max_dauer)
+        rechts = bisect.bisect_right(self._starts, leistung.bis)
+        return sorted(self._nummern[idx] for idx in range(links, rechts) if self.leistungen[self._nummern[idx]].bis >= leistung.von)
+
+    def hinzufuegen(self, leistung):
+        """
+        Fügt die Leistung hinzu und gibt die Leistungen zurück, mit denen sie sich überschneidet.
+        """
+        return [self.leistungen[nr] for nr in self._hinzufuegen(leistung)]
+
+    def _hinzufuegen(self, leistung):
+        konflikte = self._ueberschneidungen(leistung)
+        position = bisect.bisect_right(self._starts, leistung.von)
+        self._starts.insert(position, leistung.von)
+        self._nummern.insert(position, len(self.leistungen))
+        self.leistungen.append(leistung)
+        dauer = leistung.bis - leistung.von
+        if self._max_dauer is None or dauer > self._max_dauer:
+            self._max_dauer = dauer
+        return konflikte
+
+    @staticmethod
+    def paare(leistungen):
+        """
+        Findet alle Paare sich überschneidender Zeiträume in O(n log n + k) durch einen Sweep über die Startdaten.
+        Die Paare sind wie bei itertools.combinations nach ihrer Position in leistungen geordnet.
+        """
+        aktiv = []
+        paare = []
+        for idx in sorted(range(len(leistungen)), key=lambda idx: leistungen[idx].von):
+            leistung = leistungen[idx]
+            while aktiv and aktiv[0][0] < leistung.von:
+                heapq.heappop(aktiv)
+            paare.extend((min(idx, other), max(idx, other)) for _, other in aktiv)
+            heapq.heappush(aktiv, (leistung.bis, idx))
+        return [(leistungen[first], leistungen[second]) for first, second in sorted(paare)]
+
+class LeistungsStatistik:
+    """
+    Laufende Statistik über die Leistungen einer Notenberechnung. Die Leistungen werden in zeitlicher Reihenfolge
+    hinzugefügt und nach jedem Schritt kann der Zwischenstand ausgewertet werden, ohne das Modell zu kopieren,
+    neu zu sortieren oder vollständig neu zu validieren.
+
+    Die Mittelwerte werden mit derselben Reduktion wie in Weight._mean über die bisher gesammelten Werte gebildet,
+    damit jeder Zwischenstand bitgleich mit einer vollständigen Berechnung bleibt.
+    """
+    # Kodierung der Verbesserungsstatus: offen/unverbessert, fehlt, fertig
+    _status_codes = Verbesserungen._status_codes
+
+    def __init__(self, model):
+        self.model = model
+        size = len(model.noten)
+        self.leistungen = []
+        self.datum = None
+        self.n = {key: 0 for key in model._leistungs_types}
+        self.n_valid = {key: 0 for key in model._leistungs_types}
+        self._werte = {key: np.empty(size) for key in model._leistungs_types}
+        self._mittelwerte = {}
+        self._kategorien = {}
+        # Typen aller Leistungen je Kategorie und daraus die Anteile wie bei Weight(*leistungen), für Note.prozente
+        self._typen = {key: [] for key in model._leistungs_types}
+        self._anteile = {}
+
+        # Verbesserungen
+        self.v_enabled = False
+        self.nv1 = 0
+        self.nv2 = 0
+        self._status = np.empty(size, dtype=np.intp)
+        self._n_status = 0
+        self.n_verbesserungen = len(model._verbesserungen)
+        # Schnitt, mit dem verbesserungen zuletzt ausgewertet wurde
+        self._v_mittel = None
+
+        # Validierung
+        self._sj_ende = None
+        self._fehler_nr = None
+        self._fehler_system = None
+        self._nr = {}
+        self._zeitraeume = ZeitraumIndex()
+        self._zeitraum_konflikte = []
+        self._limits = model._fach.limits if model._fach is not None else None
+        self._limit_counts = [0] * len(self._limits.limits) if self._limits is not None else []
+
+    @classmethod
+    def supports(cls, model):
+        """
+        Prüft, ob die Zeitreihe eines Modells inkrementell berechnet werden kann.
+        """
+        calculate = next(klasse for klasse in type(model).__mro__ if '_calculate' in klasse.__dict__)
+        if '_calculate_statistik' not in calculate.__dict__:
+            return False
+        if any(a.date > b.date for a, b in zip(model.noten, model.noten[1:])):
+            return False
+        return all(cls._kategorie(model, typ) is not None for typ in set(map(type, model.noten)))
+
+    @staticmethod
+    def _kategorie(model, typ):
+        keys = [key for key, types in model._leistungs_types.items() if issubclass(typ, tuple(types))]
+        return keys[0] if len(keys) == 1 else None
+
+    def mittelwert(self, key):
+        """
+        Mittelwert der gültigen Noten einer Kategorie als NoteValue oder None.
+        """
+        if self.n_valid[key] == 0:
+            return None
+        if key not in self._mittelwerte:
+            self._mittelwerte[key] = np.mean(self._werte[key][:self.n_valid[key]])
+        return NoteValue(self._mittelwerte[key], system=self.model.system)
+
+    def weight(self, key):
+        weight = Weight._from_mean(self.mittelwert(key), self.n_valid[key])
+        if key not in self._anteile:
+            self._anteile[key] = Weight._anteile_fuer(self._typen[key])
+        weight._anteile = self._anteile[key]
+        return weight
+
+    def verbesserungen(self, mean, w_th):
+        """
+        Wertet die Verbesserungen aller bisherigen Leistungen für den schriftlichen Schnitt mean aus und gibt das
+        Weight-Objekt der Verbesserungen zurück. Es entspricht Verbesserungen.weight() aus _set_verbesserungen.
+        """
+        if not isinstance(mean, (NoteEntity, NoteValue)):
+            raise ValueError("Es muss ein gültiges Notenobjekt übergeben werden")
+        self._v_mittel = float(mean)
+        werte = Verbesserungen._werte_fuer(float(mean), w_th, self.model.system, self._status[:self._n_status])
+
+        if len(werte) == 0:
+            self.n_verbesserungen = 0
+            return Weight._from_mean(None, 0)
+
+        self.n_verbesserungen = len(werte) if self.nv1 != self.nv2 else 0
+        weight = Weight._from_mean(NoteValue(np.mean(werte), system=self.model.system), len(werte))
+        weight._anteile = Weight._anteile_fuer([LeistungV] * len(werte))
+        return weight
+
+    def _add(self, leistung):
+        typ = type(leistung)
+        if typ not in self._kategorien:
+            self._kategorien[typ] = self._kategorie(self.model, typ)
+        key = self._kategorien[typ]
+
+        self.leistungen.append(leistung)
+        self.datum = leistung.date
+        self.n[key] += 1
+        self._typen[key].append(typ)
+        self._anteile.pop(key, None)
+        wert = float(leistung.note)
+        if not np.isnan(wert):
+            self._werte[key] = self._platz(self._werte[key], self.n_valid[key])
+            self._werte[key][self.n_valid[key]] = wert
+            self.n_valid[key] += 1
+            self._mittelwerte.pop(key, None)
+
+        if leistung.status._enabled:
+            self.v_enabled = True
+            code = self._status_codes[leistung.status.status]
+            self._status = self._platz(self._status, self._n_status)
+            self._status[self._n_status] = code
+            self._n_status += 1
+            self.nv1 += code == 1
+            self.nv2 += code == 2
+
+        if self._limits is not None:
+            for idx in self._limits._indizes(typ):
+                self._limit_counts[idx] += 1
+
+    @staticmethod
+    def _platz(werte, n):
+        # Vergrößert das Array bei Bedarf auf das Doppelte, z.B. für hypothetische Leistungen
+        if n < len(werte):
+            return werte
+        neu = np.empty(max(2 * len(werte), 8), dtype=werte.dtype)
+        neu[:n] = werte[:n]
+        return neu
+
+    def _entfernen(self, leistung):
+        """
+        Macht _add für die zuletzt hinzugefügte Leistung rückgängig.
+        """
+        if not self.leistungen or self.leistungen[-1] is not leistung:
+            raise ValueError("Es kann nur die zuletzt hinzugefügte Leistung entfernt werden.")
+        typ = type(leistung)
+        key = self._kategorien[typ]
+
+        self.leistungen.pop()
+        self.n[key] -= 1
+        self._typen[key].pop()
+        self._anteile.pop(key, None)
+        if not np.isnan(float(leistung.note)):
+            self.n_valid[key] -= 1
+            self._mittelwerte.pop(key, None)
+
+        if leistung.status._enabled:
+            self._n_status -= 1
+            code = self._status_codes[leistung.status.status]
+            self.nv1 -= code == 1
+            self.nv2 -= code == 2
+            self.v_enabled = self._n_status > 0
+
+        if self._limits is not None:
+            for idx in self._limits._indizes(typ):
+                self._limit_counts[idx] -= 1
+
+    def _setze_wert(self, leistung, wert):
+        """
+        Ersetzt die Note der zuletzt hinzugefügten gültigen Leistung ihrer Kategorie, ohne die Leistung zu verändern.
+        """
+        key = self._kategorien[type(leistung)]
+        self._werte[key][self.n_valid[key] - 1] = wert
+        self._mittelwerte.pop(key, None)
+
+    @contextmanager
+    def hypothetisch(self, leistungen):
+        """
+        Fügt Leistungen für die Dauer des Blocks hinzu und entfernt sie danach wieder. Liegen die Leistungen nach
+        allen bisherigen, entspricht der Zwischenstand bitgleich einer vollständigen Berechnung.
+        """
+        datum = self.datum
+        hinzugefuegt = []
+        try:
+            for leistung in leistungen:
+                self._add(leistung)
+                hinzugefuegt.append(leistung)
+            daten = [leistung.date for leistung in hinzugefuegt] + ([datum] if datum is not None else [])
+            self.datum = max(daten) if daten else None
+            yield self
+        finally:
+            for leistung in reversed(hinzugefuegt):
+                self._entfernen(leistung)
+            self.datum = datum
+
+    def _validate(self, leistung):
+        """
+        Führt die Prüfungen aus berechne_gesamtnote in derselben Reihenfolge für die neu hinzugefügte Leistung aus.
+        Ein einmal aufgetretener Fehler bleibt für alle folgenden Zwischenstände bestehen, da die Leistung in der
+        Liste verbleibt.
+        """
+        # Schuljahr
+        start = self.leistungen[0].date
+        if (leistung.date - start).days > 365:
+            raise ValueError('Die hinzugefügten Noten liegen mehr als 1 Jahr auseinander.')
+        if self._sj_ende is None:
+            SJ = start.year if start.month >= 9 else start.year - 1
+            self._sj_ende = datetime(SJ + 1, 7, 31)
+        if leistung.date > self._sj_ende:
+            raise ValueError('Alle Noten müssen sich innerhalb eines Schuljahres bewegen.')
+
+        # Nummerierung
+        if self._fehler_nr is not None:
+            raise self._fehler_nr
+        typ = type(leistung)
+        last = self._nr.get(typ)
+        if leistung.nr is None:
+            nr = 1 if last is None else last + 1
+        else:
+            nr = leistung.nr
+        if last is not None and nr <= last:
+            self._fehler_nr = ValueError("Ungültige Nummerierung.")
+            raise self._fehler_nr
+        self._nr[typ] = nr
+
+        # Zeiträume der mündlichen Noten
+        if leistung._is_punctual == False:
+            nummer = len(self._zeitraeume.leistungen)
+            self._zeitraum_konflikte.extend((other, nummer) for other in self._zeitraeume._hinzufuegen(leistung))
+            self._zeitraum_konflikte.sort()
+        if self._zeitraum_konflikte:
+            raise self.model._time_range_error([(self._zeitraeume.leistungen[first], self._zeitraeume.leistungen[second]) for first, second in self._zeitraum_konflikte])
+
+        # Notensystem
+        if self._fehler_system is not None:
+            raise self._fehler_system
+        try:
+            leistung.to(self.model.system)
+        except ValueError as e:
+            self._fehler_system = e
+            raise
+
+    def _check_limits(self):
+        if self._limits is None:
+            return None
+        counts = list(self._limit_counts)
+        for idx in self._limits._indizes(LeistungV):
+            counts[idx] += self.n_verbesserungen
+        if not any(limit['max'] is not None and count > limit['max'] for count, limit in zip(counts, self._limits.limits)):
+            return None
+        checks = self._limits._evaluate_limits(counts)
+        return self._limits._report_limits(checks, show_warnings=False, info=self.model.info)
+
+    def step(self, leistung):
+        """
+        Fügt die nächste Leistung hinzu und berechnet den Zwischenstand.
+        """
+        self._add(leistung)
+        self._validate(leistung)
+
+        result = self.model._calculate_statistik(self)
+        if not isinstance(result, Note):
+            raise ValueError(f'Die interne Notenberechnungsmethode muss ein Objekt der Klasse Note zurückgeben')
+
+        self._check_limits()
+        return result
+
+    def time_series(self, meldungen=None, schritte=None, ab=0):
+        """
+        Berechnet den Zwischenstand nach jeder Leistung. Die Schritte (Ergebnis, Meldung, Anzahl der Verbesserungen)
+        werden in self.schritte abgelegt. Werden die schritte einer früheren Berechnung übergeben, deren erste ab
+        Leistungen unverändert sind, werden diese Leistungen nur hinzugefügt und geprüft und ihre Ergebnisse
+        übernommen, da jeder Zwischenstand nur von den Leistungen bis zu diesem Schritt abhängt. Wie bei einem
+        Treffer im NotenCache werden für übernommene Schritte nur die Meldungen erneut ausgegeben.
+        """
+        self.schritte = []
+        ergebnisse = []
+        for idx, note in enumerate(self.model.noten):
+            if schritte is not None and idx < ab:
+                ergebnis, meldung, n_verbesserungen = schritte[idx]
+                self._add(note)
+                try:
+                    self._validate(note)
+                except ValueError:
+                    pass
+                # Wird sonst von _calculate_statistik gesetzt und von den Limits der folgenden Schritte verwendet
+                self.n_verbesserungen = n_verbesserungen
+            else:
+                ergebnis, meldung = None, None
+                try:
+                    ergebnis = self.step(note)
+                except ValueError as e:
+                    meldung = f"Fehler beim Hinzufügen der Note: {str(e)}"
+            self.schritte.append((ergebnis, meldung, self.n_verbesserungen))
+
+            if meldung is not None:
+                print(meldung)
+                if meldungen is not None:
+                    meldungen.append(meldung)
+            else:
+                ergebnisse.append(ergebnis)
+        return ergebnisse
+
+class ModellStatistik:
+    """
+    Stellt die Schnittstelle von LeistungsStatistik über alle Leistungen eines Modells bereit, damit _calculate und
+    die Zeitreihe dieselbe _calculate_statistik verwenden. Die Mittelwerte und Verbesserungen kommen aus
+    _get_weight_for_category und _set_verbesserungen des Modells und nutzen deren Zwischenspeicher.
+    """
+    def __init__(self, model):
+        self.model = model
+        self.datum = model.noten[-1].date if model.noten else None
+        self.n = {key: len(model._get_leistung_for_category(key)) for key in model._leistungs_types}
+        self.v_enabled = any(note.status._enabled for note in model.noten)
+        self.nv1 = 0
+        self.nv2 = 0
+
+    def weight(self, key):
+        return self.model._get_weight_for_category(key)
+
+    def verbesserungen(self, mean, w_th):
+        """
+        Setzt die Verbesserungen des Modells für den schriftlichen Schnitt mean und gibt ihr Weight-Objekt zurück.
+        Zählt keine Verbesserung (nv1 == nv2), werden die Verbesserungen des Modells zurückgesetzt.
+        """
+        self.model._set_verbesserungen(mean=mean)
+        self.nv1 = self.model._verbesserungen.nv1
+        self.nv2 = self.model._verbesserungen.nv2
+        if self.nv1 == self.nv2:
+            self.model._verbesserungen = Verbesserungen()
+            return Weight._from_mean(None, 0)
+        return self.model._verbesserungen.weight()
+
+class _Stand:
+    """
+    Stand von Konfiguration und Leistungen für die Änderungsverfolgung. Statt Kopien der Felder wird je Leistung das
+    Objekt und je Art der Änderung (siehe NotenberechnungGeneric._felder) ein Hashwert der Felder gespeichert.
+    """
+    __slots__ = ('konfiguration', 'leistungen', 'codes')
+
+    def __init__(self, konfiguration, leistungen, codes):
+        self.konfiguration = konfiguration
+        self.leistungen = leistungen
+        # array statt numpy, das Anlegen aus einer Liste ist deutlich schneller
+        self.codes = array.array('q', codes)
+
+    def __len__(self):
+        return len(self.leistungen)
+
+    def tabelle(self, n=None):
+        """
+        Hashwerte der ersten n Leistungen als Matrix, eine Spalte je Art der Änderung.
+        """
+        n = len(self) if n is None else n
+        spalten = len(NotenberechnungGeneric._felder)
+        return np.frombuffer(self.codes, dtype=np.int64, count=n * spalten).reshape(n, spalten)
+
+    def gleiche_leistungen(self, other):
+        """
+        Anzahl der ersten Positionen, an denen beide Stände dieselben Leistungsobjekte enthalten.
+        """
+        for idx, (vorher, nachher) in enumerate(zip(self.leistungen, other.leistungen)):
+            if vorher is not nachher:
+                return idx
+        return min(len(self), len(other))
+
+    def __eq__(self, other):
+        if not isinstance(other, _Stand):
+            return NotImplemented
+        return (self.konfiguration == other.konfiguration and len(self) == len(other)
+                and self.gleiche_leistungen(other) == len(self) and self.codes == other.codes)
+
+    __hash__ = None
+
+def _gesperrt(methode):
+    """
+    Führt eine Methode unter der Sperre der Notenberechnung aus. Die Sperre ist wiedereintrittsfähig, gesperrte
+    Methoden können sich also gegenseitig aufrufen.
+    """
+    @functools.wraps(methode)
+    def gesperrt(self, *args, **kwargs):
+        with self._lock:
+            return methode(self, *args, **kwargs)
+    return gesperrt
+
 class NotenberechnungGeneric:
     """
     Mit dieser Klasse werden Noten berechnet und auf Gültigkeit der Notenbildungsverordnung überprüft.
+
+    Die öffentlichen Methoden sind über eine Sperre pro Objekt geschützt, dieselbe Notenberechnung kann daher aus
+    mehreren Threads verwendet werden. Für Server sollte die Konfiguration als KonfigurationNVO übergeben werden statt
+    ConfigNVO.update aufzurufen, zusätzlich übergebene Werte ersetzen die der Konfiguration. Eine Leistung darf nur
+    zu einer Notenberechnung gehören, da Nummerierung und Verkettung an der Leistung gespeichert werden.
     """
     _leistungs_types = {
                         'KA' : [LeistungKA, LeistungGFS],
                         'KT' : [LeistungKT, LeistungS, LeistungP],
                         'm'  : [LeistungM, LeistungE],
                         }
+    # Abgeleitete Werte, die von einer Art der Änderung abhängen (siehe _veraltet). Note und Status lassen
+    # Reihenfolge, Schuljahr, Nummerierung und Zeiträume unverändert, eine neue Note nur den Mittelwert ihrer
+    # Kategorie. Die Verbesserungen hängen zusätzlich von m_s1 ab und werden bei einem anderen Schnitt neu bestimmt.
+    # Jeder Zwischenstand der Zeitreihe hängt nur von den Leistungen bis zu diesem Schritt ab (siehe _time_series).
+    _abhaengigkeiten = {
+                        'note' : ('mittelwert', 'gesamtnote'),
+                        'status' : ('verbesserungen', 'gesamtnote', 'limits'),
+                        'system' : ('pruefung', 'kategorien', 'mittelwert', 'verbesserungen', 'gesamtnote', 'limits'),
+                        'datum' : ('pruefung', 'kategorien', 'mittelwert', 'verbesserungen', 'gesamtnote', 'limits'),
+                        'leistungen' : ('pruefung', 'kategorien', 'mittelwert', 'verbesserungen', 'gesamtnote', 'limits'),
+                        'konfiguration' : ('pruefung', 'kategorien', 'mittelwert', 'verbesserungen', 'gesamtnote', 'limits'),
+                        }
+    # Arten der Änderung einer Leistung, je Art ein Hashwert der Felder in _stand
+    _felder = ('note', 'system', 'datum', 'status')
+    # Mit leistung_aendern änderbare Angaben
+    _aenderbar = ('note', 'status', 'due', 'date', 'von', 'bis', 'nr')
+    # Werte ohne übergebene Konfiguration, wie bisher die Vorgabewerte beim Import
+    _voreinstellung = KonfigurationNVO()
+
     def __init__(self,
-                 w_sm = ConfigNVO.w_sm,
-                 w_th = ConfigNVO.w_th,
-                 w_s0 = ConfigNVO.w_s0,
-                 n_KT_0 = ConfigNVO.n_KT_0,
-                 system = ConfigNVO.system,
-                 v_enabled = ConfigNVO.v_enabled,
+                 w_sm = None,
+                 w_th = None,
+                 w_s0 = None,
+                 n_KT_0 = None,
+                 system = None,
+                 v_enabled = None,
                  fach=None,
                  parent = None,
+                 cache = None,
+                 konfiguration = None,
                  ):
+        if konfiguration is None:
+            konfiguration = self._voreinstellung
+        elif not isinstance(konfiguration, KonfigurationNVO):
+            raise ValueError("Die Konfiguration muss ein Objekt der Klasse KonfigurationNVO sein.")
+        # Ausdrücklich übergebene Werte haben Vorrang vor der Konfiguration (z.B. v_enabled in NotenberechnungSimple)
+        werte = {'w_sm' : w_sm, 'w_th' : w_th, 'w_s0' : w_s0, 'n_KT_0' : n_KT_0, 'system' : system, 'v_enabled' : v_enabled}
+        w_sm, w_th, w_s0, n_KT_0, system, v_enabled = [getattr(konfiguration, key) if wert is None else wert for key, wert in werte.items()]
+        self._lock = threading.RLock()
         self._typ = None
+        self._cache = cache
         self._fach = None
         if fach is not None:
             if not issubclass(fach, FachGeneric):
@@ -110,15 +626,45 @@ class NotenberechnungGeneric:
         self.w_th = float(w_th)
         self.system = system
         self.noten = []
-        self._verbesserungen = []
+        self._verbesserungen = Verbesserungen()
         self.sj_start, self.sj_ende = None, None
         self._v_enabled = v_enabled
         self._art = ['m', 'KT', 'KA', 'GFS']
         self._fig = None
         self._ax = None
+        self._stapel = None
+        self._stapel_fehler = None
+        # Statistik des aktuellen Stands für was_waere_wenn und benoetigte_note
+        self._prognose = None
+        # Schnitt, mit dem die Verbesserungen zuletzt gesetzt wurden
+        self._v_mittel = None
+        # Änderungsverfolgung: Zähler der erkannten Änderungen, je Verbraucher (gesamtnote, time_series, ...) der
+        # Stand der letzten Berechnung und die zwischengespeicherten abgeleiteten Werte
+        self._revision = 0
+        self._staende = {}
+        self._abgeleitet = {}
+        self._verfolgt = False
                 
         self._validate_leistungs_types()
 
+    def __getstate__(self):
+        # Die Sperre wird beim Kopieren und bei der Übergabe an andere Prozesse neu erzeugt, die Statistik für
+        # Prognosen und die abgeleiteten Werte der Änderungsverfolgung bei Bedarf neu berechnet
+        zustand = self.__dict__.copy()
+        zustand.pop('_lock', None)
+        zustand.pop('_prognose', None)
+        zustand.pop('_staende', None)
+        zustand.pop('_abgeleitet', None)
+        return zustand
+
+    def __setstate__(self, zustand):
+        self.__dict__.update(zustand)
+        self._lock = threading.RLock()
+        self._prognose = None
+        self._staende = {}
+        self._abgeleitet = {}
+        self._verfolgt = False
+
     def _validate_leistungs_types(self):
         is_valid = len(self._get_list_of_allowed_leistungen())==len(list(set(self._get_list_of_allowed_leistungen())))
         if not is_valid:
@@ -137,6 +683,7 @@ class NotenberechnungGeneric:
                 self.parent = parent
                 self.info = self.parent._get_sid_vars_as_dict()        
 
+    @_gesperrt
     def to(self, newsystem):
         if not issubclass(newsystem, SystemGeneric):
             raise ValueError(f'Das System muss eine Instanz der SystemGeneric-Klasse sein.')
@@ -147,33 +694,55 @@ class NotenberechnungGeneric:
             self.system = newsystem
             
     def _set_verbesserungen(self, mean=None):
-        if not isinstance(mean, NoteEntity):
+        if not isinstance(mean, (NoteEntity, NoteValue)):
             raise ValueError("Es muss ein gültiges Notenobjekt übergeben werden")
-        
-        verbesserungen = [ LeistungV(mean=mean, status = note.status, system = note.system, w_th = self.w_th, date=note.date, due=note.status.due) for note in self.noten ]
-        self._verbesserungen = [verbesserung for verbesserung in verbesserungen if not np.isnan(verbesserung.note)]
+        self._v_mittel = float(mean)
+        if self._verfolgt:
+            # Die Verbesserungen hängen nur von den Status und dem Schnitt ab
+            vorher = self._abgeleitet.get('verbesserungen')
+            if vorher is None or vorher[0] != self._v_mittel:
+                vorher = self._abgeleitet['verbesserungen'] = (self._v_mittel, Verbesserungen(self.noten, mean=mean, w_th=self.w_th, system=self.system))
+            self._verbesserungen = vorher[1]
+            return
+        self._verbesserungen = Verbesserungen(self.noten, mean=mean, w_th=self.w_th, system=self.system)
         
     def _get_verbesserungen(self):
-        return [verbesserung for verbesserung in self._verbesserungen if not np.isnan(verbesserung.note)]
+        return self._verbesserungen.leistungen()
     
+    @profiliert('_check_time_range')
     def _check_time_range(self):
         noten_with_range = list(filter(lambda x: x._is_punctual==False, self.noten))
-        for pair in itertools.combinations(noten_with_range, 2):
-            if pair[0].von <= pair[1].bis and pair[0].bis >= pair[1].von:
-                raise ValueError(f"Die Zeiträume der mündlichen Noten überschneiden sich: {pair[0]} von {pair[0].date} und {pair[1]} vom {pair[1].date}")
+        paare = ZeitraumIndex.paare(noten_with_range)
+        if paare:
+            raise self._time_range_error(paare)
+
+    @staticmethod
+    def _time_range_error(paare):
+        konflikte = "; ".join(f"{first} von {first.date} und {second} vom {second.date}" for first, second in paare)
+        return ValueError(f"Die Zeiträume der mündlichen Noten überschneiden sich: {konflikte}")
         
+    @profiliert('_check_limits')
     def _check_limits(self, show_warnings = False):
         if self._fach==None:
             return None
+
+        if self._verfolgt:
+            # Die Anzahlen ändern sich nur mit den Leistungen und der Anzahl der Verbesserungen
+            vorher = self._abgeleitet.get('limits')
+            if vorher is None or vorher[0] != len(self._verbesserungen):
+                vorher = self._abgeleitet['limits'] = (len(self._verbesserungen), self._fach.limits._check_limits(self.noten, weitere = {LeistungV : len(self._verbesserungen)}))
+            return self._fach.limits._report_limits(vorher[1], show_warnings=show_warnings, info=self.info)
         
         checks = self._fach.limits.check_limits(
-                                                self.noten+self._get_verbesserungen(),
+                                                self.noten,
                                                 show_warnings=show_warnings,
                                                 info = self.info,
+                                                weitere = {LeistungV : len(self._verbesserungen)},
                                                 )
         
         return checks
             
+    @profiliert('_set_SJ')
     def _set_SJ(self):
          dates = [note.date for note in self.noten]
          min_date = min(dates)
@@ -198,10 +767,16 @@ class NotenberechnungGeneric:
             
     def add_from_excel(self, path):
         df = pd.read_excel(path)
-        for _,row in df.iterrows():
-            self.note_hinzufuegen(**row)
+        with self.stapel():
+            for _,row in df.iterrows():
+                self.note_hinzufuegen(**row)
 
-    def _update_links(self):
+    @profiliert('_update_links')
+    def _update_links(self, fehler=None):
+        """
+        Verknüpft die Leistungen eines Typs und setzt die Nummerierung. Wird eine Liste fehler übergeben, werden
+        ungültig nummerierte Leistungen dort gesammelt statt einen Fehler zu werfen.
+        """
         if not self.noten:
             return
         
@@ -223,7 +798,9 @@ class NotenberechnungGeneric:
                 
                 if self.noten[indices[idx]].last!=None:
                     if self.noten[indices[idx]]._nr <= self.noten[indices[idx]].last._nr:
-                        raise ValueError("Ungültige Nummerierung.")
+                        if fehler is None:
+                            raise ValueError("Ungültige Nummerierung.")
+                        fehler.append((self.noten[indices[idx]], "Ungültige Nummerierung."))
     
     def _get_full_dataframe(self):
         return self._get_dataframe(func=self._get_list_with_verbesserungen)
@@ -236,44 +813,391 @@ class NotenberechnungGeneric:
     def _get_list(self):
         return [note._as_dict() for note in self.noten]
     
-    def _get_list_with_verbesserungen(self):
+    def _get_leistungen_with_verbesserungen(self):
         full_list = self.noten + self._get_verbesserungen()
         full_list.sort(key=lambda x: x.date)
-        full_list = [item._as_dict() for item in full_list]
         return full_list
 
+    def _get_list_with_verbesserungen(self):
+        return [item._as_dict() for item in self._get_leistungen_with_verbesserungen()]
+
+    def _fingerprint(self, *extra):
+        """
+        Prüfsumme über Modell, Konfiguration und alle Leistungen. Zusätzliche Angaben (z.B. Name und Format eines
+        Plots) können über extra einbezogen werden. Die Prüfsummen werden bis zur nächsten Änderung gespeichert.
+        """
+        with self._lock:
+            stand = self._aktueller_stand()
+            if stand != self._staende.get('fingerprint'):
+                self._staende['fingerprint'] = stand
+                self._abgeleitet['fingerprint'] = {}
+            pruefsummen = self._abgeleitet['fingerprint']
+            if extra not in pruefsummen:
+                pruefsummen[extra] = self._pruefsumme(*extra)
+            return pruefsummen[extra]
+
+    def _pruefsumme(self, *extra):
+        inhalt = [
+                  f'{type(self).__module__}.{type(self).__qualname__}', PackageInfo.version, PackageInfo.hash,
+                  self.system.__name__, self._fach.__name__ if self._fach else None,
+                  self.w_th, self.w_s0, self.w_sm, self.n_KT_0, self._v_enabled,
+                  ]
+        for note in self.noten:
+            # Datumsangaben als Text, damit pandas.Timestamp und datetime dieselbe Prüfsumme ergeben
+            inhalt.append((note._art, float(note.note), str(note.date), note.status.text, note._get_nr(), str(note.von), str(note.bis), str(note.status.due)))
+        inhalt.extend(extra)
+        return hashlib.sha256(repr(inhalt).encode()).hexdigest()
+
+    def _stand(self):
+        """
+        Stand von Konfiguration und Leistungen, gegen den Änderungen erkannt werden. Je Leistung das Objekt und je Art
+        aus _felder ein Hashwert der Felder, so werden auch Änderungen erkannt, die direkt an noten oder einer
+        Leistung erfolgen.
+        """
+        konfiguration = (type(self), self.system, self._fach, self.w_th, self.w_s0, self.w_sm, self.n_KT_0, self._v_enabled)
+        codes = []
+        for note in self.noten:
+            wert, status = note.note, note.status
+            codes.extend((hash(wert.tobytes()), id(wert.system), hash((note.date, note.von, note.bis, note.nr, note._nr)),
+                          hash((status._enabled, status.status, status.text, status.due))))
+        return _Stand(konfiguration, tuple(self.noten), codes)
+
+    def _aktueller_stand(self):
+        """
+        Liefert den aktuellen Stand und erhöht die Revision, wenn er sich seit dem letzten Aufruf geändert hat. Ein
+        unveränderter Stand wird als dasselbe Objekt geliefert, damit ihn die Verbraucher in _staende teilen.
+        """
+        stand = self._stand()
+        vorher = self._staende.get('revision')
+        if stand == vorher:
+            return vorher
+        self._revision += 1
+        self._staende['revision'] = stand
+        return stand
+
+    @_gesperrt
+    def _aktuelle_revision(self):
+        """
+        Zähler der Änderungen an Leistungen und Konfiguration, z.B. um nach Änderungen betroffene Schüler zu finden.
+        """
+        self._aktueller_stand()
+        return self._revision
+
+    @classmethod
+    def _aenderungen(cls, alt, neu):
+        """
+        Vergleicht zwei Stände aus _stand. Liefert die Arten der Änderungen (siehe _abhaengigkeiten), die erste
+        geänderte Position in noten und die geänderten Leistungen, die weiterhin in noten enthalten sind.
+        """
+        if alt is None or alt.konfiguration != neu.konfiguration:
+            return {'konfiguration'}, 0, []
+        # Bis zur ersten anderen Leistung werden die Felder verglichen, danach gilt alles als geändert
+        gleich = alt.gleiche_leistungen(neu)
+        unterschiede = alt.tabelle(gleich) != neu.tabelle(gleich)
+        zeilen = np.flatnonzero(unterschiede.any(axis=1))
+        arten = {art for art, spalte in zip(cls._felder, unterschiede.T) if spalte.any()}
+        geaendert = [neu.leistungen[idx] for idx in zeilen]
+        ab = int(zeilen[0]) if len(zeilen) else None
+        if gleich < max(len(alt), len(neu)):
+            arten.add('leistungen')
+            ab = gleich if ab is None else ab
+        return arten, len(neu) if ab is None else ab, geaendert
+
+    def _veraltet(self, name, stand):
+        """
+        Abgeleitete Werte, die seit der letzten Berechnung des Verbrauchers name veraltet sind, und die Kategorien
+        mit veraltetem Mittelwert (None für alle).
+        """
+        arten, _, geaendert = self._aenderungen(self._staende.get(name), stand)
+        veraltet = set()
+        for art in arten:
+            veraltet.update(self._abhaengigkeiten[art])
+        kategorien = None
+        if arten <= {'note', 'status'}:
+            kategorien = {LeistungsStatistik._kategorie(self, type(note)) for note in geaendert}
+        return veraltet, kategorien
+
+    @contextmanager
+    def _verfolgen(self, veraltet, kategorien=None):
+        """
+        Verwirft die veralteten abgeleiteten Werte. Innerhalb des Blocks verwenden _get_leistung_for_category,
+        _get_weight_for_category, _set_verbesserungen und _check_limits die übrigen zwischengespeicherten Werte.
+        """
+        abgeleitet = self._abgeleitet
+        for name in ('kategorien', 'verbesserungen', 'gesamtnote', 'limits'):
+            if name in veraltet:
+                abgeleitet.pop(name, None)
+        if 'mittelwert' in veraltet:
+            if kategorien is None:
+                abgeleitet.pop('mittelwert', None)
+            else:
+                for key in kategorien:
+                    abgeleitet.get('mittelwert', {}).pop(key, None)
+
+        verfolgt, self._verfolgt = self._verfolgt, True
+        try:
+            yield abgeleitet
+        finally:
+            self._verfolgt = verfolgt
+
     def _get_leistung_for_types(self, *args):
         return list(filter(lambda x: any(isinstance(x, arg) for arg in args), self.noten))
     
     def _get_leistung_for_category(self, key):
         if key not in self._leistungs_types.keys():
             raise ValueError(f"Unbekannte Kathegorie. Erlaubt ist: {', '.join(self._leistungs_types.keys())}")
-            
-        return self._get_leistung_for_types(*self._leistungs_types.get(key))
+        if not self._verfolgt:
+            return self._get_leistung_for_types(*self._leistungs_types.get(key))
+
+        kategorien = self._abgeleitet.setdefault('kategorien', {})
+        if key not in kategorien:
+            kategorien[key] = self._get_leistung_for_types(*self._leistungs_types.get(key))
+        return list(kategorien[key])
         
     def _get_weight_for_types(self, *args):
         return Weight(*self._get_leistung_for_types(*args))
+
+    def _get_weight_for_category(self, key):
+        """
+        Weight über die Leistungen einer Kategorie, gleich Weight(*self._get_leistung_for_category(key)). In
+        berechne_gesamtnote wird es nur neu gebildet, wenn sich eine Leistung der Kategorie geändert hat.
+        """
+        if not self._verfolgt:
+            return Weight(*self._get_leistung_for_category(key))
+
+        mittelwerte = self._abgeleitet.setdefault('mittelwert', {})
+        if key not in mittelwerte:
+            mittelwerte[key] = Weight(*self._get_leistung_for_category(key))
+        # set_weight verändert das Objekt, daher eine Kopie
+        return copy.copy(mittelwerte[key])
     
     def _update_handler_after_added_leistung(self):
         self._sort_grade_after_date()
         self._set_SJ()
         self._update_links()
     
-    def leistung_hinzufuegen(self, Leistung):
+    def _pruefe_leistung(self, Leistung):
         if not isinstance(Leistung, LeistungGeneric):
             raise ValueError(f'Ungültiges Leistungsobjekt. Es muss ein Objekt der (Sub-)Klasse LeistungGeneric übergeben werden.')
         if not type(Leistung) in self._get_list_of_allowed_leistungen():
             raise ValueError(f'Die Leistung ist in dem aktuellen Modell nicht mit einbezogen.')
-            
+
+    @_gesperrt
+    def leistung_hinzufuegen(self, Leistung):
+        if self._stapel is not None:
+            try:
+                self._pruefe_leistung(Leistung)
+                self._stapel.append(Leistung)
+            except ValueError as e:
+                self._stapel_fehler.append(f"{Leistung}: {e}")
+            return
+
+        self._pruefe_leistung(Leistung)
         self.noten.append(Leistung)
         self._update_handler_after_added_leistung()
 
+    @_gesperrt
+    def leistungen_hinzufuegen(self, *leistungen):
+        """
+        Fügt mehrere Leistungen auf einmal hinzu. Sortierung, Prüfung des Schuljahres und Nummerierung werden nur
+        einmal am Ende durchgeführt. Ist eine der Leistungen ungültig, wird keine übernommen und ein Fehler mit allen
+        fehlerhaften Leistungen geworfen.
+        """
+        if self._stapel is not None:
+            for Leistung in leistungen:
+                self.leistung_hinzufuegen(Leistung)
+            return
+        self._leistungen_einfuegen(leistungen, [])
+
+    @profiliert('_leistungen_einfuegen')
+    def _leistungen_einfuegen(self, leistungen, fehler):
+        gueltig = []
+        # Eine Leistung darf nur einmal enthalten sein (Vergleich über die Identität)
+        enthalten = {id(note) for note in self.noten}
+        for Leistung in leistungen:
+            try:
+                self._pruefe_leistung(Leistung)
+                if id(Leistung) in enthalten:
+                    raise ValueError('Die Leistung wurde bereits hinzugefügt.')
+                enthalten.add(id(Leistung))
+                gueltig.append(Leistung)
+            except ValueError as e:
+                fehler.append(f"{Leistung}: {e}")
+        if not gueltig:
+            if fehler:
+                raise self._leistungen_error(fehler)
+            return
+
+        bisher = list(self.noten)
+        sicherung = [(note, note.head, note.last, note._nr) for note in bisher]
+        sj = (self.sj_start, self.sj_ende)
+
+        ursache = None
+        try:
+            self.noten.extend(gueltig)
+            self._sort_grade_after_date()
+            ungueltig = self._pruefe_schuljahr(bisher or self.noten)
+            if not ungueltig:
+                self._set_SJ()
+            self._update_links(fehler=ungueltig)
+            fehler.extend(f"{Leistung}: {text}" for Leistung, text in ungueltig)
+        except Exception as e:
+            # Auch bei unerwarteten Fehlern den vorherigen Stand wiederherstellen
+            ursache = e
+            fehler.append(f"{type(e).__name__}: {e}")
+
+        if fehler:
+            self.noten = bisher
+            for note, head, last, nr in sicherung:
+                note.head, note.last, note._nr = head, last, nr
+            self.sj_start, self.sj_ende = sj
+            raise self._leistungen_error(fehler) from ursache
+
+    def _pruefe_schuljahr(self, referenz):
+        """
+        Liefert alle Leistungen, die nicht in dem Schuljahr der frühesten Leistung aus referenz liegen.
+        """
+        min_date = min(note.date for note in referenz)
+        SJ = min_date.year if min_date.month >= 9 else min_date.year - 1
+        sj_start = datetime(SJ, 9, 1)
+        sj_ende = datetime(SJ + 1, 7, 31)
+        return [(note, 'Alle Noten müssen sich innerhalb eines Schuljahres bewegen.') for note in self.noten if not (sj_start <= note.date <= sj_ende)]
+
+    @staticmethod
+    def _leistungen_error(fehler):
+        zeilen = "\n".join(f"  {text}" for text in fehler)
+        return ValueError(f"Fehler bei {len(fehler)} Leistung(en), es wurde keine Leistung hinzugefügt:\n{zeilen}")
+
+    @contextmanager
+    def stapel(self):
+        """
+        Sammelt alle im Block mit leistung_hinzufuegen oder note_hinzufuegen übergebenen Leistungen und fügt sie am
+        Ende gemeinsam mit leistungen_hinzufuegen ein. Fehler werden pro Leistung gesammelt und am Ende gemeinsam
+        gemeldet.
+
+        with notenberechnung.stapel():
+            for note in noten:
+                notenberechnung.note_hinzufuegen(**note)
+        """
+        with self._lock:
+            if self._stapel is not None:
+                yield self
+                return
+
+            self._stapel, self._stapel_fehler = [], []
+            try:
+                yield self
+                leistungen, fehler = self._stapel, self._stapel_fehler
+            finally:
+                self._stapel, self._stapel_fehler = None, None
+
+            self._leistungen_einfuegen(leistungen, fehler)
+
+    @_gesperrt
     def note_hinzufuegen(self, **kwargs):
+        if self._stapel is not None:
+            try:
+                return self._note_hinzufuegen(**kwargs)
+            except ValueError as e:
+                self._stapel_fehler.append(f"({kwargs.get('note')}; {kwargs.get('art')}; {kwargs.get('date')}): {e}")
+                return
+        self._note_hinzufuegen(**kwargs)
+
+    def _note_hinzufuegen(self, **kwargs):
+        self.leistung_hinzufuegen(self._erzeuge_leistung(**kwargs))
+
+    def _enthalten(self, leistung):
+        """
+        Liste (noten oder der offene Stapel) und Position einer Leistung dieser Notenberechnung.
+        """
+        for liste in (self.noten, self._stapel or []):
+            for idx, note in enumerate(liste):
+                if note is leistung:
+                    return liste, idx
+        raise ValueError('Die Leistung gehört nicht zu dieser Notenberechnung.')
+
+    def _verkettung_loesen(self, typ):
+        # Verkettung und Nummerierung einer Leistungsart werden von _update_links neu gesetzt
+        for note in self.noten:
+            if type(note) is typ:
+                note.head, note.last, note._nr = None, None, None
+
+    @_gesperrt
+    def leistung_aendern(self, leistung, **werte):
+        """
+        Ändert Note, Status, Frist, Datum, Zeitraum oder Nummer einer Leistung. Die Angaben werden wie beim Erzeugen
+        der Leistung geprüft, ungültige Änderungen werden nicht übernommen. Die nächste Berechnung von Gesamtnote und
+        Zeitreihe berechnet nur die Werte neu, die von der Änderung abhängen.
+
+        notenberechnung.leistung_aendern(leistung, note=2.5, status='fertig')
+        """
+        liste, _ = self._enthalten(leistung)
+        unbekannt = sorted(set(werte) - set(self._aenderbar))
+        if unbekannt:
+            raise ValueError(f"Unbekannte Angaben: {', '.join(unbekannt)}. Erlaubt ist: {', '.join(self._aenderbar)}")
+
+        angaben = {
+                   'note' : leistung.note,
+                   'system' : leistung.system,
+                   'date' : leistung.date,
+                   'status' : leistung.status._text,
+                   'due' : leistung.status.due,
+                   'nr' : leistung.nr,
+                   'von' : leistung.von,
+                   'bis' : leistung.bis,
+                   }
+        if 'date' in werte:
+            # Ein Zeitraum, der nur aus dem Datum bestand, folgt dem neuen Datum
+            for key in ['von', 'bis']:
+                if key not in werte and angaben[key] == leistung.date:
+                    angaben[key] = None
+        angaben.update(werte)
+        if not isinstance(angaben['note'], NoteEntity):
+            angaben['note'] = NoteEntity(angaben['note'], system=leistung.system)
+        neu = type(leistung)(**angaben)
+
+        felder = ['note', 'system', 'date', '_is_punctual', 'status', 'nr', 'von', 'bis']
+        vorher = [getattr(leistung, feld) for feld in felder]
+        for feld in felder:
+            setattr(leistung, feld, getattr(neu, feld))
+        if liste is not self.noten or not ({'date', 'nr'} & set(werte)):
+            return leistung
+
+        # Reihenfolge, Schuljahr und Nummerierung wie beim Hinzufügen prüfen
+        try:
+            self._verkettung_loesen(type(leistung))
+            self._update_handler_after_added_leistung()
+        except ValueError:
+            for feld, wert in zip(felder, vorher):
+                setattr(leistung, feld, wert)
+            self._verkettung_loesen(type(leistung))
+            try:
+                self._update_handler_after_added_leistung()
+            except ValueError:
+                pass
+            raise
+        return leistung
+
+    @_gesperrt
+    def leistung_entfernen(self, leistung):
+        """
+        Entfernt eine Leistung. Verkettung und Nummerierung der übrigen Leistungen dieser Art werden neu gesetzt.
+        """
+        liste, idx = self._enthalten(leistung)
+        del liste[idx]
+        self._verkettung_loesen(type(leistung))
+        leistung.head, leistung.last, leistung._nr = None, None, None
+        self._update_links()
+        return leistung
+
+    def _erzeuge_leistung(self, **kwargs):
         mandatory_keys = ['art', 'note', 'date']
         if all(key in kwargs for key in mandatory_keys):
             art = kwargs.get('art')
             note = kwargs.get('note')
             date = kwargs.get('date')
+            if not isinstance(art, str):
+                raise ValueError(f'Ungültige Art der Note: {art}')
             
             pars = {
                     'note' : note,
@@ -303,7 +1227,7 @@ class NotenberechnungGeneric:
             else:
                 raise ValueError(f'Ungültige Art der Note: {art}')
                 
-            self.leistung_hinzufuegen(Leistung)
+            return Leistung
 
         else:
             raise ValueError(f'Fehlende Informationen. Bitte geben Sie {" und ".join(mandatory_keys)} an.')
@@ -326,24 +1250,129 @@ class NotenberechnungGeneric:
         #
         
         return result
+
+    def _calculate_statistik(self, statistik):
+        """
+        Dummy Methode zur Berechnung der Noten aus einer LeistungsStatistik. Modelle, die diese Methode passend zu
+        _calculate implementieren, berechnen ihre Zeitreihe inkrementell.
+        """
+        result = Note(datum=statistik.datum, system=self.system)
+        
+        return result
         
 
+    @_gesperrt
+    @profiliert('berechne_gesamtnote')
     def berechne_gesamtnote(self, show_warnings = True):
-        #First run checks on noten
-        self._update_handler_after_added_leistung()
-        self._check_time_range()
-        self.to(self.system)
-        
+        """
+        Berechnet die Gesamtnote. Seit der letzten Berechnung geänderte Leistungen werden erkannt und nur die davon
+        abhängigen Werte neu berechnet (siehe _abhaengigkeiten), ohne Änderung wird eine Kopie des letzten Ergebnisses
+        geliefert.
+        """
+        stand = self._aktueller_stand()
+        veraltet, kategorien = self._veraltet('gesamtnote', stand)
+
+        try:
+            #First run checks on noten
+            if 'pruefung' in veraltet:
+                self._update_handler_after_added_leistung()
+                self._check_time_range()
+                self.to(self.system)
+                # Sortierung, Nummerierung und Umrechnung sind Teil des Stands
+                stand = self._aktueller_stand()
+
+            with self._verfolgen(veraltet, kategorien) as abgeleitet:
+                vorher = abgeleitet.get('gesamtnote')
+                if vorher is not None and vorher[0].system is self.system:
+                    result, self._verbesserungen = vorher
+                else:
+                    result = self._calculate_cached()
+                    if not isinstance(result, Note):
+                        raise ValueError(f'Die interne Notenberechnungsmethode muss ein Objekt der Klasse Note zurückgeben')
+                    abgeleitet['gesamtnote'] = (result, self._verbesserungen)
+
+                _ = self._check_limits(show_warnings = show_warnings)
+        except Exception:
+            # Die abgeleiteten Werte können aus dem fehlgeschlagenen Versuch stammen, daher alles neu berechnen
+            self._staende.clear()
+            self._abgeleitet.clear()
+            raise
+
+        self._staende['gesamtnote'] = stand
+        # Note.to und Note.update verändern das Objekt, daher erhält jeder Aufrufer eine eigene Kopie
+        return result._kopie()
+
+    @profiliert('_calculate')
+    def _calculate_cached(self):
+        """
+        Ruft _calculate auf oder liest das Ergebnis aus dem Cache. Die Verbesserungen werden mit gespeichert, da
+        _calculate sie als Nebeneffekt setzt.
+        """
+        if self._cache is None:
+            return self._calculate()
+
+        key = self._fingerprint('note')
+        eintrag = self._cache.get(key)
+        if eintrag is not None:
+            result, self._verbesserungen = eintrag
+            return result
+
         result = self._calculate()
-        if not isinstance(result, Note):
-            raise ValueError(f'Die interne Notenberechnungsmethode muss ein Objekt der Klasse Note zurückgeben')
-            
-        _ = self._check_limits(show_warnings = show_warnings)
-        
+        self._cache.set(key, (result, self._verbesserungen))
         return result
 
-    
+    @_gesperrt
+    @profiliert('time_series')
     def time_series(self):
+        if self._cache is None:
+            return self._time_series()
+
+        key = self._fingerprint('time_series')
+        eintrag = self._cache.get(key)
+        if eintrag is not None:
+            ergebnisse, meldungen = eintrag
+            for meldung in meldungen:
+                print(meldung)
+            return ergebnisse
+
+        meldungen = []
+        ergebnisse = self._time_series(meldungen)
+        self._cache.set(key, (ergebnisse, meldungen))
+        return ergebnisse
+
+    def _time_series(self, meldungen=None):
+        """
+        Berechnet die Zeitreihe inkrementell. Nach Änderungen werden nur die Zwischenstände ab der ersten geänderten
+        Leistung neu berechnet, die früheren aus der letzten Berechnung übernommen.
+        """
+        stand = self._aktueller_stand()
+        if stand == self._staende.get('time_series'):
+            ergebnisse = []
+            for ergebnis, meldung, _ in self._abgeleitet['time_series']:
+                if meldung is None:
+                    ergebnisse.append(ergebnis._kopie())
+                    continue
+                print(meldung)
+                if meldungen is not None:
+                    meldungen.append(meldung)
+            return ergebnisse
+
+        if not LeistungsStatistik.supports(self):
+            return self._time_series_reference(meldungen)
+
+        _, ab, _ = self._aenderungen(self._staende.get('time_series'), stand)
+
+        statistik = LeistungsStatistik(self)
+        ergebnisse = statistik.time_series(meldungen, schritte=self._abgeleitet.get('time_series'), ab=ab)
+        self._staende['time_series'], self._abgeleitet['time_series'] = stand, statistik.schritte
+        # Die Zwischenstände werden bei der nächsten Berechnung wiederverwendet, daher Kopien liefern
+        return [ergebnis._kopie() for ergebnis in ergebnisse]
+
+    def _time_series_reference(self, meldungen=None):
+        """
+        Berechnet die Zeitreihe durch vollständige Neuberechnung nach jeder Leistung. Wird für Modelle ohne
+        _calculate_statistik verwendet und dient als Referenz für die inkrementelle Berechnung.
+        """
         kopie = copy.deepcopy(self)
         kopie.noten = []
         
@@ -358,9 +1387,197 @@ class NotenberechnungGeneric:
                 ergebnisse.append(ergebnis)
             except ValueError as e:
                 print(f"Fehler beim Hinzufügen der Note: {str(e)}")
+                if meldungen is not None:
+                    meldungen.append(f"Fehler beim Hinzufügen der Note: {str(e)}")
         
         return ergebnisse
     
+    def _prognose_statistik(self):
+        """
+        Prüft den aktuellen Stand wie berechne_gesamtnote und liefert die LeistungsStatistik über alle Leistungen
+        (None, wenn das Modell keine inkrementelle Berechnung unterstützt). Die Statistik wird wiederverwendet,
+        solange sich Leistungen, Noten und Status nicht ändern.
+        """
+        schluessel = self._stand()
+        if self._prognose is not None and self._prognose[0] == schluessel:
+            return self._prognose[1]
+
+        if self.noten:
+            self._update_handler_after_added_leistung()
+            self._check_time_range()
+            self.to(self.system)
+        statistik = None
+        if LeistungsStatistik.supports(self):
+            statistik = LeistungsStatistik(self)
+            for note in self.noten:
+                statistik._add(note)
+        self._prognose = (schluessel, statistik)
+        return statistik
+
+    def _hypothesen(self, leistungen):
+        """
+        Erzeugt und prüft hypothetische Leistungen (Leistungsobjekte oder dicts wie für note_hinzufuegen, ohne date
+        am Tag der letzten Leistung). Sie werden nicht nummeriert oder verknüpft und nicht in noten aufgenommen.
+        """
+        hypothesen = []
+        zeitraeume = None
+        for leistung in leistungen:
+            if isinstance(leistung, dict):
+                angaben = dict(leistung)
+                if angaben.get('date') is None:
+                    if not self.noten:
+                        raise ValueError('Für die Leistung muss ein Datum angegeben werden.')
+                    angaben['date'] = self.noten[-1].date
+                leistung = self._erzeuge_leistung(**angaben)
+            self._pruefe_leistung(leistung)
+            leistung.to(self.system)
+            if self.sj_start is not None and not (self.sj_start <= leistung.date <= self.sj_ende):
+                raise ValueError('Alle Noten müssen sich innerhalb eines Schuljahres bewegen.')
+            if leistung._is_punctual == False:
+                if zeitraeume is None:
+                    zeitraeume = ZeitraumIndex(note for note in self.noten if note._is_punctual == False)
+                konflikte = zeitraeume.hinzufuegen(leistung)
+                if konflikte:
+                    raise self._time_range_error([(konflikt, leistung) for konflikt in konflikte])
+            hypothesen.append(leistung)
+        return hypothesen
+
+    @contextmanager
+    def _hypothetisch(self, leistungen):
+        """
+        Liefert für die Dauer des Blocks eine Funktion berechne(wert=None), die die Note mit den hypothetischen
+        Leistungen berechnet (mit wert als Note der ersten Leistung) und zusätzlich den Schnitt, mit dem die
+        Verbesserungen ausgewertet wurden. Weder das Modell noch die Leistungen werden kopiert.
+        """
+        statistik = self._prognose_statistik()
+        if statistik is not None:
+            with statistik.hypothetisch(leistungen):
+                def berechne(wert=None):
+                    if wert is not None:
+                        statistik._setze_wert(leistungen[0], wert)
+                    statistik._v_mittel = None
+                    return self._calculate_statistik(statistik), statistik._v_mittel
+                yield berechne
+            return
+
+        # Modelle ohne _calculate_statistik: noten für die Dauer des Blocks ersetzen
+        noten, verbesserungen, note = self.noten, self._verbesserungen, leistungen[0].note if leistungen else None
+        self.noten = sorted(noten + list(leistungen), key=lambda x: x.date)
+        def berechne(wert=None):
+            if wert is not None:
+                leistungen[0].note = NoteEntity(wert, system=self.system)
+            self._v_mittel = None
+            return self._calculate(), self._v_mittel
+        try:
+            yield berechne
+        finally:
+            self.noten, self._verbesserungen = noten, verbesserungen
+            if leistungen:
+                leistungen[0].note = note
+
+    @_gesperrt
+    def was_waere_wenn(self, *leistungen):
+        """
+        Berechnet die Note, die sich mit zusätzlichen Leistungen ergäbe, ohne sie hinzuzufügen.
+
+        notenberechnung.was_waere_wenn({'art': 'KA', 'note': 2, 'date': '2024-05-10'})
+        """
+        with self._hypothetisch(self._hypothesen(leistungen)) as berechne:
+            return berechne()[0]
+
+    @_gesperrt
+    def varianten(self, art, noten, **angaben):
+        """
+        Berechnet die Note für eine weitere Leistung der Art art mit jeder der Noten aus noten.
+
+        notenberechnung.varianten('KA', [1, 2, 3, 4, 5, 6], date='2024-05-10')
+        """
+        noten = [float(note) for note in noten]
+        if not noten:
+            return []
+        leistungen = self._hypothesen([{**angaben, 'art' : art, 'note' : noten[0]}])
+        with self._hypothetisch(leistungen) as berechne:
+            return [berechne(note)[0] for note in noten]
+
+    @_gesperrt
+    def benoetigte_note(self, ziel, art='KA', schritt=None, **angaben):
+        """
+        Schlechteste Note einer weiteren Leistung der Art art, mit der die Gesamtnote ziel erreicht (im System N
+        höchstens ziel, im System NP mindestens ziel). Mit schritt wird auf ein Vielfaches von schritt (z.B. 0.25)
+        zur besseren Note hin gerundet. Liefert None, wenn ziel auch mit der bestmöglichen Note nicht erreicht wird.
+
+        Die Gesamtnote hängt stückweise linear von der neuen Note ab. Die Stücke ergeben sich aus den Grenzen der
+        Verbesserungen (LeistungV._grenzen), innerhalb eines Stücks wird die Gleichung direkt gelöst.
+
+        notenberechnung.benoetigte_note(2.5, art='KA', date='2024-05-10')
+        """
+        system = self.system
+        ziel = float(ziel)
+        richtung = -1 if system._is_inverted() else 1
+        toleranz = 1e-9
+        leistungen = self._hypothesen([{**angaben, 'art' : art, 'note' : system.good}])
+
+        with self._hypothetisch(leistungen) as berechne:
+            # t ist die normierte Note: 0 die schlechteste, 1 die beste
+            def abstand(t):
+                note, v_mittel = berechne(system._norm_to_value(t))
+                return richtung * (float(note.gesamtnote) - ziel), v_mittel
+
+            werte = {}
+            def g(t):
+                if t not in werte:
+                    werte[t] = abstand(t)[0]
+                return werte[t]
+
+            werte[0.0], v_0 = abstand(0.0)
+            werte[1.0], v_1 = abstand(1.0)
+            knicke = []
+            if v_0 is not None and v_1 is not None and v_0 != v_1:
+                knicke = sorted(set((grenze - v_0) / (v_1 - v_0) for grenze in LeistungV._grenzen(self.w_th, system)))
+                knicke = [t for t in knicke if 0 <= t <= 1]
+
+            gefunden = None
+            vorher = None
+            grenzen = sorted(set([0.0] + knicke + [1.0]))
+            for a, b in zip(grenzen, grenzen[1:]):
+                # Zwei Punkte bestimmen die Gerade des Stücks, die Enden 0 und 1 nur, wenn sie keine Grenze sind
+                p = a if a == 0.0 and a not in knicke else a + (b - a) / 3
+                q = b if b == 1.0 and b not in knicke else a + 2 * (b - a) / 3
+                steigung = (g(q) - g(p)) / (q - p)
+                links, rechts = g(p) + steigung * (a - p), g(p) + steigung * (b - p)
+
+                # An einer Grenze gilt einer der beiden Grenzwerte, sie wird nur dann berechnet
+                kandidaten = []
+                if a == 0.0 or links >= -toleranz or (vorher is not None and vorher >= -toleranz):
+                    kandidaten.append(a)
+                if links >= -toleranz:
+                    kandidaten.append(a + toleranz)
+                elif steigung > 0 and rechts >= -toleranz:
+                    nullstelle = p - g(p) / steigung
+                    kandidaten.extend([nullstelle, nullstelle + toleranz])
+                gefunden = next((t for t in kandidaten if a <= t < b and g(t) >= -toleranz), None)
+                if gefunden is not None:
+                    break
+                vorher = rechts
+            if gefunden is None and g(1.0) >= -toleranz:
+                gefunden = 1.0
+
+            if gefunden is None:
+                return None
+            wert = system._norm_to_value(gefunden)
+            if schritt is None:
+                return NoteValue(wert, system=system)
+
+            # Zum nächsten Vielfachen von schritt in Richtung der besseren Note
+            lim_min, lim_max = system._get_lims()
+            runden = np.floor if system._is_inverted() else np.ceil
+            wert = runden(round(wert / schritt, 9)) * schritt
+            while lim_min <= wert <= lim_max:
+                if abstand(system._value_to_norm(wert))[0] >= -toleranz:
+                    return NoteValue(wert, system=system)
+                wert += richtung * schritt
+            return None
+
     def _analysis(self, time_series=None):
         if time_series == None:
             time_series = self.time_series()
@@ -389,6 +1606,7 @@ class NotenberechnungGeneric:
         if self._fig is not None:
             plt.close(self._fig)
     
+    @profiliert('plot_time_series')
     def plot_time_series(self, save=None, sid = None, parent = None, formats = ['jpg'], **kwargs):
         if not isinstance(sid, SchuelerEntity):
             sid = None
@@ -498,6 +1716,8 @@ class SchuelerEntity:
         self.vorname = kwargs.get('vorname')
         self.nachname = kwargs.get('nachname')
         self.note = None
+        # Revision der Notenberechnung bei der letzten Berechnung der Note
+        self._revision = None
         
         if None in (self.sid, self.vorname, self.nachname):
             raise ValueError("Alle Werte (sid, vorname, nachname) müssen beim Initialisieren gesetzt werden.")
@@ -541,6 +1761,20 @@ class SchuelerEntity:
         self._notenberechnung = note
         if not len(self._notenberechnung.noten)==0:
             self.note = self._notenberechnung.berechne_gesamtnote()
+        self._revision = self._notenberechnung._aktuelle_revision()
+
+    def aktualisieren(self):
+        """
+        Berechnet die Note neu, wenn sich Leistungen oder Konfiguration seit der letzten Berechnung geändert haben,
+        und liefert in diesem Fall True. Es werden nur die von den Änderungen abhängigen Werte neu berechnet. Ohne
+        gesetzte Noten (siehe setze_note) wird False geliefert.
+        """
+        notenberechnung = getattr(self, '_notenberechnung', None)
+        if notenberechnung is None or notenberechnung._aktuelle_revision() == self._revision:
+            return False
+        self.note = notenberechnung.berechne_gesamtnote() if notenberechnung.noten else None
+        self._revision = notenberechnung._aktuelle_revision()
+        return True
 
 class LerngruppeEntity:
     def __init__(self, **kwargs):
@@ -583,6 +1817,13 @@ class LerngruppeEntity:
             raise ValueError("Das hinzuzufügende Objekt muss eine Instanz der Klasse SchuelerEntity sein.")
         
         self.schueler[schueler_entity.sid] = schueler_entity
+
+    def aktualisieren(self):
+        """
+        Berechnet die Noten aller Schüler mit geänderten Leistungen neu und liefert deren sid, z.B. um nur für diese
+        Schüler neu zu exportieren.
+        """
+        return [sid for sid, schueler_entity in self.schueler.items() if schueler_entity.aktualisieren()]
     
     def plot_sid(self, sid, **kwargs):
         if isinstance(sid, SchuelerEntity):
@@ -631,7 +1872,7 @@ class LerngruppeEntity:
             if full==True:
                 leistungen = schueler_entity._notenberechnung._get_list_with_verbesserungen()
             else:
-                schueler_entity._notenberechnung._get_list()
+                leistungen = schueler_entity._notenberechnung._get_list()
                 
             for note in leistungen:
                     note_dict = self._get_group_vars_as_dict()
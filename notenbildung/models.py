@@ -18,32 +18,33 @@ class Notenberechnung(NotenberechnungGeneric):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    def _calculate(self):       
+    def _calculate(self):
+        statistik = ModellStatistik(self)
+
+        # Validate count
+        if len(self.noten)!=sum(statistik.n.values()):
+            raise ValueError("Validation Error: Die Anzahl der erfassten Leistungen stimmt nicht mit den Leistungen in der Berechnung überein.")
+
+        return self._calculate_statistik(statistik)
+
+    def _calculate_statistik(self, statistik):
         # Calculate
-        result = Note(datum=self.noten[-1].date, system=self.system)
-        
-        verbesserung_is_enabled = any(note.status._enabled for note in self.noten) and self._v_enabled
+        result = Note(datum=statistik.datum, system=self.system)
         
-        # Filtern der Noten nach Art
-        noten_ka = self._get_leistung_for_category('KA')
-        noten_kt = self._get_leistung_for_category('KT')
-        noten_muendlich = self._get_leistung_for_category('m')
+        verbesserung_is_enabled = statistik.v_enabled and self._v_enabled
         
         # Ermitteln der Anzahl der verschiedenen Leistungsarten
-        n_KA = len(noten_ka)
-        n_KT = len(noten_kt)
-        n_m = len(noten_muendlich)
-
-        # Validate count
-        if len(self.noten)!=n_KA+n_KT+n_m:
-            raise ValueError("Validation Error: Die Anzahl der erfassten Leistungen stimmt nicht mit den Leistungen in der Berechnung überein.")
-                
+        n_KA = statistik.n['KA']
+        n_KT = statistik.n['KT']
+        n_m = statistik.n['m']
+        
         # mündliche Note
-        m_m = Weight(*noten_muendlich)
+        m_m = statistik.weight('m')
 
         # Randfall: nur mündliche Noten
         if (n_KA + n_KT==0) and n_m>0:
             result.update(gesamtnote=m_m.mean, m_m=m_m.mean)
+            result._gewichtung = m_m.normalize()
             return result
         # Randfall: keine Noten
         elif (n_KA + n_KT + n_m == 0):
@@ -52,23 +53,19 @@ class Notenberechnung(NotenberechnungGeneric):
         # Berechnung der Mittelwerte von KT und KA
         w_s = n_KT * self.w_s0/self.n_KT_0 if n_KT < self.n_KT_0 else self.w_s0
         
-        KA = Weight(*noten_ka).set_weight_for_each(1)
-        KT = Weight(*noten_kt).set_weight(w_s)
+        KA = statistik.weight('KA').set_weight_for_each(1)
+        KT = statistik.weight('KT').set_weight(w_s)
 
         m_s1 = KA+KT
         
         if (verbesserung_is_enabled==True) and (self.w_th != 0):
             w_v3 = abs(m_s1.mean._get_system_range()/self.w_th) if (m_s1.mean!=None) else None
-            self._set_verbesserungen(mean=m_s1.mean)
-            nv1 = sum(1 for v in self._verbesserungen if v.count == False)
-            nv2 = sum(1 for v in self._verbesserungen if v.count == True)
-            if nv1==nv2:
+            V = statistik.verbesserungen(mean=m_s1.mean, w_th=self.w_th)
+            if statistik.nv1==statistik.nv2 or V.mean is None:
                 m_s = m_s1
-                self._verbesserungen = []
             else:
-                V = Weight(*self._verbesserungen).set_weight(w_v3)
                 # schriftliche Note berechnen
-                m_s = m_s1+V
+                m_s = m_s1+V.set_weight(w_v3)
         else:
             # schriftliche Note
             m_s = m_s1
@@ -77,6 +74,7 @@ class Notenberechnung(NotenberechnungGeneric):
         GN = m_s.set_weight(self.w_sm) + m_m.set_weight(1)        
         
         result.update(m_s1=m_s1.mean, m_s=m_s.mean, gesamtnote=GN.mean, m_m = m_m.mean)
+        result._gewichtung = GN
         return result
     
 class NotenberechnungSimple(NotenberechnungGeneric):
@@ -90,19 +88,21 @@ class NotenberechnungSimple(NotenberechnungGeneric):
         super().__init__(**kwargs)
 
 
-    def _calculate(self):       
+    def _calculate(self):
+        return self._calculate_statistik(ModellStatistik(self))
+
+    def _calculate_statistik(self, statistik):
         # Calculate
-        result = Note(datum=self.noten[-1].date, system=self.system)
+        result = Note(datum=statistik.datum, system=self.system)
         
-        # Filtern der Noten nach Art
-        noten_ka = Weight(*self._get_leistung_for_category('KA'))
-        noten_kt = Weight(*self._get_leistung_for_category('KT'))
-        noten_muendlich = Weight(*self._get_leistung_for_category('m'))
+        noten_ka = statistik.weight('KA')
+        noten_kt = statistik.weight('KT')
+        noten_muendlich = statistik.weight('m')
 
-        
         # Randfall: nur mündliche Noten
         if (noten_ka._n + noten_kt._n==0) and noten_muendlich._n>0:
             result.update( gesamtnote=noten_muendlich.mean, m_m=noten_muendlich.mean )
+            result._gewichtung = noten_muendlich.normalize()
             return result
         # Randfall: keine Noten
         elif (noten_ka._n + noten_kt._n + noten_muendlich._n == 0):
@@ -121,6 +121,7 @@ class NotenberechnungSimple(NotenberechnungGeneric):
         gesamtnote = m_s + noten_muendlich
                 
         result.update(m_s=m_s.mean, m_m = noten_muendlich.mean, gesamtnote=gesamtnote.mean)
+        result._gewichtung = gesamtnote
 
         return result
 
@@ -143,6 +144,10 @@ if __name__ == "__main__":
     
     gesamtnote = self.berechne_gesamtnote()
     print(gesamtnote)
+
+    # Was wäre, wenn die nächste KA eine 2 wird? Welche KA-Note reicht für eine 2.5?
+    print(self.was_waere_wenn({'art': 'KA', 'note': 2, 'date': '2024-05-10'}))
+    print(self.benoetigte_note(2.5, art='KA', schritt=0.25, date='2024-05-10'))
     self.plot_time_series()
     
     check = NotenberechnungLegacy(w_s0=1, w_sm=3, system = SystemN, v_enabled=True, w_th = 0.4, fach=FachM)
@@ -8,6 +8,9 @@ import numpy as np
 from datetime import datetime
 import copy
 import pprint
+import functools
+import contextvars
+from collections import Counter
 
 #
 #
@@ -18,11 +21,12 @@ class SystemGeneric:
     good = None
     bad = None
     name = None
-    _convert_to = []
+    _convert_to = frozenset()
 
     @classmethod
     def add_convert_to(cls, *new_convert_to):
-        cls._convert_to = list(set(list(cls._convert_to) + list(new_convert_to)))
+        # Es wird eine neue Menge gebunden statt die bestehende zu verändern, lesende Threads sehen immer eine vollständige Menge
+        cls._convert_to = cls._convert_to | frozenset(new_convert_to)
     
     @classmethod
     def _value_to_norm(cls, z):
@@ -129,52 +133,75 @@ class ConfigNVO:
             'system': cls.system,
         }
 
+    @classmethod
+    def konfiguration(cls, **werte):
+        """
+        Erzeugt eine unveränderliche Konfiguration aus den aktuellen Werten, einzelne Werte können überschrieben werden.
+        """
+        return KonfigurationNVO(**werte)
+
+class KonfigurationNVO:
+    """
+    Unveränderliche Konfiguration für eine einzelne Notenberechnung. ConfigNVO.update ändert die Klassenattribute für
+    alle Threads, eine KonfigurationNVO wird dagegen pro Anfrage erzeugt und an die Notenberechnung übergeben.
+
+    konfiguration = ConfigNVO.konfiguration(w_th=0.4)
+    notenberechnung = Notenberechnung(fach=FachM, konfiguration=konfiguration)
+    """
+    __slots__ = ('w_th', 'w_s0', 'w_sm', 'n_KT_0', 'v_enabled', 'system')
+
+    def __init__(self, **werte):
+        unbekannt = [key for key in werte if key not in self.__slots__]
+        if unbekannt:
+            raise ValueError(f"Unbekannte Einstellungen: {', '.join(unbekannt)}")
+        for key in self.__slots__:
+            object.__setattr__(self, key, werte[key] if key in werte else getattr(ConfigNVO, key))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Eine KonfigurationNVO kann nicht verändert werden.")
+
+    def ersetzen(self, **werte):
+        """
+        Liefert eine neue Konfiguration mit geänderten Werten.
+        """
+        return KonfigurationNVO(**{**self.get_config(), **werte})
+
+    def get_config(self):
+        return {key : getattr(self, key) for key in self.__slots__}
+
+    def __reduce__(self):
+        return (KonfigurationNVO._aus_werten, (tuple(self.get_config().items()),))
+
+    @staticmethod
+    def _aus_werten(werte):
+        return KonfigurationNVO(**dict(werte))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __eq__(self, other):
+        return isinstance(other, KonfigurationNVO) and self.get_config() == other.get_config()
+
+    def __hash__(self):
+        return hash(tuple(self.get_config().items()))
+
+    def __repr__(self):
+        return f"KonfigurationNVO({', '.join(f'{key}={value!r}' for key, value in self.get_config().items())})"
+
 ##########################################
 ##########################################
 
 #
 #
-# NoteEntity stellt sicher, dass eine gültige Zahl als Note übergeben wurde. Es gibt Methoden um entsprechend die Leistung in Text auszugeben.
+# NoteBase enthält die Methoden zum Runden einer Note und zur Ausgabe als Text. Sie wird von NoteEntity und NoteValue geteilt.
 #
 #
-class NoteEntity(np.ndarray):
-    def __new__(cls, note, system = ConfigNVO.system):
-        if not issubclass(system, SystemGeneric):
-            raise ValueError(f'Das System muss ein Objekt der SystemGeneric-Klasse sein.')
-            
-        if note==None:
-            note = np.nan
-            norm = None
-        else:
-            sys_min, sys_max = system._get_lims()
-            if not sys_min <= note <= sys_max:
-                raise ValueError(f'Die Note >{note}< muss zwischen {sys_min} und {sys_max} liegen.')
-            norm = system._value_to_norm(note)
-        
-        obj = np.asarray(float(note)).view(cls)
-        obj.system = system
-        obj._norm = norm
-        return obj
+class NoteBase:
+    __slots__ = ()
 
-    def to(self, newsystem):
-        if not issubclass(newsystem, SystemGeneric):
-            raise ValueError(f'Das System muss eine Instanz der SystemGeneric-Klasse sein.')
-        
-        if newsystem!=self.system:
-            if newsystem not in self.system._convert_to:
-                raise ValueError(f'{self.system} kann nicht zu {newsystem} kovertiert werden.')
-            
-            if self.system==SystemNPS and newsystem==SystemN:
-                print("WARNING: Inkonsistent System conversion")
-                new_note = self
-                if new_note<1 or new_note>5.5:
-                    new_note = np.round(new_note)
-            else:
-                new_note = newsystem._norm_to_value(self._norm)
-                       
-            self.itemset(new_note)
-            self.system = newsystem
-    
     def _get_system_range(self):
         return self.system._get_range()
 
@@ -262,20 +289,87 @@ class NoteEntity(np.ndarray):
         else:
             raise ValueError("Unknows System")
 
+    def __round__(self, ndigits=None):
+        # Ohne Stellen nach den Rundungsregeln des Systems, sonst wie bei float
+        if ndigits is None:
+            return self._round(float(self))
+        return round(float(self), ndigits)
+
+#
+#
+# NoteEntity stellt sicher, dass eine gültige Zahl als Note übergeben wurde. Es gibt Methoden um entsprechend die Leistung in Text auszugeben.
+#
+#
+class NoteEntity(NoteBase, np.ndarray):
+    # System und Norm als Slots statt __dict__, pro Leistung gibt es ein NoteEntity
+    __slots__ = ('system', '_norm')
+
+    def __new__(cls, note, system = ConfigNVO.system):
+        if not issubclass(system, SystemGeneric):
+            raise ValueError(f'Das System muss ein Objekt der SystemGeneric-Klasse sein.')
+            
+        if note==None:
+            note = np.nan
+            norm = None
+        else:
+            sys_min, sys_max = system._get_lims()
+            if not sys_min <= note <= sys_max:
+                raise ValueError(f'Die Note >{note}< muss zwischen {sys_min} und {sys_max} liegen.')
+            norm = system._value_to_norm(note)
+        
+        # Direkt als 0-dimensionales Array anlegen, eine Sicht (view) würde ein zweites Array als base festhalten
+        obj = np.ndarray.__new__(cls, ())
+        obj[()] = float(note)
+        obj.system = system
+        obj._norm = norm
+        return obj
+
+    def to(self, newsystem):
+        if not issubclass(newsystem, SystemGeneric):
+            raise ValueError(f'Das System muss eine Instanz der SystemGeneric-Klasse sein.')
+        
+        if newsystem!=self.system:
+            if newsystem not in self.system._convert_to:
+                raise ValueError(f'{self.system} kann nicht zu {newsystem} kovertiert werden.')
+            
+            if self.system==SystemNPS and newsystem==SystemN:
+                print("WARNING: Inkonsistent System conversion")
+                new_note = self
+                if new_note<1 or new_note>5.5:
+                    new_note = np.round(new_note)
+            else:
+                new_note = newsystem._norm_to_value(self._norm)
+                       
+            # ndarray.itemset gibt es ab numpy 2 nicht mehr
+            self[()] = new_note
+            self.system = newsystem
+    
     def __array_finalize__(self, obj):
         if obj is None:
             return
         self.system = getattr(obj, 'system', None)
 
+    def __copy__(self):
+        # __array_finalize__ übernimmt nur das System, die Norm wird für to benötigt
+        kopie = super().__copy__()
+        kopie._norm = getattr(self, '_norm', None)
+        return kopie
+
+    def __reduce__(self):
+        # System und Norm beim Pickeln mitnehmen (z.B. für die Übergabe zwischen Prozessen)
+        rekonstruktion, argumente, zustand = super().__reduce__()
+        return rekonstruktion, argumente, (zustand, self.system, getattr(self, '_norm', None))
+
+    def __setstate__(self, zustand):
+        zustand, self.system, self._norm = zustand
+        super().__setstate__(zustand)
+
     def __str__(self):
         return f"{self}"
 
     def __repr__(self):
         return self.__str__()
 
-    def __round__(self):
-        return self._round(float(self))
-
     def _operate(self, other, operation):
         if isinstance(other, NoteEntity):
             if self.system == other.system:
@@ -298,6 +392,91 @@ class NoteEntity(np.ndarray):
 
     def __truediv__(self, other):
         return self._operate(other, lambda x, y: x / y)
+
+#
+#
+# NoteValue ist ein leichtgewichtiger Notenwert für die internen Berechnungen. Er wird erst bei der Ausgabe in ein NoteEntity umgewandelt.
+#
+#
+class NoteValue(NoteBase):
+    __slots__ = ('value', 'system')
+
+    def __init__(self, value, system = ConfigNVO.system):
+        self.value = float(value) if value is not None else np.nan
+        self.system = system
+
+    @property
+    def _norm(self):
+        if np.isnan(self.value):
+            return None
+        return self.system._value_to_norm(self.value)
+
+    def _entity(self):
+        return NoteEntity(None if np.isnan(self.value) else self.value, system=self.system)
+
+    def to(self, newsystem):
+        # Umrechnung wie bei NoteEntity
+        entity = self._entity()
+        entity.to(newsystem)
+        self.value, self.system = float(entity), entity.system
+
+    def __float__(self):
+        return self.value
+
+    def __array__(self, dtype=None, copy=None):
+        # Für numpy-Funktionen wie np.isnan wie ein NoteEntity
+        return np.array(self.value, dtype=dtype)
+
+    def __str__(self):
+        return str(self.value)
+
+    def __repr__(self):
+        return self.__str__()
+
+    def _vergleiche(self, other, vergleich):
+        # Wie bei NoteEntity wird nur der Wert verglichen
+        if isinstance(other, (NoteEntity, NoteValue, int, float, np.number)):
+            return vergleich(self.value, float(other))
+        return NotImplemented
+
+    def __eq__(self, other):
+        return self._vergleiche(other, lambda x, y: x == y)
+
+    def __ne__(self, other):
+        return self._vergleiche(other, lambda x, y: x != y)
+
+    def __lt__(self, other):
+        return self._vergleiche(other, lambda x, y: x < y)
+
+    def __le__(self, other):
+        return self._vergleiche(other, lambda x, y: x <= y)
+
+    def __gt__(self, other):
+        return self._vergleiche(other, lambda x, y: x > y)
+
+    def __ge__(self, other):
+        return self._vergleiche(other, lambda x, y: x >= y)
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def _operate(self, other, operation):
+        if isinstance(other, (NoteEntity, NoteValue)):
+            if self.system != other.system:
+                raise ValueError("Systeme sind nicht gleich und können nicht verrechnet werden")
+        return NoteValue(operation(self.value, float(other)), system = self.system)
+
+    def __add__(self, other):
+        return self._operate(other, lambda x, y: x + y)
+
+    def __sub__(self, other):
+        return self._operate(other, lambda x, y: x - y)
+
+    def __mul__(self, other):
+        return self._operate(other, lambda x, y: x * y)
+
+    def __truediv__(self, other):
+        return self._operate(other, lambda x, y: x / y)
     
 ##########################################
 ##########################################
@@ -342,106 +521,80 @@ class AttributP(AttributGeneric):
 # Klassen zur Gewichtung
 #
 #
-class WeightHistory:
-    def __init__(self, left=None, right=None):
-        if not (isinstance(left, Weight) or left==None) or not (isinstance(right, Weight) or right==None):
-            raise TypeError("Die left und right Argumente müssen Weight-Objekte oder None sein")
-        
-        if left == None and right == None:
-            raise ValueError("Mindestens ein Wert muss angegeben sein.")
-        
-        self.left = left
-        self.right = right
-
-    def calculate_total_weight(self, total_weight=None):
-        if total_weight is None:
-            total_weight = {}
-        
-        weight_left = {}
-        weight_right = {}
-        
-        if self.left is not None:
-            if self.left._history is not None:
-                weight_left = self.left._history.calculate_total_weight()
-            weight_left = self._update_total_weight(weight_left, self.left._type, self.left.w)
-            weight_left = self._normalize_total_weight(total_weight=weight_left, weight = self.left.w)
-        
-        if self.right is not None:
-            if self.right._history is not None:
-                weight_right = self.right._history.calculate_total_weight(total_weight)               
-            weight_right = self._update_total_weight(weight_right, self.right._type, self.right.w)
-            weight_right = self._normalize_total_weight(total_weight=weight_right, weight = self.right.w)
-        
-        if not set(weight_right.keys()).isdisjoint(weight_left.keys()):
-            raise ValueError("Der Typ darf nur einfach vorkommen in der Gesamtgewichtung.")
-        
-        total_weight.update(weight_right)
-        total_weight.update(weight_left)
-        
-        total_weight = self._normalize_total_weight(total_weight=total_weight, weight = self._get_right_weight() + self._get_left_weight())
-        
-        return total_weight
-
-    def _get_left_weight(self):
-        if self.left == None:
-            return 0
-        else:
-            return self.left.w
-
-    def _get_right_weight(self):
-        if self.right == None:
-            return 0
-        else:
-            return self.right.w
-    
-    @staticmethod
-    def _update_total_weight(total_weight, types, weight):
-        types_count = {}
-        for type_ in types:
-            types_count[type_] = types_count.get(type_, 0) + 1
-    
-        for type_, count_ in types_count.items():
-            if type_ in total_weight.keys():
-                raise ValueError("Der Typ darf nur einfach vorkommen in der Gesamtgewichtung.")
-                
-            total_weight[type_] = total_weight.get(type_, 1) * weight *  count_/len(types)
-        
-        return total_weight
-
-    @staticmethod
-    def _normalize_total_weight(total_weight=None, weight=None):
-        total_sum = sum(weight for _, weight in total_weight.items())
-        for type_, _ in total_weight.items():
-            total_weight[type_] = total_weight.get(type_) / total_sum * weight
-        
-        return total_weight
-    
-        
 class Weight:
+    """
+    Gewichteter Mittelwert über Leistungen oder Noten. Statt eines Baums aus WeightHistory-Objekten führt jedes Weight
+    die Anteile der Leistungstypen (Summe 1) mit. Beim Kombinieren werden die Anteile beider Seiten nach ihren Gewichten
+    gemischt, calculate_total_weights skaliert die Anteile nur noch mit dem Gewicht der Kombination.
+    """
     def __init__(self, *noten):
         self.mean = None
         self.w = None
         self._n = len(noten)
         self._type = []
-        self._history = None
+        self._anteile = {}
+        self._kombination = None
+        self._summe = None
+        self._doppelt = False
         
-        if not all(isinstance(obj, LeistungGeneric) or isinstance(obj, NoteEntity) for obj in noten):
+        if not all(isinstance(obj, (LeistungGeneric, NoteEntity, NoteValue)) for obj in noten):
             raise TypeError("Nicht alle Objekte sind Instanzen von LeistungGeneric oder NoteEntity")
         
         if all(isinstance(obj, LeistungGeneric) for obj in noten):
             self.mean = self._mean(list([note.note for note in noten]))
             self._type = [type(obj) for obj in noten]
+            self._anteile = self._anteile_der_typen()
             
-        elif all(isinstance(obj, NoteEntity) for obj in noten):
+        elif all(isinstance(obj, (NoteEntity, NoteValue)) for obj in noten):
             self.mean = self._mean(noten)
         else:
             raise TypeError("Nicht erlaubte Klasse")
-    
+
+    @classmethod
+    def _from_mean(cls, mean, n):
+        """
+        Erzeugt ein Weight-Objekt aus einem bereits berechneten Mittelwert über n gültige Noten.
+        """
+        weight = cls()
+        weight.mean = mean
+        weight._n = n if mean is not None else 0
+        return weight
+
+    def _anteile_der_typen(self):
+        return self._anteile_fuer(self._type)
+
+    @staticmethod
+    def _anteile_fuer(typen):
+        """
+        Anteile der Leistungstypen (Summe 1) für eine Liste der Typen aller Leistungen.
+        """
+        anteile = {}
+        for type_ in typen:
+            anteile[type_] = anteile.get(type_, 0) + 1/len(typen)
+        return anteile
+
+    def _anteile_als_teil(self):
+        """
+        Anteile, mit denen dieses Weight in eine Kombination eingeht: die kombinierten Anteile (mit der Summe der
+        Gewichte beider Seiten) und die eigenen Typen (mit dem eigenen Gewicht).
+        """
+        if self._kombination is None:
+            return self._anteile, False
+        if not self._anteile:
+            return self._kombination, False
+        doppelt = not self._kombination.keys().isdisjoint(self._anteile.keys())
+        anteile = {type_ : anteil * self._summe for type_, anteil in self._kombination.items()}
+        anteile.update({type_ : anteil * self.w for type_, anteil in self._anteile.items()})
+        summe = sum(anteile.values())
+        return {type_ : anteil / summe for type_, anteil in anteile.items()}, doppelt
+
     def calculate_total_weights(self):
-        if self._history==None:
-            history = WeightHistory(left=self)
-            return history.calculate_total_weight()
-        return self._history.calculate_total_weight()
+        if self._doppelt:
+            raise ValueError("Der Typ darf nur einfach vorkommen in der Gesamtgewichtung.")
+        # Für eine Kombination zählen nur die kombinierten Anteile, nicht die eigenen Typen
+        if self._kombination is not None:
+            return {type_ : anteil * self._summe for type_, anteil in self._kombination.items()}
+        return {type_ : anteil * self.w for type_, anteil in self._anteile.items()}
     
     def calculate_percents(self):
         percents = {k.describe():v for k,v in  self._get_normalized_weight(norm=100).items()}
@@ -449,14 +602,8 @@ class Weight:
 
     def _get_normalized_weight(self, norm=1):
         weights = self.calculate_total_weights()
-        return WeightHistory._normalize_total_weight(total_weight=weights, weight=norm)
-    
-    def add_history(self, history):
-        if not isinstance(history, WeightHistory) :
-            raise TypeError("Es muss ein WeightHistory-Objekt hinzugefügt werden.")
-        self._history = history
-        return self
-        
+        total_sum = sum(weights.values())
+        return {type_ : weight / total_sum * norm for type_, weight in weights.items()}
 
     def __add__(self, other):
         if not isinstance(other, Weight):
@@ -473,8 +620,21 @@ class Weight:
                 
         
         new_weight = self.w + other.w
-        combined = NoteEntity((float(self.mean)*self.w + float(other.mean)*other.w)/new_weight, system=self.mean.system)
-        return_weight = Weight(combined).set_weight(new_weight).add_history(WeightHistory(left=self, right=other))
+        # Rundungsfehler (z.B. 6.000000000000001) dürfen den Bereich des Systems nicht verlassen
+        lim_min, lim_max = self.mean.system._get_lims()
+        combined = NoteValue(min(max((float(self.mean)*self.w + float(other.mean)*other.w)/new_weight, lim_min), lim_max), system=self.mean.system)
+        return_weight = Weight(combined).set_weight(new_weight)
+
+        # Anteile beider Seiten nach ihren Gewichten mischen
+        anteile_rechts, doppelt_rechts = other._anteile_als_teil()
+        anteile_links, doppelt_links = self._anteile_als_teil()
+        anteile = {type_ : anteil * other.w for type_, anteil in anteile_rechts.items()}
+        anteile.update({type_ : anteil * self.w for type_, anteil in anteile_links.items()})
+        summe = sum(anteile.values())
+        return_weight._kombination = {type_ : anteil / summe for type_, anteil in anteile.items()}
+        return_weight._summe = new_weight
+        return_weight._doppelt = (self._doppelt or other._doppelt or doppelt_links or doppelt_rechts
+                                  or not anteile_links.keys().isdisjoint(anteile_rechts.keys()))
         return return_weight
 
     def set_weight(self, w):
@@ -493,14 +653,20 @@ class Weight:
         if not isinstance(typelist, list):
             raise TypeError("Es muss eine Liste übergeben werden")
         self._type = list(set(typelist))
+        self._anteile = self._anteile_der_typen()
         return self
 
     def _mean(self, noten):
+        # Für keine oder eine Note (z.B. Weight(combined) in __add__) ohne numpy, das Ergebnis ist identisch
+        if len(noten) <= 1:
+            wert = float(noten[0]) if noten else np.nan
+            self._n = 0 if np.isnan(wert) else 1
+            return NoteValue(wert, system=noten[0].system) if self._n else None
         noten_werte = np.array([float(note) for note in noten if not np.isnan(float(note))])
         self._n = len(noten_werte)
         if len(noten_werte)==0:
             return None
-        return NoteEntity(np.mean(noten_werte), system=noten[0].system)
+        return NoteValue(np.mean(noten_werte), system=noten[0].system)
 
     def __str__(self):
         return self._print()
@@ -514,12 +680,82 @@ class Weight:
 ##########################################
 ##########################################
 
+#
+#
+# Datumsangaben werden einmal je Text geparst. Der Stichtag legt fest, welches Datum beim Status der Verbesserungen als "heute" gilt.
+#
+#
+_DATUM_CACHE = {}
+_DATUM_CACHE_MAX = 8192
+
+def parse_datum(date_str):
+    """
+    Wandelt '2024-05-01' in ein datetime um, datetime-Objekte werden unverändert zurückgegeben. Die Ergebnisse werden
+    je Text zwischengespeichert, datetime ist unveränderlich und kann daher zwischen Leistungen geteilt werden. Aus
+    dem gleichen Grund wird für gleiche datetime-Objekte (ohne Zeitzone) dasselbe Objekt zurückgegeben.
+    """
+    if isinstance(date_str, datetime):
+        # Unterklassen wie pandas.Timestamp und Angaben mit Zeitzone bleiben unverändert
+        if type(date_str) is not datetime or date_str.tzinfo is not None:
+            return date_str
+        if len(_DATUM_CACHE) >= _DATUM_CACHE_MAX:
+            _DATUM_CACHE.clear()
+        return _DATUM_CACHE.setdefault(date_str, date_str)
+    try:
+        return _DATUM_CACHE[date_str]
+    except KeyError:
+        pass
+    except TypeError:
+        raise ValueError("Ungültiges Datumsformat")
+    try:
+        datum = datetime.strptime(date_str, "%Y-%m-%d")
+    except (ValueError, TypeError):
+        raise ValueError("Ungültiges Datumsformat")
+    if len(_DATUM_CACHE) >= _DATUM_CACHE_MAX:
+        _DATUM_CACHE.clear()
+    _DATUM_CACHE[date_str] = datum
+    return datum
+
+class Stichtag:
+    """
+    Bezugsdatum für Fristen von Verbesserungen. Ohne Stichtag gilt datetime.now() zum Zeitpunkt, an dem eine Leistung
+    erzeugt wird. Innerhalb des with-Blocks verwenden alle Leistungen des aktuellen Threads bzw. asyncio-Tasks dasselbe
+    Datum, ein Stapel wird damit einheitlich und reproduzierbar ausgewertet.
+
+    with Stichtag('2024-05-01'):
+        notenberechnung.note_hinzufuegen(art='KA', date='2024-04-10', note=3, status='offen', due='2024-04-24')
+
+    Stichtag() ohne Datum hält datetime.now() einmal für den ganzen Block fest.
+    """
+    _aktuell = contextvars.ContextVar('stichtag', default=None)
+
+    def __init__(self, datum=None):
+        self.datum = parse_datum(datum) if datum is not None else datetime.now()
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(self._aktuell.set(self.datum))
+        return self.datum
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._aktuell.reset(self._tokens.pop())
+
+    @classmethod
+    def jetzt(cls):
+        datum = cls._aktuell.get()
+        return datum if datum is not None else datetime.now()
+
+##########################################
+##########################################
+
 #
 #
 # Die Verbesserungs-Klasse setzt den Status der Verbesserung.
 #
 #
 class VerbesserungStatus:
+    __slots__ = ('_text', 'text', 'due', '_enabled', 'status')
+
     def __init__(self, text, due=None):
         self._text = text if text != None else '---'
         self.text = None
@@ -527,18 +763,34 @@ class VerbesserungStatus:
         self._check()
     
     def _check(self):
-        self._enabled = True if self._text != "---" else False
-        self.status = True if self._text == "fertig" else False if self._text == "fehlt" else None    
-        self.text = self._text
-
-        if (self.due is not None) and self._enabled:
-            current_date = datetime.now()
-            if current_date > self.due and self._text == 'offen':
-                self.text = 'fehlt'
-                self.status = False
-            elif current_date < self.due:
-                self.text = f'offen bis {self.due.strftime("%d.%m.%Y")}'
+        # Ohne Frist hängt der Status nur vom Text ab, mit Frist zusätzlich vom Stichtag
+        jetzt = Stichtag.jetzt() if self.due is not None else None
+        self._enabled, self.status, self.text = self._auswerten(self._text, self.due, jetzt)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def _auswerten(text, due, jetzt):
+        enabled = True if text != "---" else False
+        status = True if text == "fertig" else False if text == "fehlt" else None
+
+        if (due is not None) and enabled:
+            if jetzt > due and text == 'offen':
+                text = 'fehlt'
+                status = False
+            elif jetzt < due:
+                text = f'offen bis {due.strftime("%d.%m.%Y")}'
+        return enabled, status, text
     
+    @classmethod
+    def _erzeugen(cls, text, due=None):
+        """
+        Wie VerbesserungStatus(text, due), Leistungen ohne Verbesserung ('---' ohne Frist) teilen sich aber ein
+        Objekt. Der Status einer Leistung wird nur über _disable geändert, das den gemeinsamen Status nicht verändert.
+        """
+        if due is None and (text is None or (isinstance(text, str) and text == '---')):
+            return cls._OHNE
+        return cls(text, due=due)
+
     def _disable(self):
         self.text = '---'
         self._text = '---'
@@ -546,12 +798,7 @@ class VerbesserungStatus:
         self._check()
 
     def _parse_date(self, date_str):
-        if isinstance(date_str, datetime):
-            return date_str
-        try:
-            return datetime.strptime(date_str, "%Y-%m-%d")
-        except (ValueError, TypeError):
-            raise ValueError("Ungültiges Datumsformat")
+        return parse_datum(date_str)
 
     def __str__(self):
         return self._print()
@@ -562,6 +809,8 @@ class VerbesserungStatus:
     def _print(self):
         return f"{self.text}"
 
+VerbesserungStatus._OHNE = VerbesserungStatus('---')
+
 ##########################################
 ##########################################
 
@@ -571,9 +820,16 @@ class VerbesserungStatus:
 #
 #
 class LeistungGeneric:
-    last = None
-    head = None
+    # Ohne __dict__ belegt eine Leistung nur ihre Slots. Art und Attribut sind Konstanten der Klasse, Unterklassen
+    # müssen __slots__ ebenfalls angeben.
+    __slots__ = ('last', 'head', 'note', 'system', 'date', '_is_punctual', 'status', 'nr', '_nr', 'von', 'bis')
+    _art = None
+    _attribut = None
+
     def __init__(self, **kwargs):
+        # Verkettung mit der vorherigen und nächsten Leistung gleicher Art (siehe NotenberechnungGeneric._update_links)
+        self.last = None
+        self.head = None
         note = kwargs.get('note')
         self.system = kwargs.get('system')
         if isinstance(note, NoteEntity):
@@ -583,10 +839,9 @@ class LeistungGeneric:
             self.note = NoteEntity(note, self.system)
         
         self.date = self._parse_date(kwargs.get('date'))
-        self._art = None
         self._is_punctual = True
         
-        self.status = VerbesserungStatus(kwargs.get('status','---'), due = kwargs.get('due'))
+        self.status = VerbesserungStatus._erzeugen(kwargs.get('status','---'), due = kwargs.get('due'))
         
         self.nr = kwargs.get('nr')
         self._nr = None
@@ -604,12 +859,7 @@ class LeistungGeneric:
         return self._nr or self.nr
         
     def _parse_date(self, date_str):
-        if isinstance(date_str, datetime):
-            return date_str
-        try:
-            return datetime.strptime(date_str, "%Y-%m-%d")
-        except (ValueError, TypeError):
-            raise ValueError("Ungültiges Datumsformat")
+        return parse_datum(date_str)
     
     def _get_date(self):
         return self.date
@@ -648,11 +898,12 @@ class LeistungGeneric:
         return f'({output})'
         
 class LeistungM(LeistungGeneric):
+    __slots__ = ()
     _art = 'M'
     _attribut = AttributM
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.status._disable()          
+        self.status = VerbesserungStatus._OHNE
         
         self.von = self._parse_date(kwargs.get('von') or self.date)
         self.bis = self._parse_date(kwargs.get('bis') or self.date)
@@ -663,66 +914,53 @@ class LeistungM(LeistungGeneric):
         if self.von != self.bis:
             self._is_punctual = False   
 
-        self._art = 'M'
-        self._attribut = AttributM
-
 class LeistungE(LeistungGeneric):
+    __slots__ = ()
     _art = 'E'
     _attribut = AttributM
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.status._disable()          
-        
-        self._art = 'E'
-        self._attribut = AttributM
+        self.status = VerbesserungStatus._OHNE
         
 class LeistungKA(LeistungGeneric):
+    __slots__ = ()
     _art = 'KA'
     _attribut = AttributS
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self._art = 'KA'
-        self._attribut = AttributS
-        
+
 class LeistungGFS(LeistungGeneric):
+    __slots__ = ()
     _art = 'GFS'
     _attribut = AttributP
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.status._disable()
-        self._art = 'GFS'
-        self._attribut = AttributP
+        self.status = VerbesserungStatus._OHNE
 
 class LeistungKT(LeistungGeneric):
+    __slots__ = ()
     _art = 'KT'
     _attribut = AttributS
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self._art = 'KT'
-        self._attribut = AttributS
 
 class LeistungS(LeistungGeneric):
+    __slots__ = ()
     _art = 'S'
     _attribut = AttributS
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.status._disable()
-        self._art = 'S'
-        self._attribut = AttributS
+        self.status = VerbesserungStatus._OHNE
 
 class LeistungP(LeistungGeneric):
+    __slots__ = ()
     _art = 'P'
     _attribut = AttributP
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.status._disable()
-        self._art = 'P'
-        self._attribut = AttributP
+        self.status = VerbesserungStatus._OHNE
 
 class LeistungKTP(LeistungP):
-    pass
+    __slots__ = ()
 
 class LeistungV(LeistungGeneric):
+    __slots__ = ('w_th', 'mean', 'count')
     _art = 'V'
     _attribut = AttributS
     def __init__(self, **kwargs):
@@ -742,18 +980,8 @@ class LeistungV(LeistungGeneric):
         if w_th==None:
             raise ValueError("Die Schranke w_th muss angeeben werden.")
         mean = float(mean)
-        m_h = (np.ceil(mean)+np.floor(mean))/2
-        w_d = 1 if w_th == 0 else abs((0.5 - (mean % 1)) / w_th)
+        w_d, w_v1, w_v2 = self._werte(mean, w_th, system)
 
-        if system==SystemN:
-            w_v1 = None if w_d >= 1 else m_h + w_th if w_d < 1 else None
-            w_v2 = None if w_d >= 1 else m_h - w_th if w_d < 1 else None
-        elif system==SystemNP:
-            w_v1 = None if w_d >= 1 else m_h - w_th if w_d < 1 else None
-            w_v2 = None if w_d >= 1 else m_h + w_th if w_d < 1 else None
-        else:
-            raise ValueError("Invalid System Class for Verbesserung.")
-        
         count = '---'
         if status._enabled == False or (w_d >= 1):
             kwargs['note'] = NoteEntity(None, system = system)
@@ -780,14 +1008,123 @@ class LeistungV(LeistungGeneric):
         super().__init__(**kwargs)
         
         # class parameters
-        self.status._disable()
+        self.status = VerbesserungStatus._OHNE
         self.count = count
-        self._art = 'V'
-        self._attribut = AttributS
+
+    @staticmethod
+    def _werte(mean, w_th, system):
+        """
+        Berechnet den Abstand w_d zur Rundungsgrenze sowie die Noten w_v1 (fehlende) und w_v2 (fertige Verbesserung).
+        """
+        m_h = (np.ceil(mean)+np.floor(mean))/2
+        w_d = 1 if w_th == 0 else abs((0.5 - (mean % 1)) / w_th)
+
+        if system==SystemN:
+            w_v1 = None if w_d >= 1 else m_h + w_th if w_d < 1 else None
+            w_v2 = None if w_d >= 1 else m_h - w_th if w_d < 1 else None
+        elif system==SystemNP:
+            w_v1 = None if w_d >= 1 else m_h - w_th if w_d < 1 else None
+            w_v2 = None if w_d >= 1 else m_h + w_th if w_d < 1 else None
+        else:
+            raise ValueError("Invalid System Class for Verbesserung.")
+
+        return w_d, w_v1, w_v2
+
+    @staticmethod
+    def _werte_array(mean, w_th, system):
+        """
+        _werte für ein Array von Schnitten (z.B. je Schüler einer Lerngruppe). Fehlende Schnitte sind NaN, w_v1 und
+        w_v2 haben nur für w_d < 1 eine Bedeutung.
+        """
+        mean = np.asarray(mean, dtype=float)
+        with np.errstate(invalid='ignore'):
+            m_h = (np.ceil(mean)+np.floor(mean))/2
+            w_d = np.ones_like(mean) if w_th == 0 else abs((0.5 - (mean % 1)) / w_th)
+
+        if system==SystemN:
+            w_v1, w_v2 = m_h + w_th, m_h - w_th
+        elif system==SystemNP:
+            w_v1, w_v2 = m_h - w_th, m_h + w_th
+        else:
+            raise ValueError("Invalid System Class for Verbesserung.")
+        return w_d, w_v1, w_v2
+
+    @staticmethod
+    def _grenzen(w_th, system):
+        """
+        Schnitte im Bereich des Systems, an denen sich _werte sprunghaft ändert: die Grenzen k + 0.5 -/+ w_th des
+        Bereichs, in dem eine Verbesserung möglich ist. Dazwischen hängen die Werte linear vom Schnitt ab (m_h ändert
+        sich nur bei ganzen Noten, die für w_th <= 0.5 außerhalb dieser Bereiche liegen).
+        """
+        lim_min, lim_max = system._get_lims()
+        grenzen = set()
+        for k in range(int(np.floor(lim_min)) - 1, int(np.ceil(lim_max)) + 1):
+            grenzen.update([k + 0.5 - w_th, k + 0.5 + w_th])
+        return sorted(grenze for grenze in grenzen if lim_min <= grenze <= lim_max)
 
     def _get_date(self):
         return None
 
+class Verbesserungen:
+    """
+    Die Verbesserungen aller Leistungen eines Schülers für den schriftlichen Schnitt mean. Die Noten werden für alle
+    Leistungen gemeinsam über die Status-Codes (0 offen/unverbessert, 1 fehlt, 2 fertig) bestimmt, LeistungV-Objekte
+    erst bei Bedarf mit leistungen() erzeugt.
+    """
+    _status_codes = {None: 0, False: 1, True: 2}
+
+    def __init__(self, leistungen=(), mean=None, w_th=None, system=None):
+        self._leistungen = [leistung for leistung in leistungen if leistung.status._enabled]
+        self._mean = mean
+        self.w_th = w_th
+        self.system = system
+        self.codes = np.fromiter((self._status_codes[leistung.status.status] for leistung in self._leistungen), dtype=np.intp, count=len(self._leistungen))
+        self.werte = np.empty(0)
+        if self._leistungen:
+            if mean is None:
+                raise ValueError("Der Mittelwert der schriftlichen Noten muss angegeben werden.")
+            if w_th is None:
+                raise ValueError("Die Schranke w_th muss angeeben werden.")
+            self.werte = self._werte_fuer(float(mean), w_th, system, self.codes)
+        # Ohne Verbesserung (w_d >= 1) zählt keine der Leistungen
+        gezaehlt = self.codes if len(self.werte) else self.codes[:0]
+        self.nv1 = int(np.count_nonzero(gezaehlt == 1))
+        self.nv2 = int(np.count_nonzero(gezaehlt == 2))
+        self._liste = None
+
+    @staticmethod
+    def _werte_fuer(mean, w_th, system, codes):
+        """
+        Noten der Verbesserungen zu den Status-Codes, ein leeres Array, wenn für mean keine Verbesserung möglich ist.
+        """
+        w_d, w_v1, w_v2 = LeistungV._werte(mean, w_th, system)
+        if w_d >= 1:
+            return np.empty(0)
+        return np.array([mean, w_v1, w_v2])[codes]
+
+    def __len__(self):
+        return len(self.werte)
+
+    def weight(self):
+        """
+        Weight-Objekt der Verbesserungen, gleich Weight(*self.leistungen()).
+        """
+        if not len(self.werte):
+            return Weight._from_mean(None, 0)
+        weight = Weight._from_mean(NoteValue(np.mean(self.werte), system=self.system), len(self.werte))
+        weight._type = [LeistungV] * len(self.werte)
+        weight._anteile = weight._anteile_der_typen()
+        return weight
+
+    def leistungen(self):
+        """
+        Die Verbesserungen als LeistungV-Objekte, z.B. für die Ausgabe in Tabellen.
+        """
+        if self._liste is None:
+            self._liste = [LeistungV(mean=self._mean, status=leistung.status, system=leistung.system, w_th=self.w_th, date=leistung.date, due=leistung.status.due)
+                           for leistung in self._leistungen] if len(self.werte) else []
+        return self._liste
+
 ##########################################
 ##########################################
 
@@ -807,28 +1144,55 @@ class LimitsGeneric:
                     },
                 ]
 
+    # Je Limits-Klasse: Leistungstyp -> Indizes der Limits, für die eine Leistung dieses Typs zählt
+    _tabellen = {}
+
+    @staticmethod
+    def _matches(limit, typ):
+        return any(issubclass(typ, item) or typ._attribut == item for item in limit['sum'])
+
     @classmethod
-    def _check_limits(cls, leistungen):
-        limits = cls.limits.copy()
-        for limit in limits:
-            sum_attributes = 0
-            for leistung in leistungen:
-                if any(isinstance(obj, item) or obj == item for obj in [leistung, leistung._attribut] for item in limit['sum']):
-                    sum_attributes += 1
-            limit['result'] = sum_attributes
-            limit['passed'] = True
-            limit['softfail'] = False
-            limit['hardfail'] = False
-            
-            
-            if limit['min'] is not None and sum_attributes < limit['min']:
-                limit['passed'] = False
-                limit['softfail'] = True
-    
-            
-            if limit['max'] is not None and sum_attributes > limit['max']:
-                limit['passed'] = False
-                limit['hardfail'] = True
+    def _indizes(cls, typ):
+        """
+        Liefert die Indizes der Limits, in die ein Leistungstyp eingeht. Die Zuordnung wird für jeden Typ nur einmal
+        über _matches bestimmt und in der Tabelle der Klasse abgelegt.
+        """
+        tabelle = LimitsGeneric._tabellen.get(cls)
+        if tabelle is None:
+            tabelle = LimitsGeneric._tabellen.setdefault(cls, {})
+        indizes = tabelle.get(typ)
+        if indizes is None:
+            indizes = tabelle[typ] = tuple(idx for idx, limit in enumerate(cls.limits) if cls._matches(limit, typ))
+        return indizes
+
+    @classmethod
+    def _check_limits(cls, leistungen, weitere=None):
+        """
+        Zählt die Leistungen je Limit. Über weitere können Anzahlen je Leistungstyp ergänzt werden, ohne Objekte zu
+        erzeugen, z.B. {LeistungV: len(verbesserungen)}.
+        """
+        counts = [0] * len(cls.limits)
+        anzahlen = Counter(map(type, leistungen))
+        anzahlen.update(weitere or {})
+        for typ, anzahl in anzahlen.items():
+            for idx in cls._indizes(typ):
+                counts[idx] += anzahl
+        return cls._evaluate_limits(counts)
+
+    @classmethod
+    def _evaluate_limits(cls, counts):
+        # Die Ergebnisse werden in neuen Dictionaries abgelegt, die Limits der Klasse bleiben unverändert
+        limits = []
+        for limit, sum_attributes in zip(cls.limits, counts):
+            softfail = limit['min'] is not None and sum_attributes < limit['min']
+            hardfail = limit['max'] is not None and sum_attributes > limit['max']
+            limits.append({
+                           **limit,
+                           'result' : sum_attributes,
+                           'passed' : not (softfail or hardfail),
+                           'softfail' : softfail,
+                           'hardfail' : hardfail,
+                           })
                 
         result = {
                   'passed' : all(limit['passed'] for limit in limits), 
@@ -840,8 +1204,12 @@ class LimitsGeneric:
         return result
 
     @classmethod
-    def check_limits(cls, leistungen, show_warnings=True, info = {}):
-        checks = cls._check_limits(leistungen)
+    def check_limits(cls, leistungen, show_warnings=True, info = {}, weitere=None):
+        checks = cls._check_limits(leistungen, weitere=weitere)
+        return cls._report_limits(checks, show_warnings=show_warnings, info=info)
+
+    @classmethod
+    def _report_limits(cls, checks, show_warnings=True, info = {}):
         infoprint = "\n".join([f"{key}: {value}" for key, value in info.items()])
 
         if not checks['passed']:
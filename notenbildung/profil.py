@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Messung der Laufzeit einzelner Phasen der Notenberechnung
+"""
+import time
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+_AKTIV = contextvars.ContextVar('profil', default=None)
+_BEREICH = contextvars.ContextVar('profil_bereich', default=(None, None))
+
+def _addieren(phasen, phase, dauer, anzahl=1, maximum=None):
+    werte = phasen.get(phase)
+    if werte is None:
+        phasen[phase] = [anzahl, dauer, dauer if maximum is None else maximum]
+    else:
+        werte[0] += anzahl
+        werte[1] += dauer
+        werte[2] = max(werte[2], dauer if maximum is None else maximum)
+
+def _zusammenfuehren(ziel, quelle):
+    for phase, (anzahl, summe, maximum) in quelle.items():
+        _addieren(ziel, phase, summe, anzahl=anzahl, maximum=maximum)
+
+def _als_dict(phasen):
+    return {phase : {'anzahl' : anzahl, 'summe' : summe, 'mittel' : summe / anzahl, 'max' : maximum}
+            for phase, (anzahl, summe, maximum) in sorted(phasen.items(), key=lambda item: -item[1][1])}
+
+class Profil:
+    """
+    Sammelt Laufzeit (Wanduhr, Sekunden) und Anzahl der Aufrufe je Phase, insgesamt sowie je Lerngruppe und je
+    Schüler. Gemessen wird nur innerhalb des with-Blocks im aktuellen Thread bzw. asyncio-Task, ohne aktives Profil
+    kostet eine gemessene Methode nur die Abfrage einer ContextVar.
+
+    with Profil() as profil:
+        loader = ExcelFileLoader('noten.xlsx')
+        loader.export()
+    print(profil.bericht_text())
+
+    Die Phasen sind verschachtelt (berechne_gesamtnote enthält _set_SJ, _calculate, ...), die Zeiten sind daher
+    jeweils inklusive der inneren Phasen. callback(phase, dauer, gruppe, sid) wird nach jeder Messung aufgerufen,
+    z.B. um die Werte an ein Metriksystem weiterzugeben.
+    """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._phasen = {}
+        self._gruppen = {}
+        self._schueler = {}
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_AKTIV.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _AKTIV.reset(self._tokens.pop())
+
+    @staticmethod
+    def aktiv():
+        return _AKTIV.get()
+
+    @staticmethod
+    @contextmanager
+    def bereich(gruppe=None, sid=None):
+        """
+        Ordnet die Messungen im Block einer Lerngruppe bzw. einem Schüler zu. Nicht angegebene Werte werden vom
+        umgebenden Bereich übernommen.
+        """
+        aktuell = _BEREICH.get()
+        token = _BEREICH.set((gruppe if gruppe is not None else aktuell[0], sid if sid is not None else aktuell[1]))
+        try:
+            yield
+        finally:
+            _BEREICH.reset(token)
+
+    @staticmethod
+    def _zuordnung(objekt=None):
+        gruppe, sid = _BEREICH.get()
+        if sid is None and objekt is not None:
+            # Notenberechnungen kennen ihren Schüler über parent
+            sid = getattr(getattr(objekt, 'parent', None), 'sid', None)
+        return gruppe, sid
+
+    def erfassen(self, phase, dauer, gruppe=None, sid=None):
+        with self._lock:
+            _addieren(self._phasen, phase, dauer)
+            if gruppe is not None:
+                _addieren(self._gruppen.setdefault(gruppe, {}), phase, dauer)
+            if sid is not None:
+                _addieren(self._schueler.setdefault((gruppe, sid), {}), phase, dauer)
+        if self.callback is not None:
+            self.callback(phase, dauer, gruppe, sid)
+
+    @contextmanager
+    def phase(self, phase, objekt=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.erfassen(phase, time.perf_counter() - start, *self._zuordnung(objekt))
+
+    def daten(self):
+        """
+        Rohdaten zum Zusammenführen, z.B. aus einem anderen Prozess.
+        """
+        with self._lock:
+            return {
+                    'phasen' : {phase : list(werte) for phase, werte in self._phasen.items()},
+                    'gruppen' : {gruppe : {phase : list(werte) for phase, werte in phasen.items()} for gruppe, phasen in self._gruppen.items()},
+                    'schueler' : {key : {phase : list(werte) for phase, werte in phasen.items()} for key, phasen in self._schueler.items()},
+                    }
+
+    def zusammenfuehren(self, daten):
+        with self._lock:
+            _zusammenfuehren(self._phasen, daten['phasen'])
+            for gruppe, phasen in daten['gruppen'].items():
+                _zusammenfuehren(self._gruppen.setdefault(gruppe, {}), phasen)
+            for key, phasen in daten['schueler'].items():
+                _zusammenfuehren(self._schueler.setdefault(key, {}), phasen)
+
+    def zuruecksetzen(self):
+        with self._lock:
+            self._phasen, self._gruppen, self._schueler = {}, {}, {}
+
+    def bericht(self):
+        """
+        Strukturierter Bericht: je Phase Anzahl, Summe, Mittelwert und Maximum der Laufzeit, dazu dieselben Werte je
+        Lerngruppe und je Schüler. Die Phasen sind nach der Summe der Laufzeit absteigend sortiert.
+        """
+        with self._lock:
+            return {
+                    'phasen' : _als_dict(self._phasen),
+                    'gruppen' : {gruppe : _als_dict(phasen) for gruppe, phasen in self._gruppen.items()},
+                    'schueler' : [{'gruppe' : gruppe, 'sid' : sid, 'phasen' : _als_dict(phasen)} for (gruppe, sid), phasen in self._schueler.items()],
+                    }
+
+    def bericht_text(self, n_schueler=5, phase='berechne_gesamtnote'):
+        """
+        Übersicht der Phasen und der Schüler mit der längsten Laufzeit in einer Phase.
+        """
+        bericht = self.bericht()
+        zeilen = [f"{'Phase':30s} {'Anzahl':>8s} {'Summe':>10s} {'Mittel':>10s} {'Max':>10s}"]
+        for name, werte in bericht['phasen'].items():
+            zeilen.append(f"{name:30s} {werte['anzahl']:8d} {werte['summe']*1000:8.1f}ms {werte['mittel']*1000:8.3f}ms {werte['max']*1000:8.3f}ms")
+        langsam = sorted((eintrag for eintrag in bericht['schueler'] if phase in eintrag['phasen']), key=lambda eintrag: -eintrag['phasen'][phase]['summe'])
+        if langsam:
+            zeilen.append(f"Schüler mit der längsten Laufzeit in {phase}:")
+            for eintrag in langsam[:n_schueler]:
+                zeilen.append(f"  {eintrag['gruppe']} {eintrag['sid']}: {eintrag['phasen'][phase]['summe']*1000:.1f}ms")
+        return "\n".join(zeilen)
+
+    def __repr__(self):
+        return f"Profil({len(self._phasen)} Phasen)"
+
+def profiliert(phase):
+    """
+    Misst die Laufzeit einer Methode als phase, wenn ein Profil aktiv ist. Die Zuordnung zum Schüler erfolgt über
+    den aktuellen Bereich oder das parent-Attribut des Objekts.
+    """
+    def dekorator(methode):
+        @functools.wraps(methode)
+        def gemessen(self, *args, **kwargs):
+            profil = _AKTIV.get()
+            if profil is None:
+                return methode(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return methode(self, *args, **kwargs)
+            finally:
+                profil.erfassen(phase, time.perf_counter() - start, *profil._zuordnung(self))
+        return gemessen
+    return dekorator
+
+@contextmanager
+def messen(phase, objekt=None):
+    """
+    Misst einen Block als phase, wenn ein Profil aktiv ist.
+    """
+    profil = _AKTIV.get()
+    if profil is None:
+        yield
+        return
+    with profil.phase(phase, objekt):
+        yield
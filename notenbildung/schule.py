@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Auswertung über alle Lerngruppen und Fächer einer Schule
+"""
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from notenbildung.batch import *
+from notenbildung.archiv import _klasse
+
+# Eine Zeile je Schüler und Lerngruppe
+SPALTEN = ['schuljahr', 'stufe', 'zug', 'klasse', 'kurs', 'fach', 'sid', 'vorname', 'nachname', 'system',
+           'n_leistungen', 'm_s1', 'm_s', 'm_m', 'gesamtnote', 'hj', 'z']
+NOTEN = ['m_s1', 'm_s', 'm_m', 'gesamtnote']
+
+def _zahl(note):
+    return float(note) if note is not None else np.nan
+
+def _runden(werte, system):
+    """
+    Vektorisierte Entsprechung von NoteBase._round: x.5 wird im System N auf-, im System NP abgerundet.
+    """
+    werte = np.asarray(werte, dtype=float)
+    halb = (werte % 1) == 0.5
+    if system == SystemN:
+        return np.where(halb, np.ceil(werte), np.round(werte))
+    if system == SystemNP:
+        return np.where(halb, np.floor(werte), np.round(werte))
+    return np.full_like(werte, np.nan)
+
+def _zeugnisnoten(tabelle):
+    """
+    Ergänzt Halbjahres- (hj) und Zeugnisnote (z) als Zahl wie NoteBase.gerundet, getrennt nach Notensystem.
+    """
+    hj = np.full(len(tabelle), np.nan)
+    z = np.full(len(tabelle), np.nan)
+    systeme = tabelle['system'].to_numpy()
+    gesamtnote = tabelle['gesamtnote'].to_numpy(dtype=float)
+    for system in (SystemN, SystemNP):
+        maske = systeme == system.name
+        z[maske] = _runden(gesamtnote[maske], system)
+        hj[maske] = _runden(gesamtnote[maske] * 4, system) / 4 if system == SystemN else z[maske]
+    tabelle['hj'] = hj
+    tabelle['z'] = z
+    return tabelle
+
+def _defizit(tabelle, spalte='z'):
+    """
+    Noten unter ausreichend: ab 5 im System N, unter 5 Punkten im System NP.
+    """
+    werte = tabelle[spalte].to_numpy(dtype=float)
+    systeme = tabelle['system'].to_numpy()
+    with np.errstate(invalid='ignore'):
+        return ((systeme == SystemN.name) & (werte >= 5)) | ((systeme == SystemNP.name) & (werte < 5))
+
+class Schule:
+    """
+    Hält viele Lerngruppen (z.B. alle Klassen und Kurse eines Schuljahres) und wertet deren Noten gemeinsam aus. Die
+    Ergebnisse aller Schüler stehen in einer gemeinsamen Tabelle (eine Zeile je Schüler und Lerngruppe), Verteilungen,
+    Mittelwerte und Übersichten über alle Fächer werden darauf mit gruppierten Operationen berechnet.
+
+    schule = Schule(*(klasse.gruppe for klasse in ExcelFileLoader('noten.xlsx').klassen))
+    schule.zeugnis()                            # je Schüler die Zeugnisnoten aller Fächer
+    schule.verteilung(nach=['fach'])            # Anzahl je Zeugnisnote und Fach
+    schule.mittelwerte(nach=['klasse', 'fach'])  # Klassenschnitte
+    schule.schueler(1234)                       # alle Fächer eines Schülers
+
+    Schule.aus_archiv berechnet die Noten direkt aus einem LerngruppenArchiv, ohne Objekte je Schüler anzulegen.
+    """
+    def __init__(self, *gruppen):
+        self.gruppen = {}
+        self._tabelle = None
+        self._index = None
+        self.hinzufuegen(*gruppen)
+
+    @staticmethod
+    def _key(gruppe):
+        return (gruppe._get_sj(), gruppe.fach.name, gruppe.kurs)
+
+    def hinzufuegen(self, *gruppen):
+        """
+        Fügt Lerngruppen hinzu. Eine Lerngruppe mit gleichem Schuljahr, Fach und Kurs wird ersetzt.
+        """
+        for gruppe in gruppen:
+            if not isinstance(gruppe, LerngruppeEntity):
+                raise ValueError("Es können nur Objekte der Klasse LerngruppeEntity hinzugefügt werden.")
+            self.gruppen[self._key(gruppe)] = gruppe
+        if gruppen:
+            self._tabelle, self._index = None, None
+
+    @classmethod
+    def aus_tabelle(cls, tabelle):
+        """
+        Erzeugt eine Auswertung aus einer fertigen Tabelle mit den Spalten SPALTEN (z.B. aus einer früheren Auswertung).
+        """
+        schule = cls()
+        fehlend = [spalte for spalte in SPALTEN if spalte not in tabelle.columns]
+        if fehlend:
+            raise ValueError(f"Fehlende Spalten: {', '.join(fehlend)}")
+        schule._tabelle = tabelle[SPALTEN].reset_index(drop=True)
+        return schule
+
+    @classmethod
+    def aus_archiv(cls, archiv, filter=None, **gleich):
+        """
+        Berechnet die Noten aller Schüler aus einem LerngruppenArchiv spaltenweise mit NotenberechnungBatch, je
+        Modell und Konfiguration in einem Durchlauf. Die Bedingungen wählen wie bei LerngruppenArchiv.tabelle aus,
+        z.B. schuljahr=2023. Die Fristen der Verbesserungen werden zum Stichtag ausgewertet. Schüler, deren Note
+        nicht berechnet werden kann (z.B. nur fehlende Noten), erhalten keine Noten.
+        """
+        spalten = ['schuljahr', 'stufe', 'zug', 'klasse', 'kurs', 'fach', 'sid', 'sid_ist_zahl', 'vorname', 'nachname',
+                   'date', 'art', 'note', 'system', 'status_eingabe', 'due', 'fach_klasse', 'modell', 'w_th', 'w_s0',
+                   'w_sm', 'n_KT_0', 'v_enabled']
+        daten = archiv.tabelle(spalten=spalten, filter=filter, **gleich).to_pandas()
+        # Verbesserungen werden aus dem Status neu berechnet
+        daten = daten[daten['art'] != 'V'].reset_index(drop=True)
+        if len(daten) == 0:
+            return cls.aus_tabelle(pd.DataFrame(columns=SPALTEN))
+
+        schueler_keys = ['schuljahr', 'fach_klasse', 'klasse', 'kurs', 'sid']
+        nummer, _ = pd.MultiIndex.from_frame(daten[schueler_keys]).factorize()
+        erste = np.unique(nummer, return_index=True)[1]
+        tabelle = daten.iloc[erste][['schuljahr', 'stufe', 'zug', 'klasse', 'kurs', 'fach', 'sid', 'sid_ist_zahl', 'vorname', 'nachname', 'system']].reset_index(drop=True)
+        tabelle['sid'] = [int(sid) if zahl else sid for sid, zahl in zip(tabelle['sid'], tabelle.pop('sid_ist_zahl'))]
+        tabelle['n_leistungen'] = np.bincount(nummer, minlength=len(erste))
+        for spalte in NOTEN:
+            tabelle[spalte] = np.nan
+
+        systeme = {system.__name__ : system for system in (SystemN, SystemNPS, SystemNP, SystemNORM)}
+        konfiguration = ['modell', 'system', 'w_th', 'w_s0', 'w_sm', 'n_KT_0', 'v_enabled']
+        for werte, zeilen in daten.groupby(konfiguration, sort=False).indices.items():
+            config = dict(zip(konfiguration, werte))
+            batch = NotenberechnungBatch(model=_klasse(NotenberechnungGeneric, config.pop('modell')),
+                                         system=systeme[config.pop('system')], **{key : (bool(wert) if key == 'v_enabled' else wert) for key, wert in config.items()})
+            teil = daten.iloc[zeilen]
+            # Schüler dieser Konfiguration fortlaufend nummerieren
+            schueler, codes = np.unique(nummer[zeilen], return_inverse=True)
+            result = batch.berechne(
+                                    schueler=codes,
+                                    art=batch.art_codes(teil['art']),
+                                    note=teil['note'].to_numpy(dtype=float),
+                                    datum=teil['date'].to_numpy(dtype='datetime64[ns]'),
+                                    status=teil['status_eingabe'].to_numpy(dtype=object),
+                                    due=teil['due'].to_numpy(dtype='datetime64[ns]'),
+                                    n_schueler=len(schueler),
+                                    )
+            for spalte in NOTEN:
+                tabelle.loc[schueler, spalte] = result[spalte]
+
+        tabelle['system'] = tabelle['system'].map({name : system.name for name, system in systeme.items()})
+        tabelle['schuljahr'] = tabelle['schuljahr'].astype(int)
+        tabelle['stufe'] = tabelle['stufe'].astype(int)
+        return cls.aus_tabelle(_zeugnisnoten(tabelle))
+
+    def _zeilen(self):
+        for (schuljahr, _, _), gruppe in self.gruppen.items():
+            kopf = gruppe._get_group_vars_as_dict()
+            for schueler in gruppe.schueler.values():
+                noten = getattr(schueler, '_notenberechnung', None)
+                note = schueler.note
+                yield (schuljahr, kopf['stufe'], kopf['zug'], kopf['klasse'], kopf['kurs'], kopf['fach'],
+                       schueler.sid, schueler.vorname, schueler.nachname,
+                       (noten.system if noten is not None else ConfigNVO.system).name,
+                       len(noten.noten) if noten is not None else 0,
+                       *(_zahl(getattr(note, key, None) if note is not None else None) for key in NOTEN))
+
+    @property
+    def tabelle(self):
+        """
+        Die gemeinsame Tabelle aller Schüler und Lerngruppen. Sie wird beim ersten Zugriff aus den bereits berechneten
+        Noten erzeugt und nach hinzufuegen neu aufgebaut.
+        """
+        if self._tabelle is None:
+            tabelle = pd.DataFrame.from_records(list(self._zeilen()), columns=SPALTEN[:-2])
+            self._tabelle = _zeugnisnoten(tabelle)
+        return self._tabelle
+
+    @property
+    def sid_index(self):
+        """
+        Zeilen der Tabelle je sid.
+        """
+        if self._index is None:
+            self._index = self.tabelle.groupby('sid', sort=False).indices
+        return self._index
+
+    def schueler(self, sid):
+        """
+        Die Noten eines Schülers in allen Fächern bzw. Lerngruppen.
+        """
+        zeilen = self.sid_index.get(sid)
+        if zeilen is None:
+            raise ValueError(f"Kein Schüler mit der sid {sid} vorhanden.")
+        return self.tabelle.iloc[zeilen]
+
+    def zeugnis(self, spalte='z'):
+        """
+        Je Schüler eine Zeile mit der Note (Standard: Zeugnisnote) in jedem Fach sowie Schnitt, Anzahl der Fächer und
+        Anzahl der Noten unter ausreichend über alle Fächer. Hat ein Schüler ein Fach in mehreren Lerngruppen (z.B.
+        nach einem Kurswechsel), zählt der Mittelwert.
+        """
+        tabelle = self.tabelle.assign(defizit=_defizit(self.tabelle, spalte) if spalte in ('z', 'hj') else False)
+        schluessel = ['schuljahr', 'sid', 'nachname', 'vorname']
+        noten = tabelle.groupby(schluessel + ['fach'], sort=True)[spalte].mean().unstack('fach')
+        zusammen = tabelle.groupby(schluessel, sort=True).agg(schnitt=(spalte, 'mean'), n_faecher=('fach', 'nunique'), defizite=('defizit', 'sum'))
+        return noten.join(zusammen)
+
+    def verteilung(self, nach=('schuljahr', 'fach'), spalte='z', anteil=False):
+        """
+        Anzahl (bzw. Anteil mit anteil=True) je Note, gruppiert nach den Spalten in nach.
+        """
+        nach = list(nach)
+        verteilung = self.tabelle.dropna(subset=[spalte]).groupby(nach + [spalte], sort=True).size().unstack(spalte, fill_value=0)
+        if anteil:
+            verteilung = verteilung.div(verteilung.sum(axis=1), axis=0)
+        return verteilung
+
+    def mittelwerte(self, nach=('schuljahr', 'fach', 'klasse'), spalte='gesamtnote'):
+        """
+        Anzahl, Mittelwert, Standardabweichung, Minimum, Median und Maximum je Gruppe, z.B. Klassenschnitte je Fach.
+        Die Gruppen sollten nur ein Notensystem enthalten.
+        """
+        return self.tabelle.groupby(list(nach), sort=True)[spalte].agg(['count', 'mean', 'std', 'min', 'median', 'max'])
+
+    def faecher(self, spalte='z'):
+        """
+        Übersicht je Schuljahr und Fach: Anzahl der Lerngruppen und Schüler, Schnitt und Anteil unter ausreichend.
+        """
+        tabelle = self.tabelle.assign(defizit=_defizit(self.tabelle, spalte))
+        return tabelle.groupby(['schuljahr', 'fach'], sort=True).agg(
+                                                                     lerngruppen=('kurs', 'nunique'),
+                                                                     schueler=('sid', 'count'),
+                                                                     schnitt=(spalte, 'mean'),
+                                                                     anteil_defizit=('defizit', 'mean'),
+                                                                     )
+
+    def __len__(self):
+        return len(self.tabelle)
+
+    def __repr__(self):
+        return f"Schule({len(self.gruppen)} Lerngruppen)"
+
+if __name__ == "__main__":
+    pass
+    # Beispiel
+    schule = Schule()
+    for fach, zug in [(FachM, 'a'), (FachM, 'b'), (FachPH, 'a')]:
+        gruppe = LerngruppeEntity(stufe=7, zug=zug, fach=fach)
+        for sid in range(3):
+            schueler = SchuelerEntity(sid=f'{zug}{sid}', vorname=f'Vorname{sid}', nachname=f'Nachname{sid}')
+            noten = Notenberechnung(fach=fach, w_th=0.4)
+            noten.note_hinzufuegen(art='KA', date='2023-10-10', note=2 + sid)
+            noten.note_hinzufuegen(art='m', date='2023-11-10', note=1.5 + sid, von='2023-09-15')
+            schueler.setze_note(noten)
+            gruppe.update_sid(schueler)
+        schule.hinzufuegen(gruppe)
+    print(schule.zeugnis())
+    print(schule.mittelwerte(nach=['fach', 'klasse']))
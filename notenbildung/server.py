@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lokaler HTTP-Dienst für Notenberechnungen
+"""
+import os
+import sys
+import io
+import json
+import time
+import bisect
+import asyncio
+import argparse
+import threading
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
+from notenbildung.cli import *
+
+def _konfiguration(werte):
+    werte = dict(werte or {})
+    if 'system' in werte:
+        if werte['system'] not in SYSTEME:
+            raise ValueError(f"Erlaubte Notensysteme sind {', '.join(SYSTEME)}")
+        werte['system'] = SYSTEME[werte['system']]
+    return ConfigNVO.konfiguration(**werte)
+
+def _limits_als_dict(checks):
+    return {
+            'passed' : checks['passed'],
+            'softfail' : checks['softfail'],
+            'hardfail' : checks['hardfail'],
+            'result' : [{**limit, 'sum' : [item.__name__ for item in limit['sum']]} for limit in checks['result']],
+            }
+
+def berechne_schueler(anfrage):
+    """
+    Berechnet die Note eines Schülers. anfrage enthält leistungen (Datensätze wie bei `notenbildung berechnen`) und
+    optional sid, fach, modell, konfiguration und stichtag (Datum für Fristen von Verbesserungen). Das Ergebnis enthält
+    die Note (None ohne Leistungen), die Anteile der Leistungsarten in Prozent und die Prüfung der Limits des Fachs,
+    bei ungültigen Angaben stattdessen fehler.
+    """
+    ergebnis = {'sid' : anfrage.get('sid')}
+    try:
+        modell = anfrage.get('modell', 'Notenberechnung')
+        if modell not in MODELLE:
+            raise ValueError(f"Unbekanntes Modell: {modell}")
+        fach = fach_aus_name(anfrage.get('fach'))
+        notenberechnung = MODELLE[modell](fach=fach, konfiguration=_konfiguration(anfrage.get('konfiguration')))
+        leistungen = anfrage.get('leistungen')
+        if not isinstance(leistungen, list) or not all(isinstance(leistung, dict) for leistung in leistungen):
+            raise ValueError("leistungen muss eine Liste von Objekten sein.")
+        # Der Status der Verbesserungen wird beim Hinzufügen der Leistungen ausgewertet
+        with Stichtag(anfrage['stichtag']) if anfrage.get('stichtag') is not None else contextlib.nullcontext():
+            noten_hinzufuegen(notenberechnung, leistungen)
+        if fach is not None:
+            ergebnis['limits'] = _limits_als_dict(fach.limits._check_limits(notenberechnung.noten))
+        if not notenberechnung.noten:
+            # Ohne Leistungen gibt es keine Note, wie bei SchuelerEntity.setze_note
+            ergebnis['note'] = None
+            return ergebnis
+        note = notenberechnung.berechne_gesamtnote(show_warnings=False)
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        ergebnis['fehler'] = str(e)
+        return ergebnis
+
+    ergebnis['note'] = noten_als_dict(note)
+    ergebnis['prozente'] = note.prozente()
+    if fach is not None:
+        # Mit den Verbesserungen aus der Berechnung
+        ergebnis['limits'] = _limits_als_dict(fach.limits._check_limits(notenberechnung.noten, weitere={LeistungV : len(notenberechnung._verbesserungen)}))
+    return ergebnis
+
+def berechne_stapel(anfragen):
+    # Meldungen der Modelle werden verworfen, die Ergebnisse enthalten Fehler und Limits. Alle Anfragen eines Stapels
+    # ohne eigenen Stichtag verwenden denselben Zeitpunkt.
+    with contextlib.redirect_stdout(io.StringIO()), Stichtag():
+        return [berechne_schueler(anfrage) for anfrage in anfragen]
+
+class Histogramm:
+    """
+    Histogramm im Format von Prometheus (kumulierte Buckets, Summe und Anzahl).
+    """
+    def __init__(self, grenzen):
+        self.grenzen = list(grenzen)
+        self.anzahlen = [0] * (len(self.grenzen) + 1)
+        self.summe = 0
+        self.anzahl = 0
+
+    def beobachte(self, wert):
+        self.anzahlen[bisect.bisect_left(self.grenzen, wert)] += 1
+        self.summe += wert
+        self.anzahl += 1
+
+    def zeilen(self, name, labels=''):
+        trenner = ',' if labels else ''
+        kumuliert = 0
+        for grenze, anzahl in zip(self.grenzen + ['+Inf'], self.anzahlen):
+            kumuliert += anzahl
+            yield f'{name}_bucket{{{labels}{trenner}le="{grenze}"}} {kumuliert}'
+        yield f'{name}_sum{{{labels}}} {self.summe}'
+        yield f'{name}_count{{{labels}}} {self.anzahl}'
+
+class Metriken:
+    """
+    Antwortzeiten je Endpunkt, Anzahl der Anfragen je Endpunkt und Status sowie die Größe der Stapel.
+    """
+    latenz_grenzen = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+    stapel_grenzen = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+    def __init__(self):
+        self.latenz = {}
+        self.anfragen = {}
+        self.stapel = Histogramm(self.stapel_grenzen)
+        self.start = time.time()
+
+    def anfrage(self, endpunkt, status, dauer):
+        self.latenz.setdefault(endpunkt, Histogramm(self.latenz_grenzen)).beobachte(dauer)
+        self.anfragen[(endpunkt, status)] = self.anfragen.get((endpunkt, status), 0) + 1
+
+    def text(self):
+        zeilen = ['# TYPE notenbildung_anfrage_dauer_sekunden histogram']
+        for endpunkt, histogramm in sorted(self.latenz.items()):
+            zeilen.extend(histogramm.zeilen('notenbildung_anfrage_dauer_sekunden', f'endpunkt="{endpunkt}"'))
+        zeilen.append('# TYPE notenbildung_anfragen_total counter')
+        for (endpunkt, status), anzahl in sorted(self.anfragen.items()):
+            zeilen.append(f'notenbildung_anfragen_total{{endpunkt="{endpunkt}",status="{status}"}} {anzahl}')
+        zeilen.append('# TYPE notenbildung_stapel_groesse histogram')
+        zeilen.extend(self.stapel.zeilen('notenbildung_stapel_groesse'))
+        zeilen.append('# TYPE notenbildung_laufzeit_sekunden gauge')
+        zeilen.append(f'notenbildung_laufzeit_sekunden {time.time() - self.start:.3f}')
+        return '\n'.join(zeilen) + '\n'
+
+class Sammler:
+    """
+    Sammelt einzelne Berechnungen und gibt sie als Stapel an den Pool weiter: sobald max_stapel Anfragen vorliegen
+    oder max_wartezeit Sekunden nach der ersten Anfrage vergangen sind.
+    """
+    def __init__(self, executor, metriken, max_stapel=64, max_wartezeit=0.002):
+        self.executor = executor
+        self.metriken = metriken
+        self.max_stapel = max_stapel
+        self.max_wartezeit = max_wartezeit
+        self._offen = []
+        self._zeitgeber = None
+
+    async def berechne(self, anfrage):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._offen.append((anfrage, future))
+        if len(self._offen) >= self.max_stapel:
+            self._abschicken()
+        elif self._zeitgeber is None:
+            self._zeitgeber = loop.call_later(self.max_wartezeit, self._abschicken)
+        return await future
+
+    def _abschicken(self):
+        if self._zeitgeber is not None:
+            self._zeitgeber.cancel()
+            self._zeitgeber = None
+        stapel, self._offen = self._offen, []
+        if not stapel:
+            return
+        self.metriken.stapel.beobachte(len(stapel))
+        berechnung = asyncio.get_running_loop().run_in_executor(self.executor, berechne_stapel, [anfrage for anfrage, _ in stapel])
+        berechnung.add_done_callback(lambda berechnung: self._verteilen(stapel, berechnung))
+
+    @staticmethod
+    def _verteilen(stapel, berechnung):
+        for idx, (_, future) in enumerate(stapel):
+            if future.done():
+                continue
+            if berechnung.exception() is not None:
+                future.set_exception(berechnung.exception())
+            else:
+                future.set_result(berechnung.result()[idx])
+
+class NotenServer:
+    """
+    HTTP/1.1-Server auf Basis von asyncio mit Keep-Alive. Die Berechnungen laufen gesammelt in einem Prozesspool
+    (workers=0: Threads im selben Prozess, z.B. für Tests).
+
+    POST /note     {"fach": "M", "konfiguration": {"w_th": 0.4}, "leistungen": [{"art": "KA", "note": 2.5, "date": "2024-01-10"}, ...]}
+    POST /gruppe   {"fach": "M", "konfiguration": {...}, "schueler": [{"sid": 1, "leistungen": [...]}, ...]}
+    GET  /metrics  Metriken im Textformat von Prometheus
+    GET  /health
+
+    with NotenServer(port=0).im_hintergrund() as url:
+        ...
+    """
+    max_laenge = 16 * 2**20
+
+    def __init__(self, host='127.0.0.1', port=8080, workers=None, max_stapel=64, max_wartezeit=0.002, keep_alive=15):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_stapel = max_stapel
+        self.max_wartezeit = max_wartezeit
+        self.keep_alive = keep_alive
+        self.metriken = Metriken()
+        self._server = None
+        self._executor = None
+        self._sammler = None
+        self._verbindungen = set()
+
+    async def start(self):
+        if self.workers == 0:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        else:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._sammler = Sammler(self._executor, self.metriken, max_stapel=self.max_stapel, max_wartezeit=self.max_wartezeit)
+        self._server = await asyncio.start_server(self._verbindung, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # Offene Keep-Alive-Verbindungen beenden
+        for task in list(self._verbindungen):
+            task.cancel()
+        await asyncio.gather(*self._verbindungen, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Notenberechnung unter http://{self.host}:{self.port}", file=sys.stderr)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    @contextlib.contextmanager
+    def im_hintergrund(self):
+        """
+        Startet den Server in einem eigenen Thread mit eigener Event-Loop und liefert die Basis-URL.
+        """
+        loop = asyncio.new_event_loop()
+        gestartet = threading.Event()
+        thread = threading.Thread(target=self._im_thread, args=(loop, gestartet), daemon=True)
+        thread.start()
+        gestartet.wait()
+        try:
+            yield f"http://{self.host}:{self.port}"
+        finally:
+            asyncio.run_coroutine_threadsafe(self.stop(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def _im_thread(self, loop, gestartet):
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(self.start())
+        gestartet.set()
+        loop.run_forever()
+
+    async def _verbindung(self, reader, writer):
+        task = asyncio.current_task()
+        self._verbindungen.add(task)
+        try:
+            while True:
+                try:
+                    zeile = await asyncio.wait_for(reader.readline(), self.keep_alive)
+                except asyncio.TimeoutError:
+                    break
+                if not zeile:
+                    break
+                start = time.perf_counter()
+                try:
+                    methode, pfad, version = zeile.decode('latin-1').split()
+                except ValueError:
+                    await self._antworten(writer, 400, {'fehler' : 'Ungültige Anfrage'}, False)
+                    break
+                kopf = {}
+                while True:
+                    zeile = await reader.readline()
+                    if zeile in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, wert = zeile.decode('latin-1').partition(':')
+                    kopf[key.strip().lower()] = wert.strip()
+                verbindung = kopf.get('connection', '').lower()
+                offen_halten = verbindung != 'close' if version == 'HTTP/1.1' else verbindung == 'keep-alive'
+
+                try:
+                    laenge = int(kopf.get('content-length') or 0)
+                except ValueError:
+                    laenge = -1
+                if laenge < 0:
+                    await self._antworten(writer, 400, {'fehler' : 'Ungültige Content-Length'}, False)
+                    break
+                if laenge > self.max_laenge:
+                    await self._antworten(writer, 413, {'fehler' : 'Anfrage zu groß'}, False)
+                    break
+                body = await reader.readexactly(laenge) if laenge else b''
+
+                endpunkt = pfad.split('?', 1)[0]
+                status, antwort = await self._bearbeiten(methode, endpunkt, body)
+                await self._antworten(writer, status, antwort, offen_halten)
+                self.metriken.anfrage(endpunkt if status != 404 else 'unbekannt', status, time.perf_counter() - start)
+                if not offen_halten:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Abbruch durch stop() beendet die Verbindung regulär
+            pass
+        finally:
+            self._verbindungen.discard(task)
+            writer.close()
+            with contextlib.suppress(ConnectionError, asyncio.CancelledError):
+                await writer.wait_closed()
+
+    async def _bearbeiten(self, methode, endpunkt, body):
+        routen = {
+                  '/note' : ('POST', self._note),
+                  '/gruppe' : ('POST', self._gruppe),
+                  '/metrics' : ('GET', self._metrics),
+                  '/health' : ('GET', self._health),
+                  }
+        if endpunkt not in routen:
+            return 404, {'fehler' : f'Unbekannter Endpunkt: {endpunkt}'}
+        erlaubt, funktion = routen[endpunkt]
+        if methode != erlaubt:
+            return 405, {'fehler' : f'Erlaubt ist {erlaubt}'}
+        if methode == 'GET':
+            return await funktion()
+        try:
+            daten = json.loads(body or b'{}')
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            return 400, {'fehler' : f'Ungültiges JSON: {e}'}
+        if not isinstance(daten, dict):
+            return 400, {'fehler' : 'Es muss ein JSON-Objekt übergeben werden.'}
+        return await funktion(daten)
+
+    async def _note(self, daten):
+        ergebnis = await self._sammler.berechne(daten)
+        return (422 if 'fehler' in ergebnis else 200), ergebnis
+
+    async def _gruppe(self, daten):
+        schueler = daten.get('schueler')
+        if not isinstance(schueler, list) or not all(isinstance(eintrag, dict) for eintrag in schueler):
+            return 400, {'fehler' : 'schueler muss eine Liste von Objekten sein.'}
+        gemeinsam = {key : daten[key] for key in ['fach', 'modell', 'konfiguration'] if key in daten}
+        ergebnisse = await asyncio.gather(*[self._sammler.berechne({**gemeinsam, **eintrag}) for eintrag in schueler])
+        return 200, {'ergebnisse' : ergebnisse}
+
+    async def _metrics(self):
+        return 200, self.metriken.text()
+
+    async def _health(self):
+        return 200, {'status' : 'ok'}
+
+    @staticmethod
+    async def _antworten(writer, status, antwort, offen_halten):
+        if isinstance(antwort, str):
+            body, typ = antwort.encode(), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body, typ = json.dumps(antwort, ensure_ascii=False).encode(), 'application/json; charset=utf-8'
+        texte = {200 : 'OK', 400 : 'Bad Request', 404 : 'Not Found', 405 : 'Method Not Allowed', 413 : 'Payload Too Large', 422 : 'Unprocessable Entity'}
+        kopf = (f"HTTP/1.1 {status} {texte.get(status, '')}\r\n"
+                f"Content-Type: {typ}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if offen_halten else 'close'}\r\n\r\n")
+        writer.write(kopf.encode('latin-1') + body)
+        await writer.drain()
+
+def dienst(argv=None):
+    parser = argparse.ArgumentParser(prog='notenbildung dienst', description='Startet den lokalen HTTP-Dienst für Notenberechnungen.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None, help='Anzahl der Prozesse (Standard: alle CPUs), 0 für Threads im selben Prozess')
+    parser.add_argument('--max-stapel', type=int, default=64, help='Höchstens so viele Schüler je Stapel')
+    parser.add_argument('--max-wartezeit', type=float, default=0.002, help='Wartezeit in Sekunden zum Sammeln eines Stapels')
+    args = parser.parse_args(argv)
+
+    server = NotenServer(host=args.host, port=args.port, workers=args.workers, max_stapel=args.max_stapel, max_wartezeit=args.max_wartezeit)
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(server.serve_forever())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(dienst())
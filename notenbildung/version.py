@@ -9,14 +9,13 @@ import subprocess
 from datetime import datetime, timedelta
 import argparse
 
-try:
-    import requests
-except:
-    pass
-
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(os.path.dirname(__file__))))
 from notenbildung.info import *
+from notenbildung.verzoegert import VerzoegertesModul
+
+# requests wird erst beim Herunterladen geladen
+requests = VerzoegertesModul('requests')
 
 
 
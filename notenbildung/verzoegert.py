@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Verzögertes Importieren von Modulen
+"""
+import importlib
+
+class VerzoegertesModul:
+    """
+    Platzhalter für ein Modul, das erst beim ersten Zugriff auf ein Attribut importiert wird. Damit bleibt der Import
+    von notenbildung.models schnell, solange weder geplottet noch nach pandas exportiert wird.
+
+    plt = VerzoegertesModul('matplotlib.pyplot')
+    plt.subplots()  # importiert matplotlib.pyplot
+    """
+    def __init__(self, name):
+        self._name = name
+        self._modul = None
+
+    def _laden(self):
+        if self._modul is None:
+            self._modul = importlib.import_module(self._name)
+        return self._modul
+
+    def __getattr__(self, attribut):
+        return getattr(self._laden(), attribut)
+
+    def __repr__(self):
+        zustand = 'geladen' if self._modul is not None else 'nicht geladen'
+        return f"VerzoegertesModul({self._name}, {zustand})"
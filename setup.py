@@ -24,6 +24,9 @@ setup(
         "requests",
         "openpyxl",
     ],
+    extras_require={
+        'archiv': ["pyarrow"],
+    },
     classifiers=[
         'Development Status :: 1 - Planning',
         'Intended Audience :: Science/Research',